@@ -0,0 +1 @@
+default_app_config = 'bundesliga_app.apps.BundesligaAppConfig'
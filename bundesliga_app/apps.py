@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BundesligaAppConfig(AppConfig):
     name = 'bundesliga_app'
+
+    def ready(self):
+        from . import signals  # noqa
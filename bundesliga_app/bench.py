@@ -0,0 +1,314 @@
+""" This is the benchmark of the views of the organizer and of the buyer.
+It seeds organizers with their events, ticket types and member codes,
+drives the views against the fake APIs of EB and DS and measures
+the latency, the queries and the calls to EB and DS of each request.
+See the bench command """
+from django.test import Client
+from django.urls import reverse
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Thread
+import json
+import logging
+import subprocess
+from . import utils
+from .fake_apis import FakeAPIsServer, FIRST_EVENT_ID, TICKETS
+from .factories import (
+    AuthFactory,
+    DiscountCodeFactory,
+    EventFactory,
+    EventTicketTypeFactory,
+    MemberDiscountCodeFactory,
+    OrganizerFactory,
+    TicketTypeDiscountFactory,
+)
+from .models import (
+    DiscountType,
+    Event,
+    EventTicketType,
+    StatusMemberDiscountCode,
+)
+
+# The numbers of the requests shown for each view, the times are in ms
+TIME_METRICS = ('p50', 'p95')
+COUNT_METRICS = ('queries', 'eb_calls', 'ds_calls')
+
+
+class RequestStatsHandler(logging.Handler):
+    """ Keeps the stats of the requests logged by RequestStatsMiddleware """
+
+    def __init__(self):
+        super(RequestStatsHandler, self).__init__(logging.INFO)
+        self.requests = []
+
+    def emit(self, record):
+        self.requests.append(json.loads(record.getMessage()))
+
+
+@contextmanager
+def record_requests():
+    """
+    The stats of the requests made in the block are kept in a list,
+    instead of being sent to the handlers of the logger
+    """
+    logger = logging.getLogger('bundesliga_app.requests')
+    handler = RequestStatsHandler()
+    handlers, level, propagate = logger.handlers, logger.level, logger.propagate
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    try:
+        yield handler.requests
+    finally:
+        logger.handlers = handlers
+        logger.setLevel(level)
+        logger.propagate = propagate
+
+
+@contextmanager
+def use_fake_apis(url=None, **server_options):
+    """
+    The calls to EB and DS in the block are made to the fake APIs of url,
+    or to a fake server started for the block if url is None
+    """
+    server = None
+    if url is None:
+        server = FakeAPIsServer(('127.0.0.1', 0), **server_options)
+        Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://{}:{}'.format(*server.server_address)
+    eb_api_url, ds_api_url = utils.EB_API_URL, utils.DS_API_URL
+    # The clients of EB are made again with the new url
+    utils.close_eb_clients()
+    utils.EB_API_URL = url + '/v3/'
+    utils.DS_API_URL = url + '/ds/'
+    try:
+        yield url
+    finally:
+        utils.EB_API_URL, utils.DS_API_URL = eb_api_url, ds_api_url
+        utils.close_eb_clients()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def seed(organizers=5, events=10, tickets=3, member_codes=10):
+    """
+    This method creates the organizers, each one with its events,
+    the discounts of their paid ticket types and the member codes of them.
+    The events are the ones of the fake APIs, from FIRST_EVENT_ID,
+    and it returns the organizers
+    """
+    ticket_type_discount = DiscountType.objects.get(name='Ticket Type')
+    unknown = StatusMemberDiscountCode.objects.get(name='Unknown')
+    # The first ticket of the fake APIs is free, it never has discounts
+    tickets = min(tickets, len(TICKETS) - 1)
+    seeded = []
+    for number in range(organizers):
+        organizer = OrganizerFactory(
+            username='bench-organizer-{}'.format(number),
+            is_staff=False,
+            is_superuser=False,
+        )
+        AuthFactory(
+            user=organizer,
+            uid='bench-{}'.format(number),
+            extra_data={'access_token': 'bench-token-{}'.format(number)},
+        )
+        for event_number in range(events):
+            event_id = str(FIRST_EVENT_ID + number * events + event_number)
+            event = EventFactory(
+                event_id=event_id,
+                organizer=organizer,
+                is_active=True,
+            )
+            for ticket in range(1, tickets + 1):
+                discount = TicketTypeDiscountFactory(
+                    ticket_type=EventTicketTypeFactory(
+                        event=event,
+                        ticket_id_eb='{}-{}'.format(event_id, ticket),
+                    ),
+                    discount_type=ticket_type_discount,
+                    value=10,
+                    value_type='percentage',
+                )
+            for code in range(member_codes):
+                MemberDiscountCodeFactory(
+                    member_number=str(1000000 + code * 10),
+                    status=unknown,
+                    discount_code=DiscountCodeFactory(
+                        discount=discount,
+                        discount_code='{}-{}'.format(event_id, code),
+                    ),
+                )
+        seeded.append(organizer)
+    return seeded
+
+
+def get_scenarios(organizers):
+    """
+    This method will receive the seeded organizers and returns the views
+    of the benchmark, each one is a function that makes a request
+    with the client of its organizer and the number of the request
+    """
+    clients = {}
+
+    def get_client(organizer):
+        if organizer.id not in clients:
+            clients[organizer.id] = Client()
+            clients[organizer.id].force_login(organizer)
+        return clients[organizer.id]
+
+    def get_organizer(number):
+        return organizers[number % len(organizers)]
+
+    def get_event(organizer):
+        return Event.objects.filter(organizer=organizer).order_by('id').first()
+
+    def home(number):
+        return get_client(get_organizer(number)).get(reverse('index'))
+
+    def event_discounts(number):
+        organizer = get_organizer(number)
+        return get_client(organizer).get(reverse(
+            'events_discount',
+            kwargs={'event_id': get_event(organizer).id},
+        ))
+
+    def select_events(number):
+        # All the events of the organizer are selected again
+        organizer = get_organizer(number)
+        events_id = Event.objects.filter(
+            organizer=organizer,
+        ).order_by('id').values_list('event_id', flat=True)
+        return get_client(organizer).post(
+            reverse('select_events'),
+            '&'.join('event_{}=on'.format(event_id) for event_id in events_id),
+            content_type='application/x-www-form-urlencoded',
+        )
+
+    def landing_page(number):
+        return Client().get(reverse(
+            'landing_page_buyer',
+            kwargs={'organizer_id': get_organizer(number).id},
+        ))
+
+    def listing_page(number):
+        # A new member number each time, that does not end with 0 to be valid
+        organizer = get_organizer(number)
+        event = get_event(organizer)
+        ticket_type = EventTicketType.objects.filter(
+            event=event,
+        ).order_by('id').first()
+        return Client().post(
+            reverse(
+                'listing_page_event',
+                kwargs={'organizer_id': organizer.id, 'event_id': event.id},
+            ),
+            {
+                'tickets_type': ticket_type.id,
+                'member_number_1': 2000000 + number * 10 + 1,
+            },
+        )
+
+    return [
+        ('home', home),
+        ('event_discounts', event_discounts),
+        ('select_events', select_events),
+        ('landing_page', landing_page),
+        ('listing_page', listing_page),
+    ]
+
+
+def percentile(values, percent):
+    """ The value of the percentile of the values, by the nearest rank """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(requests):
+    """
+    This method will receive the stats of the requests of a view
+    and returns its latency, and the mean of its queries and calls
+    """
+    times = [request['time'] for request in requests]
+    count = len(requests) or 1
+    return {
+        'requests': len(requests),
+        'p50': percentile(times, 50),
+        'p95': percentile(times, 95),
+        'max': max(times) if times else None,
+        'queries': sum(request['db']['count'] for request in requests) / count,
+        'eb_calls': sum(request['eb']['count'] for request in requests) / count,
+        'ds_calls': sum(request['ds']['count'] for request in requests) / count,
+        'cache_hits': sum(
+            request['cache']['hits'] for request in requests) / count,
+        'statuses': sorted(set(request['status'] for request in requests)),
+    }
+
+
+def run_bench(organizers, requests=20, warmup=2):
+    """
+    This method will receive the seeded organizers and returns
+    the summary of each view, the first warmup requests are not measured
+    """
+    results = {}
+    with record_requests() as recorded:
+        for name, scenario in get_scenarios(organizers):
+            for number in range(warmup):
+                scenario(number)
+            first = len(recorded)
+            for number in range(warmup, warmup + requests):
+                scenario(number)
+            results[name] = summarize(recorded[first:])
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_baseline(results, options):
+    """ The baseline of a run, with its commit and its options """
+    return {
+        'commit': get_commit(),
+        'date': datetime.now().isoformat(),
+        'options': options,
+        'views': results,
+    }
+
+
+def compare(baseline, current, threshold=20):
+    """
+    This method will receive two baselines and returns the rows of
+    the diff of each view and metric, and the regressions. A time is a
+    regression if it's threshold percent slower, and a query or a call
+    if there is any more of them
+    """
+    rows = []
+    regressions = []
+    for view in sorted(current['views']):
+        if view not in baseline['views']:
+            continue
+        for metric in TIME_METRICS + COUNT_METRICS:
+            before = baseline['views'][view].get(metric)
+            after = current['views'][view].get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) * 100 / before if before else None
+            if metric in TIME_METRICS:
+                regression = change is not None and change > threshold
+            else:
+                regression = after > before
+            rows.append((view, metric, before, after, change, regression))
+            if regression:
+                regressions.append('{} {}'.format(view, metric))
+    return rows, regressions
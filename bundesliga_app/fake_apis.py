@@ -0,0 +1,309 @@
+""" This is a fake server of the APIs of Eventbrite and Deutscher Sportausweis,
+so the whole app can be load tested without calling them. The responses are
+made with the payloads of mocks.py, with a configurable latency, rate of
+errors and rate limit. See the fake_apis command and settings_loadtest """
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+from threading import Lock
+from time import sleep, time
+from math import log
+import copy
+import json
+import random
+import re
+from .mocks import (
+    MOCK_EVENT_API,
+    MOCK_EVENT_TICKETS,
+    MOCK_USER_API,
+    MOCK_VENUE_API,
+)
+
+# The ids of the fake events of the organizer
+FIRST_EVENT_ID = 50000000000
+# The payloads are copied, so the changes of the tests to them are not served
+EVENT = copy.deepcopy(MOCK_EVENT_API)
+TICKETS = copy.deepcopy(MOCK_EVENT_TICKETS[0])
+USER = copy.deepcopy(MOCK_USER_API)
+VENUE = copy.deepcopy(MOCK_VENUE_API)
+
+
+class FakeAPIsServer(ThreadingMixIn, HTTPServer):
+    """
+    The server of the fake APIs. Each request is served in its own thread,
+    and the discounts created in EB are kept in memory while it runs
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, events=100, page_size=50, latency=0.05,
+                 latency_distribution='lognormal', latency_sigma=0.5,
+                 error_rate=0, rate_limit=0, seed=None):
+        HTTPServer.__init__(self, address, FakeAPIsHandler)
+        self.events = events
+        self.page_size = page_size
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.lock = Lock()
+        self.discounts = {}
+        self.next_discount_id = 1
+        # The buckets of requests of the rate limit, by token
+        self.buckets = {}
+
+    def get_latency(self):
+        """
+        This method returns the latency of a response with the distribution
+        of the server, the mean of all of them is the latency of the server
+        """
+        with self.lock:
+            if not self.latency:
+                return 0
+            if self.latency_distribution == 'fixed':
+                return self.latency
+            if self.latency_distribution == 'uniform':
+                return self.random.uniform(0, 2 * self.latency)
+            if self.latency_distribution == 'exponential':
+                return self.random.expovariate(1 / self.latency)
+            # A lognormal distribution with a long tail and the same mean
+            return self.random.lognormvariate(
+                log(self.latency) - self.latency_sigma ** 2 / 2,
+                self.latency_sigma,
+            )
+
+    def is_error(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def is_rate_limited(self, token):
+        """
+        This method will receive the token of a request and returns True
+        if the token has made more than rate_limit requests in the last second
+        """
+        if not self.rate_limit:
+            return False
+        now = time()
+        with self.lock:
+            bucket = [
+                moment
+                for moment in self.buckets.get(token, [])
+                if now - moment < 1
+            ]
+            limited = len(bucket) >= self.rate_limit
+            if not limited:
+                bucket.append(now)
+            self.buckets[token] = bucket
+        return limited
+
+    def get_event(self, number):
+        event = copy.deepcopy(EVENT)
+        event['id'] = str(FIRST_EVENT_ID + number)
+        event['name'] = {
+            'text': 'Event {}'.format(number),
+            'html': 'Event {}'.format(number),
+        }
+        event['url'] = 'https://www.eventbrite.com/e/{}'.format(event['id'])
+        return event
+
+    def get_events_page(self, query):
+        """
+        This method will receive the query of the list of events and returns
+        its page, by number or by continuation like EB
+        """
+        page = query.get('continuation') or query.get('page') or ['1']
+        page = int(page[0])
+        page_count = max(1, -(-self.events // self.page_size))
+        first = (page - 1) * self.page_size
+        return {
+            'events': [
+                self.get_event(number)
+                for number in range(first, min(first + self.page_size, self.events))
+            ],
+            'pagination': {
+                'object_count': self.events,
+                'page_number': page,
+                'page_size': self.page_size,
+                'page_count': page_count,
+                'has_more_items': page < page_count,
+                'continuation': str(page + 1) if page < page_count else None,
+            },
+        }
+
+    def get_tickets(self, event_id):
+        """ The tickets of EB of an event, with a different id for each event """
+        tickets = copy.deepcopy(TICKETS)
+        for index, ticket in enumerate(tickets):
+            ticket['id'] = '{}-{}'.format(event_id, index)
+            ticket['event_id'] = event_id
+        return tickets
+
+    def is_event(self, event_id):
+        return 0 <= int(event_id) - FIRST_EVENT_ID < self.events
+
+    def find_discounts(self, query):
+        with self.lock:
+            discounts = [
+                copy.deepcopy(discount)
+                for discount in self.discounts.values()
+                if discount['event_id'] in query.get('event_id', [discount['event_id']]) and
+                discount['code'] in query.get('code', [discount['code']])
+            ]
+        return {
+            'discounts': discounts,
+            'pagination': {
+                'object_count': len(discounts),
+                'page_number': 1,
+                'page_size': len(discounts),
+                'page_count': 1,
+                'has_more_items': False,
+            },
+        }
+
+    def create_discount(self, data):
+        discount = dict(data.get('discount', {}))
+        with self.lock:
+            discount['id'] = str(self.next_discount_id)
+            self.next_discount_id += 1
+            discount['quantity_sold'] = 0
+            self.discounts[discount['id']] = discount
+            return copy.deepcopy(discount)
+
+    def update_discount(self, discount_id, data):
+        with self.lock:
+            discount = self.discounts.get(discount_id)
+            if discount is None:
+                return None
+            discount.update(data.get('discount', {}))
+            return copy.deepcopy(discount)
+
+    def delete_discount(self, discount_id):
+        with self.lock:
+            if self.discounts.pop(discount_id, None) is None:
+                return None
+        return {'discount_id': discount_id, 'deleted': True}
+
+
+class FakeAPIsHandler(BaseHTTPRequestHandler):
+    """ The handler of the requests to the fake APIs of EB and DS """
+
+    # The routes of EB, the groups of the regex are the args of the method
+    routes = [
+        ('GET', r'^/v3/users/me/$', 'get_user'),
+        ('GET', r'^/v3/users/me/owned_events/$', 'get_events'),
+        ('GET', r'^/v3/events/(\d+)/$', 'get_event'),
+        ('GET', r'^/v3/events/(\d+)/ticket_classes/$', 'get_tickets'),
+        ('GET', r'^/v3/venues/(\d+)/$', 'get_venue'),
+        ('GET', r'^/v3/organizations/(\d+)/discounts/$', 'get_discounts'),
+        ('POST', r'^/v3/organizations/(\d+)/discounts/$', 'post_discount'),
+        ('POST', r'^/v3/discounts/(\d+)/$', 'update_discount'),
+        ('DELETE', r'^/v3/discounts/(\d+)/$', 'delete_discount'),
+    ]
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def log_message(self, format, *args):
+        # The access log would slow down the load tests
+        pass
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        self.query = parse_qs(url.query)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            self.data = json.loads(body.decode()) if body else {}
+        except ValueError:
+            self.data = parse_qs(body.decode())
+
+        sleep(self.server.get_latency())
+        token = self.headers.get('Authorization', '')
+        if self.server.is_rate_limited(token):
+            return self.send_json(429, {
+                'status_code': 429,
+                'error': 'HIT_RATE_LIMIT',
+                'error_description': 'Hit rate limit',
+            })
+        if self.server.is_error():
+            return self.send_json(500, {
+                'status_code': 500,
+                'error': 'INTERNAL_ERROR',
+                'error_description': 'Fake error',
+            })
+
+        if not url.path.startswith('/v3/'):
+            return self.validate_card()
+        for route_method, pattern, name in self.routes:
+            match = re.match(pattern, url.path)
+            if match and route_method == method:
+                result = getattr(self, name)(*match.groups())
+                if result is None:
+                    return self.send_not_found()
+                return self.send_json(200, result)
+        return self.send_not_found()
+
+    def send_json(self, status, payload):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_not_found(self):
+        self.send_json(404, {
+            'status_code': 404,
+            'error': 'NOT_FOUND',
+            'error_description': 'The path you requested does not exist',
+        })
+
+    def validate_card(self):
+        """
+        The fake API of DS, the member numbers that end with 0 are invalid
+        and the others are valid
+        """
+        if self.query.get('request') != ['validateCard'] or not self.query.get('CardId'):
+            return self.send_json(400, {'ERROR': -2})
+        if self.query['CardId'][0].endswith('0'):
+            return self.send_json(200, {'ERROR': -1})
+        return self.send_json(200, {'Kartentyp': '2', 'Version': '00'})
+
+    def get_user(self):
+        return USER
+
+    def get_events(self):
+        return self.server.get_events_page(self.query)
+
+    def get_event(self, event_id):
+        if not self.server.is_event(event_id):
+            return None
+        return self.server.get_event(int(event_id) - FIRST_EVENT_ID)
+
+    def get_tickets(self, event_id):
+        if not self.server.is_event(event_id):
+            return None
+        return {'ticket_classes': self.server.get_tickets(event_id)}
+
+    def get_venue(self, venue_id):
+        return dict(VENUE, id=venue_id)
+
+    def get_discounts(self, organization_id):
+        return self.server.find_discounts(self.query)
+
+    def post_discount(self, organization_id):
+        return self.server.create_discount(self.data)
+
+    def update_discount(self, discount_id):
+        return self.server.update_discount(discount_id, self.data)
+
+    def delete_discount(self, discount_id):
+        return self.server.delete_discount(discount_id)
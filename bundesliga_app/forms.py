@@ -11,8 +11,9 @@ from .models import (
 )
 from .utils import (
     get_event_eb_api,
+    get_event_tickets_type,
     get_auth_token,
-    validate_member_number_ds,
+    validate_member_numbers_ds,
     get_ticket_type
 )
 from django.contrib.auth import get_user_model
@@ -188,10 +189,15 @@ class GetDiscountForm(forms.Form):
                 iterator = range(1, len(self.cleaned_data))
             else:
                 iterator = range(1, len(self.cleaned_data) + 1)
-            for number in iterator :
-                return_api_ds = validate_member_number_ds(
+            # Validate all the numbers at the same time
+            returns_api_ds = validate_member_numbers_ds([
+                self.cleaned_data['member_number_{}'.format(number)]
+                for number in iterator
+            ])
+            for number in iterator:
+                return_api_ds = returns_api_ds[
                     self.cleaned_data['member_number_{}'.format(number)]
-                )
+                ]
                 if return_api_ds == 'Invalid Request':
                     self.add_error('member_number_{}'.format(
                         number), _('Invalid request'))
@@ -230,14 +236,19 @@ class GetDiscountForm(forms.Form):
     def __init__(self, data=None, *args, **kwargs):
         event_id = kwargs.pop('event_id', None)
         user_id = kwargs.pop('user', None)
+        # The tickets type of the listing of the event, if the view has them
+        tickets_type = kwargs.pop('tickets_type', None)
         super(GetDiscountForm, self).__init__(data, *args, **kwargs)
         max_members = 11
         for member in range(2, max_members):
             field_name = "member_number_{}".format(member)
             self.fields[field_name] = forms.IntegerField()
-        user = get_user_model().objects.get(
-            id=user_id)
-        ticket_types = self.get_ticket_types(event_id, user)
+        if tickets_type is None:
+            user = get_user_model().objects.get(
+                id=user_id)
+            ticket_types = self.get_ticket_types(event_id, user)
+        else:
+            ticket_types = self.get_ticket_types_choices(tickets_type)
         self.fields['tickets_type'].choices = ticket_types
 
     def get_ticket_types(self, event_id, user):
@@ -245,34 +256,29 @@ class GetDiscountForm(forms.Form):
             id=event_id,
             is_active=True,
         )
-        tickets_in_db = EventTicketType.objects.filter(
-            event=event
-        )
+        tickets_type = get_event_tickets_type(user, event)
         # Add tickets with discount
-        tickets_with_discount = {}
-
-        for ticket_in_db in tickets_in_db:
-            if TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_in_db).exists():
-                tickets_with_discount[ticket_in_db.id] = ticket_in_db.__dict__
-                tickets_with_discount[ticket_in_db.id]['discount'] = TicketTypeDiscount.objects.get(
-                    ticket_type=ticket_in_db
-                )
+        for discount in TicketTypeDiscount.objects.filter(
+                ticket_type__event=event):
+            if str(discount.ticket_type_id) in tickets_type:
+                tickets_type[str(discount.ticket_type_id)
+                             ]['discount'] = discount.__dict__
+        return self.get_ticket_types_choices(tickets_type)
 
+    def get_ticket_types_choices(self, tickets_type):
+        """ Receive the tickets type of the event with their discount
+        and returns the choices of the tickets with discount """
         tickets_types_name = ()
-        for ticket in tickets_with_discount:
-            ticket_type_eb = get_ticket_type(
-                user,
-                event.event_id,
-                ticket,
-            )
-            value_without_discount = float(ticket_type_eb[str(ticket)]['actual_cost']['major_value'])
-            value_with_discount = value_without_discount - (value_without_discount * tickets_with_discount[ticket]['discount'].value)/100
+        for ticket_id, ticket_type_eb in tickets_type.items():
+            if 'discount' not in ticket_type_eb:
+                continue
+            value_without_discount = float(ticket_type_eb['actual_cost']['major_value'])
+            value_with_discount = value_without_discount - (value_without_discount * ticket_type_eb['discount']['value'])/100
             value = "{} - ${} without discount - ${} with discount".format(
-                ticket_type_eb[str(ticket)]['name'],
+                ticket_type_eb['name'],
                 value_without_discount,
                 value_with_discount,
             )
             tickets_types_name = (
-                (ticket, value),) + tickets_types_name
+                (int(ticket_id), value),) + tickets_types_name
         return tickets_types_name
@@ -0,0 +1,204 @@
+""" Command that benchmarks the views of the organizer and of the buyer """
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+import json
+from bundesliga_app.bench import (
+    compare,
+    make_baseline,
+    run_bench,
+    seed,
+    use_fake_apis,
+)
+
+# The cache of each run is empty, so the runs do not depend on Redis
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a test database and measure the latency, the queries and the '
+        'calls to EB and DS of the views against the fake APIs, '
+        'the results can be saved as a baseline and compared with another one'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organizers',
+            type=int,
+            default=5,
+            help='Number of organizers to seed',
+        )
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=10,
+            help='Number of events of each organizer',
+        )
+        parser.add_argument(
+            '--tickets',
+            type=int,
+            default=3,
+            help='Number of paid ticket types with discount of each event',
+        )
+        parser.add_argument(
+            '--member-codes',
+            type=int,
+            default=10,
+            help='Number of member discount codes of each event',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=20,
+            help='Number of measured requests of each view',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=2,
+            help='Number of requests of each view before measuring',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.01,
+            help='Mean latency of the fake APIs in seconds',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the latency of the fake APIs',
+        )
+        parser.add_argument(
+            '--fake-apis-url',
+            help='Use the fake APIs of this url instead of starting them, '
+                 'they must have all the events of the organizers',
+        )
+        parser.add_argument(
+            '--output',
+            help='Save the results as a baseline in this JSON file',
+        )
+        parser.add_argument(
+            '--results',
+            help='Do not run, compare the results of this JSON file',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Compare the results with the baseline of this JSON file',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20,
+            help='Percent of latency over the baseline that is a regression',
+        )
+
+    def handle(self, *args, **options):
+        if options['results']:
+            with open(options['results']) as results_file:
+                results = json.load(results_file)
+        else:
+            results = self.bench(options)
+        self.write_results(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2, sort_keys=True)
+            self.stdout.write('Saved in {}'.format(options['output']))
+
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+            rows, regressions = compare(
+                baseline,
+                results,
+                options['threshold'],
+            )
+            self.write_diff(baseline, results, rows)
+            if regressions:
+                raise CommandError(
+                    'Regressions: {}'.format(', '.join(regressions))
+                )
+
+    def bench(self, options):
+        """ Run the benchmark in a new test database """
+        bench_options = {
+            name: options[name]
+            for name in (
+                'organizers', 'events', 'tickets', 'member_codes',
+                'requests', 'warmup', 'latency', 'seed',
+            )
+        }
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            serialize=False,
+        )
+        try:
+            with override_settings(CACHES=BENCH_CACHES), use_fake_apis(
+                options['fake_apis_url'],
+                events=options['organizers'] * options['events'],
+                latency=options['latency'],
+                seed=options['seed'],
+            ):
+                organizers = seed(
+                    options['organizers'],
+                    options['events'],
+                    options['tickets'],
+                    options['member_codes'],
+                )
+                results = run_bench(
+                    organizers,
+                    options['requests'],
+                    options['warmup'],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        return make_baseline(results, bench_options)
+
+    def write_results(self, results):
+        self.stdout.write('Commit {} of {}'.format(
+            results['commit'], results['date']))
+        self.stdout.write(
+            '{:<16} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8}'.format(
+                'view', 'p50 ms', 'p95 ms', 'queries', 'eb', 'ds', 'status')
+        )
+        for view, summary in sorted(results['views'].items()):
+            self.stdout.write(
+                '{:<16} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8}'.format(
+                    view,
+                    summary['p50'] or 0,
+                    summary['p95'] or 0,
+                    summary['queries'],
+                    summary['eb_calls'],
+                    summary['ds_calls'],
+                    ','.join(str(status) for status in summary['statuses']),
+                )
+            )
+
+    def write_diff(self, baseline, results, rows):
+        self.stdout.write('Diff of commit {} with commit {}'.format(
+            results['commit'], baseline['commit']))
+        for view, metric, before, after, change, regression in rows:
+            self.stdout.write('{:<16} {:<9} {:>9.1f} {:>9.1f} {:>8} {}'.format(
+                view,
+                metric,
+                before,
+                after,
+                '{:+.1f}%'.format(change) if change is not None else '',
+                'REGRESSION' if regression else '',
+            ))
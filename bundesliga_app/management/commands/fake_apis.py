@@ -0,0 +1,92 @@
+""" Command that runs the fake APIs of EB and DS for the load tests """
+from django.core.management.base import BaseCommand
+from bundesliga_app.fake_apis import FakeAPIsServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a fake server of the APIs of EB and DS for the load tests, '
+        'use it with the settings of bundesliga_site.settings_loadtest'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='Address to listen on',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8001,
+            help='Port to listen on',
+        )
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=100,
+            help='Number of live events of the organizers',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=50,
+            help='Number of events of each page of the list of events',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Mean latency of the responses in seconds',
+        )
+        parser.add_argument(
+            '--latency-distribution',
+            choices=['fixed', 'uniform', 'exponential', 'lognormal'],
+            default='lognormal',
+            help='Distribution of the latency of the responses',
+        )
+        parser.add_argument(
+            '--latency-sigma',
+            type=float,
+            default=0.5,
+            help='Sigma of the lognormal distribution, the tail of the latency',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0,
+            help='Rate of responses with a 500 error, between 0 and 1',
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=int,
+            default=0,
+            help='Requests per second of each token before a 429, 0 is no limit',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed of the latency and the errors, to repeat a run',
+        )
+
+    def handle(self, *args, **options):
+        server = FakeAPIsServer(
+            (options['host'], options['port']),
+            events=options['events'],
+            page_size=options['page_size'],
+            latency=options['latency'],
+            latency_distribution=options['latency_distribution'],
+            latency_sigma=options['latency_sigma'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            seed=options['seed'],
+        )
+        self.stdout.write('Fake APIs of EB and DS on http://{}:{}/'.format(
+            *server.server_address
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
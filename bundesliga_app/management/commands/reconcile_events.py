@@ -0,0 +1,73 @@
+""" Command that deletes the discounts of the events that are free in EB """
+from time import sleep
+import logging
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from bundesliga_app.utils import reconcile_organizer_events
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the discounts and ticket types of the events that are free '
+        'in EB, and the discounts of the ticket types that are free in EB. '
+        'Create the new ticket types of EB and delete the ones not in EB'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organizer',
+            type=int,
+            help='Only reconcile the events of this organizer id',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Run as a worker, reconciling again every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # The connections dropped by the DB are opened again
+            close_old_connections()
+            try:
+                self.reconcile(options['organizer'])
+            except Exception:
+                if not options['interval']:
+                    raise
+                # An error of the DB does not stop the worker
+                logger.exception('The events could not be reconciled')
+            if not options['interval']:
+                return
+            sleep(options['interval'])
+
+    def reconcile(self, organizer_id):
+        organizers = get_user_model().objects.filter(
+            event__is_active=True,
+            social_auth__provider='eventbrite',
+        ).distinct().order_by('id')
+        if organizer_id:
+            organizers = organizers.filter(id=organizer_id)
+
+        for organizer in organizers:
+            # An error of EB with an organizer does not stop the others
+            try:
+                deleted = reconcile_organizer_events(organizer)
+            except Exception as e:
+                self.stderr.write(
+                    'Organizer {}: {}'.format(organizer.id, e)
+                )
+                continue
+            self.stdout.write(
+                'Organizer {}: {free_events} free events, deleted '
+                '{event_discounts} event discounts, '
+                '{ticket_discounts} ticket discounts and '
+                '{tickets_type} ticket types, '
+                'created {tickets_type_created} ticket types'.format(
+                    organizer.id,
+                    **deleted
+                )
+            )
@@ -0,0 +1,380 @@
+""" This is the registry of the metrics of the external dependencies of
+the app, counters and histograms exposed in the text format of Prometheus.
+Each process keeps its own values and flushes them to a file of METRICS_DIR,
+so the /metrics of any worker of gunicorn shows the values of all of them.
+The values of the processes that have finished are added to an archive file,
+so the totals do not go backwards when a worker is restarted """
+from django.conf import settings
+from threading import Lock
+from time import time
+import fcntl
+import json
+import os
+import re
+import tempfile
+
+METRICS_DIR = getattr(settings, "METRICS_DIR", None)
+METRICS_FLUSH_INTERVAL = getattr(settings, "METRICS_FLUSH_INTERVAL", 10)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The metrics of this process by name
+REGISTRY = {}
+REGISTRY_LOCK = Lock()
+# Only one thread of the process writes its file at once
+FLUSH_LOCK = Lock()
+LAST_FLUSH = {'time': 0}
+# The file of each process has its pid and its start time, a new process
+# with the pid of a finished one does not write in the file of that one
+PROCESS = {'pid': None, 'token': None}
+METRICS_FILE_NAME = re.compile(r'^metrics-(\d+)-(\d+)\.json$')
+ARCHIVE_FILE_NAME = 'metrics-archive.json'
+
+
+class Metric(object):
+    """ A metric of the registry, it has a value for each set of labels """
+
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        REGISTRY[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def dump(self):
+        """ This method returns the metric and a copy of its values """
+        return {
+            'type': self.type,
+            'help': self.help,
+            'labels': list(self.labels),
+            'values': [
+                [list(key), json.loads(json.dumps(value))]
+                for key, value in self.values.items()
+            ],
+        }
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def inc(self, value=1, **labels):
+        key = self._key(labels)
+        with REGISTRY_LOCK:
+            self.values[key] = self.values.get(key, 0) + value
+        maybe_flush()
+
+
+class Histogram(Metric):
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with REGISTRY_LOCK:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {
+                    'buckets': [0] * len(self.buckets),
+                    'sum': 0,
+                    'count': 0,
+                }
+            # The buckets are cumulative, like in Prometheus
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][position] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+        maybe_flush()
+
+    def dump(self):
+        metric = super(Histogram, self).dump()
+        metric['buckets'] = list(self.buckets)
+        return metric
+
+
+EB_REQUEST_DURATION = Histogram(
+    'eb_request_duration_seconds',
+    'Duration of the calls to the API of Eventbrite',
+    labels=('endpoint',),
+)
+DS_REQUEST_DURATION = Histogram(
+    'ds_request_duration_seconds',
+    'Duration of the calls to the API of Deutscher Sportausweis',
+)
+DS_VALIDATIONS = Counter(
+    'ds_validations_total',
+    'Validations of member numbers in Deutscher Sportausweis by result',
+    labels=('result',),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Reads of the cache by family of keys and result',
+    labels=('family', 'result'),
+)
+VIEW_DURATION = Histogram(
+    'view_duration_seconds',
+    'Duration of the requests by view',
+    labels=('view',),
+)
+ORGANIZATION_ID_LOOKUPS = Counter(
+    'organization_id_lookups_total',
+    'Lookups of the EB organization id, avoided or fetched from /users/me/',
+    labels=('result',),
+)
+DISCOUNT_CODES_GENERATED = Counter(
+    'discount_codes_generated_total',
+    'Discount codes generated for the members in the listing of the events',
+)
+
+
+def dump_registry():
+    """ This method returns the metrics of this process """
+    with REGISTRY_LOCK:
+        return {name: metric.dump() for name, metric in REGISTRY.items()}
+
+
+def get_process_token():
+    """
+    This method returns the token of this process, its pid and the time
+    when it was asked the first time. The workers forked by gunicorn
+    have a new pid, so they get their own token
+    """
+    pid = os.getpid()
+    if PROCESS['pid'] != pid:
+        PROCESS['token'] = '{}-{}'.format(pid, int(time() * 1000))
+        PROCESS['pid'] = pid
+    return PROCESS['token']
+
+
+def get_metrics_path():
+    return os.path.join(
+        METRICS_DIR,
+        'metrics-{}.json'.format(get_process_token()),
+    )
+
+
+def is_alive(pid):
+    """ This method returns True if the process of the pid is running """
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_json(path, value):
+    """
+    This method writes a value in a file of METRICS_DIR. It's written in a
+    temporary file of its own that replaces the file at once,
+    so it is never read half written
+    """
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=METRICS_DIR,
+        prefix='metrics-',
+        suffix='.tmp',
+    )
+    try:
+        with os.fdopen(descriptor, 'w') as metrics_file:
+            json.dump(value, metrics_file)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def read_json(path):
+    try:
+        with open(path) as metrics_file:
+            return json.load(metrics_file)
+    except (OSError, ValueError):
+        # The process could have removed its file
+        return None
+
+
+def archive_finished_processes():
+    """
+    This method adds the metrics of the files of the processes that have
+    finished to the archive file, and removes their files. The files of
+    this pid with another token are of a finished process too.
+    The processes archive them one at a time, with a lock of the directory
+    """
+    own_file = os.path.basename(get_metrics_path())
+    with open(os.path.join(METRICS_DIR, 'metrics.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        finished = []
+        for file_name in sorted(os.listdir(METRICS_DIR)):
+            match = METRICS_FILE_NAME.match(file_name)
+            if not match or file_name == own_file:
+                continue
+            pid = int(match.group(1))
+            if pid == os.getpid() or not is_alive(pid):
+                finished.append(file_name)
+        if not finished:
+            return
+        archive_path = os.path.join(METRICS_DIR, ARCHIVE_FILE_NAME)
+        archive = read_json(archive_path) or {}
+        for file_name in finished:
+            merge(archive, read_json(os.path.join(METRICS_DIR, file_name)) or {})
+        write_json(archive_path, archive)
+        for file_name in finished:
+            os.remove(os.path.join(METRICS_DIR, file_name))
+
+
+def write_metrics():
+    """
+    This method writes the metrics of this process in its file of
+    METRICS_DIR. The first time, the files of the finished processes
+    are archived. An error writing them is not sent to the request
+    that made the metric
+    """
+    first_write = PROCESS['pid'] != os.getpid()
+    LAST_FLUSH['time'] = time()
+    if not METRICS_DIR:
+        return
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        write_json(get_metrics_path(), dump_registry())
+        if first_write:
+            archive_finished_processes()
+    except Exception:
+        return
+
+
+def flush():
+    """ The metrics of this process are written in its file now """
+    with FLUSH_LOCK:
+        write_metrics()
+
+
+def maybe_flush():
+    """
+    The metrics are flushed at most once each METRICS_FLUSH_INTERVAL,
+    the threads do not wait while another one is flushing them
+    """
+    if not METRICS_DIR or not FLUSH_LOCK.acquire(blocking=False):
+        return
+    try:
+        if time() - LAST_FLUSH['time'] > METRICS_FLUSH_INTERVAL:
+            write_metrics()
+    finally:
+        FLUSH_LOCK.release()
+
+
+def merge(metrics, other):
+    """
+    This method will receive the metrics of two processes and adds
+    the values of the second to the first
+    """
+    for name, metric in other.items():
+        if name not in metrics:
+            metrics[name] = dict(metric, values=[])
+        values = {tuple(key): value for key, value in metrics[name]['values']}
+        for key, value in metric['values']:
+            key = tuple(key)
+            if key not in values:
+                values[key] = value
+            elif metric['type'] == 'histogram':
+                values[key] = {
+                    'buckets': [
+                        own + count
+                        for own, count in zip(
+                            values[key]['buckets'], value['buckets'])
+                    ],
+                    'sum': values[key]['sum'] + value['sum'],
+                    'count': values[key]['count'] + value['count'],
+                }
+            else:
+                values[key] += value
+        metrics[name]['values'] = [
+            [list(key), value] for key, value in values.items()
+        ]
+    return metrics
+
+
+def collect():
+    """
+    This method returns the metrics of all the processes, read from the
+    files of METRICS_DIR, or the metrics of this process if it's not set.
+    The ones of the finished processes are read from the archive file
+    """
+    if not METRICS_DIR:
+        return dump_registry()
+    flush()
+    try:
+        archive_finished_processes()
+    except OSError:
+        pass
+    metrics = {}
+    for file_name in sorted(os.listdir(METRICS_DIR)):
+        if not file_name.endswith('.json'):
+            continue
+        merge(metrics, read_json(os.path.join(METRICS_DIR, file_name)) or {})
+    return metrics
+
+
+def format_labels(names, values, extra=()):
+    labels = [
+        '{}="{}"'.format(name, value.replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for name, value in list(zip(names, values)) + list(extra)
+    ]
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics):
+    """
+    This method will receive the metrics and returns them
+    in the text exposition format of Prometheus
+    """
+    lines = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        lines.append('# HELP {} {}'.format(name, metric['help']))
+        lines.append('# TYPE {} {}'.format(name, metric['type']))
+        for key, value in sorted(metric['values']):
+            if metric['type'] != 'histogram':
+                lines.append('{}{} {}'.format(
+                    name,
+                    format_labels(metric['labels'], key),
+                    format_number(value),
+                ))
+                continue
+            bounds = metric['buckets'] + [float('inf')]
+            counts = value['buckets'] + [value['count']]
+            for bound, count in zip(bounds, counts):
+                lines.append('{}_bucket{} {}'.format(
+                    name,
+                    format_labels(
+                        metric['labels'], key, [('le', format_number(bound))]),
+                    count,
+                ))
+            lines.append('{}_sum{} {}'.format(
+                name,
+                format_labels(metric['labels'], key),
+                format_number(float(value['sum'])),
+            ))
+            lines.append('{}_count{} {}'.format(
+                name,
+                format_labels(metric['labels'], key),
+                value['count'],
+            ))
+    return '\n'.join(lines) + '\n'
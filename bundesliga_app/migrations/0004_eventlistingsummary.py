@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-17 14:50
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bundesliga_app', '0003_auto_20181106_1126'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventListingSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_price', models.FloatField(null=True)),
+                ('min_price_display', models.CharField(max_length=200, null=True)),
+                ('max_price', models.FloatField(null=True)),
+                ('max_price_display', models.CharField(max_length=200, null=True)),
+                ('prices_updated', models.DateTimeField(null=True)),
+                ('min_discount', models.IntegerField(default=0)),
+                ('max_discount', models.IntegerField(default=0)),
+                ('tickets_discount_available', models.BooleanField(default=False)),
+                ('event_discount', models.IntegerField(default=0)),
+                ('event_discount_available', models.BooleanField(default=False)),
+                ('ticket_count', models.IntegerField(default=0)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='listing_summary', to='bundesliga_app.Event')),
+            ],
+        ),
+    ]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-17 15:01
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def check_duplicated_discounts(apps, schema_editor):
+    """ The discounts of an event or a ticket type must be unique
+    before adding the constraints. The duplicated ones have discount codes
+    in EB and the history of the members, so they are merged by hand """
+    duplicated = []
+    for model_name, field in (
+        ('EventDiscount', 'event'),
+        ('TicketTypeDiscount', 'ticket_type'),
+    ):
+        model = apps.get_model('bundesliga_app', model_name)
+        duplicated_fields = model.objects.values(field).annotate(
+            count=models.Count('pk'),
+        ).filter(count__gt=1).values_list(field, flat=True)
+        for value in duplicated_fields:
+            duplicated.append('{} of {} {}: {}'.format(
+                model_name,
+                field,
+                value,
+                list(model.objects.filter(
+                    **{field: value}
+                ).order_by('pk').values_list('pk', flat=True)),
+            ))
+    if duplicated:
+        raise RuntimeError(
+            'Merge the duplicated discounts and their discount codes '
+            'before migrating:\n' + '\n'.join(duplicated)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bundesliga_app', '0004_eventlistingsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_duplicated_discounts,
+            migrations.RunPython.noop,
+        ),
+        migrations.AlterField(
+            model_name='eventdiscount',
+            name='event',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='bundesliga_app.Event'),
+        ),
+        migrations.AlterField(
+            model_name='tickettypediscount',
+            name='ticket_type',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='bundesliga_app.EventTicketType'),
+        ),
+        migrations.AddIndex(
+            model_name='discountcode',
+            index=models.Index(fields=['discount_code'], name='bundesliga__discoun_2fc1a7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='discountcode',
+            index=models.Index(fields=['discount', 'discount_code'], name='bundesliga__discoun_cd1166_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'is_active'], name='bundesliga__organiz_d83544_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventtickettype',
+            index=models.Index(fields=['event', 'ticket_id_eb'], name='bundesliga__event_i_40f32b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberdiscountcode',
+            index=models.Index(fields=['member_number', 'status'], name='bundesliga__member__cbbb19_idx'),
+        ),
+        # The active events of an organizer ordered by id, like in the home
+        migrations.RunSQL(
+            [
+                'CREATE INDEX bundesliga_event_active_idx '
+                'ON bundesliga_app_event (organizer_id, id) WHERE is_active',
+            ],
+            ['DROP INDEX bundesliga_event_active_idx'],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The events are filled by batches, so the queries have bounded parameters
+BATCH_SIZE = 500
+
+
+def fill_listing_summaries(apps, schema_editor):
+    """ The events that existed before the summaries are shown with the
+    discounts of our DB, like the ones of get_listing_summary.
+    Their prices are saved by the next sync of the events """
+    from bundesliga_app.utils import get_listing_discounts
+
+    Event = apps.get_model('bundesliga_app', 'Event')
+    EventListingSummary = apps.get_model(
+        'bundesliga_app', 'EventListingSummary')
+    event_ids = list(Event.objects.filter(
+        listing_summary__isnull=True,
+    ).order_by('id').values_list('id', flat=True))
+    for start in range(0, len(event_ids), BATCH_SIZE):
+        batch = event_ids[start:start + BATCH_SIZE]
+        discounts = get_listing_discounts(batch)
+        EventListingSummary.objects.bulk_create([
+            EventListingSummary(event_id=event_id, **discounts[event_id])
+            for event_id in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bundesliga_app', '0005_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fill_listing_summaries,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -38,6 +38,15 @@ def get_mock_event_tickets_api_paid_inverse_position(*args, **kwargs):
     return [MOCK_EVENT_TICKETS_PAID[0][1], MOCK_EVENT_TICKETS_PAID[0][0]]
 
 
+def get_mock_event_tickets_api_by_event(token, event_id, *args, **kwargs):
+    # Paid tickets with a different id for each event
+    MOCK_EVENT_TICKETS_PAID = get_mock_event_tickets_api_paid()
+    for index, ticket in enumerate(MOCK_EVENT_TICKETS_PAID):
+        ticket['id'] = '{}-{}'.format(event_id, index)
+        ticket['event_id'] = event_id
+    return MOCK_EVENT_TICKETS_PAID
+
+
 # Deutscher Sportausweis MOCKS
 # Mock for valid number
 
@@ -141,6 +150,11 @@ MOCK_UPDATE_DISCOUNT_CODE_TO_EB_USES_LEFT = {
     "ticket_group_id": None
 }
 
+def get_mock_event_discounts_api(mock):
+    """ The discounts of an event by code, like get_event_discounts_eb_api """
+    return {discount['code']: discount for discount in mock['discounts']}
+
+
 # Mock get discount code exists in EB - without usage
 MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE = {
     "discounts": [
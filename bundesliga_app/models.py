@@ -12,6 +12,12 @@ class Event(models.Model):
     )
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # The events of an organizer in our app
+            models.Index(fields=['organizer', 'is_active']),
+        ]
+
 
 class EventTicketType(models.Model):
     event = models.ForeignKey(
@@ -19,6 +25,12 @@ class EventTicketType(models.Model):
     )
     ticket_id_eb = models.CharField(max_length=200, unique=True)
 
+    class Meta:
+        indexes = [
+            # The ids of EB of the tickets type of an event
+            models.Index(fields=['event', 'ticket_id_eb']),
+        ]
+
 
 class DiscountType(models.Model):
     name = models.CharField(max_length=200, unique=True)
@@ -32,17 +44,26 @@ class Discount(models.Model):
 
 
 class EventDiscount(Discount):
-    event = models.ForeignKey(Event)
+    # An event has only one discount
+    event = models.OneToOneField(Event)
 
 
 class TicketTypeDiscount(Discount):
-    ticket_type = models.ForeignKey(EventTicketType)
+    # A ticket type has only one discount
+    ticket_type = models.OneToOneField(EventTicketType)
 
 
 class DiscountCode(models.Model):
     discount = models.ForeignKey(Discount)
     discount_code = models.CharField(max_length=500)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['discount_code']),
+            # The codes of a discount
+            models.Index(fields=['discount', 'discount_code']),
+        ]
+
 
 class StatusMemberDiscountCode(models.Model):
     name = models.CharField(max_length=200)
@@ -52,3 +73,30 @@ class MemberDiscountCode(models.Model):
     discount_code = models.ForeignKey(DiscountCode)
     member_number = models.CharField(max_length=200)
     status = models.ForeignKey(StatusMemberDiscountCode)
+
+    class Meta:
+        indexes = [
+            # The codes of a member number with a status
+            models.Index(fields=['member_number', 'status']),
+        ]
+
+
+class EventListingSummary(models.Model):
+    event = models.OneToOneField(
+        Event,
+        on_delete=models.CASCADE,
+        related_name='listing_summary',
+    )
+    # Prices of the tickets type of the event, from EB
+    min_price = models.FloatField(null=True)
+    min_price_display = models.CharField(max_length=200, null=True)
+    max_price = models.FloatField(null=True)
+    max_price_display = models.CharField(max_length=200, null=True)
+    prices_updated = models.DateTimeField(null=True)
+    # Discounts of the event and its tickets type
+    min_discount = models.IntegerField(default=0)
+    max_discount = models.IntegerField(default=0)
+    tickets_discount_available = models.BooleanField(default=False)
+    event_discount = models.IntegerField(default=0)
+    event_discount_available = models.BooleanField(default=False)
+    ticket_count = models.IntegerField(default=0)
@@ -0,0 +1,11 @@
+""" This are the steps of the social auth pipeline of the app """
+from .utils import clear_organization_id
+
+
+def reset_organization_id(backend, user=None, *args, **kwargs):
+    """
+    Each time the organizer logs in with EB, forget the id of its organization
+    so it is loaded again from EB the next time it is needed
+    """
+    if user and backend.name == 'eventbrite':
+        clear_organization_id(user)
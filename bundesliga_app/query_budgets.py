@@ -0,0 +1,207 @@
+""" This is the guard of the queries of the views. A view is measured with
+several sizes of its data, like the events of a page or the ticket types of
+an event, and the queries of each size and how they scale are compared with
+the budget of the view in QUERY_BUDGETS_FILE. Each query is kept with the
+line of the app that made it, so a failure shows where the queries come from.
+The budgets are written again running the tests with QUERY_BUDGETS_UPDATE=1,
+and the reports of all the views are written in the file of QUERY_BUDGETS_REPORT
+"""
+from django.conf import settings
+from django.db import connection
+from collections import Counter
+from contextlib import contextmanager
+from math import log
+import json
+import logging
+import os
+import traceback
+
+QUERY_BUDGETS_FILE = getattr(
+    settings,
+    "QUERY_BUDGETS_FILE",
+    os.path.join(os.path.dirname(__file__), 'query_budgets.json'),
+)
+# The exponent can grow this much before it's a regression
+QUERY_BUDGETS_TOLERANCE = getattr(settings, "QUERY_BUDGETS_TOLERANCE", 0.2)
+# The files of the project that are not call sites of the queries
+IGNORED_FILES = (
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests.py'),
+    os.path.join(settings.BASE_DIR, 'manage.py'),
+)
+# The methods of the cursors that count the queries of the requests
+IGNORED_FRAMES = {
+    (os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils.py'), name)
+    for name in ('execute', 'executemany')
+}
+
+
+def get_call_site(stack):
+    """
+    This method will receive the stack of a query and returns the line
+    of the project that made it, the innermost one that is not a test
+    """
+    for frame in reversed(stack):
+        filename = os.path.abspath(frame.filename)
+        if (filename.startswith(settings.BASE_DIR) and
+                filename not in IGNORED_FILES and
+                (filename, frame.name) not in IGNORED_FRAMES and
+                'site-packages' not in filename):
+            return '{}:{} in {}'.format(
+                os.path.relpath(filename, settings.BASE_DIR),
+                frame.lineno,
+                frame.name,
+            )
+    return 'unknown'
+
+
+class QueryHandler(logging.Handler):
+    """ Keeps the queries logged by the debug cursor with their call site """
+
+    def __init__(self):
+        super(QueryHandler, self).__init__(logging.DEBUG)
+        self.queries = []
+
+    def emit(self, record):
+        self.queries.append({
+            'sql': getattr(record, 'sql', record.getMessage()),
+            'site': get_call_site(traceback.extract_stack()),
+        })
+
+
+@contextmanager
+def record_queries():
+    """ The queries made in the block are kept in a list """
+    logger = logging.getLogger('django.db.backends')
+    handler = QueryHandler()
+    level, propagate = logger.level, logger.propagate
+    force_debug_cursor = connection.force_debug_cursor
+    connection.force_debug_cursor = True
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    try:
+        yield handler.queries
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = propagate
+        connection.force_debug_cursor = force_debug_cursor
+
+
+def scaling_exponent(counts):
+    """
+    This method will receive the queries of each size and returns how
+    they grow with the size: 0 if they are constant, 1 if they grow
+    linearly like an N+1 and 2 if quadratically. It's the slope of
+    the queries over the ones of the first size, in logarithmic scale
+    """
+    sizes = sorted(counts)
+    first = sizes[0]
+    points = [
+        (log(size - first), log(counts[size] - counts[first]))
+        for size in sizes[1:]
+        if counts[size] > counts[first]
+    ]
+    if not points:
+        return 0.0
+    if len(points) == 1:
+        # With only one more size the queries grow linearly at least
+        return points[0][1] / points[0][0] if points[0][0] else 1.0
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, y in points)
+    if not variance:
+        return 1.0
+    return sum(
+        (x - mean_x) * (y - mean_y) for x, y in points
+    ) / variance
+
+
+def top_call_sites(queries, limit=5):
+    """ The call sites that made more queries, with their number """
+    return Counter(query['site'] for query in queries).most_common(limit)
+
+
+def format_report(name, counts, exponent, queries):
+    """ The report of the queries of a view, by size and by call site """
+    lines = ['{}: exponent {:.2f}, queries by size {}'.format(
+        name,
+        exponent,
+        ', '.join('{}: {}'.format(size, counts[size]) for size in sorted(counts)),
+    )]
+    lines.append('Top call sites of the largest size:')
+    for site, count in top_call_sites(queries):
+        lines.append('  {:>4} {}'.format(count, site))
+    return '\n'.join(lines)
+
+
+def load_budgets(path=QUERY_BUDGETS_FILE):
+    try:
+        with open(path) as budgets_file:
+            return json.load(budgets_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_budget(name, counts, exponent, path=QUERY_BUDGETS_FILE):
+    """ Write the budget of a view in the file, with the other ones """
+    budgets = load_budgets(path)
+    budgets[name] = {
+        'exponent': round(exponent, 2),
+        'queries': {str(size): count for size, count in sorted(counts.items())},
+    }
+    with open(path, 'w') as budgets_file:
+        json.dump(budgets, budgets_file, indent=4, sort_keys=True)
+        budgets_file.write('\n')
+
+
+class QueryBudgetMixin(object):
+    """
+    This mixin of the tests checks that the queries of a view
+    do not exceed its budget, nor grow faster with the size of its data
+    """
+
+    query_budgets_file = QUERY_BUDGETS_FILE
+
+    def measure_queries(self, prepare, sizes):
+        """
+        This method will receive a function that creates the data of a size
+        and returns the request to measure, and the sizes.
+        It returns the count of queries of each size
+        and the queries of the largest one
+        """
+        # The data loaded once by process, like the lookups, is not measured
+        prepare(min(sizes))()
+        counts = {}
+        for size in sorted(sizes):
+            request = prepare(size)
+            with record_queries() as queries:
+                request()
+            counts[size] = len(queries)
+        return counts, queries
+
+    def assertQueryBudget(self, name, prepare, sizes=(1, 2, 4)):
+        counts, queries = self.measure_queries(prepare, sizes)
+        exponent = scaling_exponent(counts)
+        report = format_report(name, counts, exponent, queries)
+        if os.environ.get('QUERY_BUDGETS_REPORT'):
+            with open(os.environ['QUERY_BUDGETS_REPORT'], 'a') as report_file:
+                report_file.write(report + '\n\n')
+        if os.environ.get('QUERY_BUDGETS_UPDATE'):
+            save_budget(name, counts, exponent, self.query_budgets_file)
+            return
+        budget = load_budgets(self.query_budgets_file).get(name)
+        if budget is None:
+            self.fail(
+                'There is no query budget of {}, run the tests with '
+                'QUERY_BUDGETS_UPDATE=1 to record it\n{}'.format(name, report)
+            )
+        if exponent > budget['exponent'] + QUERY_BUDGETS_TOLERANCE:
+            self.fail('The queries grow faster than the exponent {} '
+                      'of the budget\n{}'.format(budget['exponent'], report))
+        for size, count in sorted(counts.items()):
+            budget_count = budget['queries'].get(str(size))
+            if budget_count is not None and count > budget_count:
+                self.fail('{} queries with size {}, the budget is {}\n{}'.format(
+                    count, size, budget_count, report))
@@ -0,0 +1,82 @@
+""" This are the receivers that keep the listing summary of the events,
+the versions of the pages of the organizers and the lookups updated,
+and the one that counts the queries of each connection """
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import (
+    DiscountType,
+    Event,
+    EventDiscount,
+    EventListingSummary,
+    EventTicketType,
+    StatusMemberDiscountCode,
+    TicketTypeDiscount,
+)
+from .utils import (
+    clear_lookups,
+    content_signals_paused,
+    count_connection_queries,
+    invalidate_event_pages,
+    refresh_listing_summary,
+)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def event_changed(sender, instance, **kwargs):
+    if content_signals_paused():
+        return
+    invalidate_event_pages(instance.id, instance.organizer_id)
+
+
+@receiver(post_save, sender=Event)
+def event_created(sender, instance, created, **kwargs):
+    # The prices of the summary are saved by the sync of the events
+    if created:
+        EventListingSummary.objects.get_or_create(event=instance)
+
+
+@receiver(post_save, sender=EventDiscount)
+@receiver(post_delete, sender=EventDiscount)
+def event_discount_changed(sender, instance, **kwargs):
+    if content_signals_paused():
+        return
+    refresh_listing_summary(instance.event_id)
+    invalidate_event_pages(instance.event_id)
+
+
+@receiver(post_save, sender=TicketTypeDiscount)
+@receiver(post_delete, sender=TicketTypeDiscount)
+def ticket_type_discount_changed(sender, instance, **kwargs):
+    if content_signals_paused():
+        return
+    # The ticket type could be already deleted
+    event_id = EventTicketType.objects.filter(
+        id=instance.ticket_type_id,
+    ).values_list('event_id', flat=True).first()
+    if event_id:
+        refresh_listing_summary(event_id)
+        invalidate_event_pages(event_id)
+
+
+@receiver(post_save, sender=EventTicketType)
+@receiver(post_delete, sender=EventTicketType)
+def ticket_type_changed(sender, instance, **kwargs):
+    if content_signals_paused():
+        return
+    refresh_listing_summary(instance.event_id, reset_prices=True)
+    invalidate_event_pages(instance.event_id)
+
+
+@receiver(post_save, sender=DiscountType)
+@receiver(post_delete, sender=DiscountType)
+@receiver(post_save, sender=StatusMemberDiscountCode)
+@receiver(post_delete, sender=StatusMemberDiscountCode)
+def lookup_changed(sender, **kwargs):
+    clear_lookups(sender)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    count_connection_queries(connection)
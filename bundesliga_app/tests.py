@@ -1,6 +1,7 @@
 from django.test import (
     TestCase,
     RequestFactory,
+    override_settings,
 )
 from .factories import (
     AuthFactory,
@@ -14,34 +15,98 @@ from .factories import (
     DiscountTypeFactory,
 )
 from django.views.generic.base import TemplateView
-from mock import patch
+from django.contrib.messages import get_messages
+from mock import MagicMock, patch
 from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
 from urllib.parse import urlencode
 from bundesliga_app.apps import BundesligaAppConfig
 from bundesliga_app.utils import (
+    DS_API_TIMEOUT,
+    DS_CACHE_STATS,
     EventAccessMixin,
     DiscountAccessMixin,
     check_discount_code_in_eb,
+    clear_organization_id,
+    close_eb_clients,
+    fetch_event_tickets_bulk,
+    fetch_events_bulk,
     get_auth_token,
+    get_cached_eb_api,
+    get_ds_cache_stats,
+    get_eb_client,
+    get_eb_pool_stats,
+    get_events_tickets_type,
+    get_listing_summary,
+    get_organizer_pages_version,
+    get_organization_id,
     get_user_eb_api,
     get_events_user_eb_api,
+    get_events_user_import,
+    import_events_user_eb_api,
+    get_event_discounts_eb_api,
     get_event_eb_api,
     get_venue_eb_api,
     get_event_tickets_eb_api,
+    request_member_number_ds,
+    invalidate_organizer_pages,
     post_ticket_discount_code_to_eb,
     post_event_discount_code_to_eb,
+    reconcile_organizer_events,
+    sync_organizer_events,
+    call_bulk_eb_api,
+    get_eb_endpoint,
+    record_api_call,
+    record_cache_use,
+    refresh_cached_eb_api,
+    refresh_listing_summary,
+    set_cached_eb_api,
+    update_listing_summaries,
     validate_member_number_ds,
+    validate_member_numbers_ds,
+    warm_lookups,
+    LOOKUPS,
+    clear_lookups,
+    get_lookup,
 )
 from .models import (
     DiscountCode,
     DiscountType,
     EventDiscount,
     Event,
+    EventListingSummary,
     EventTicketType,
     MemberDiscountCode,
     StatusMemberDiscountCode,
     TicketTypeDiscount,
 )
+from bundesliga_app.pipeline import reset_organization_id
+from bundesliga_app.urls import urlpatterns
+from bundesliga_app.views import EventDiscountsView, HomeView
+from bundesliga_app import metrics
+from bundesliga_app.fake_apis import FakeAPIsServer, FIRST_EVENT_ID, TICKETS
+from bundesliga_app.query_budgets import (
+    QueryBudgetMixin,
+    load_budgets,
+    record_queries,
+    save_budget,
+    scaling_exponent,
+    top_call_sites,
+)
+from bundesliga_app.bench import (
+    compare,
+    make_baseline,
+    percentile,
+    record_requests,
+    run_bench,
+    seed,
+    summarize,
+    use_fake_apis,
+)
+from bundesliga_site.middleware import (
+    EventbriteTokenMiddleware,
+    RequestStatsMiddleware,
+)
 from bundesliga_app.mocks import (
     MOCK_DELETE_DISCOUNT_EB,
     MOCK_DISCOUNT_DOESNT_EXIST_IN_EB,
@@ -62,18 +127,61 @@ from bundesliga_app.mocks import (
     get_mock_events_api,
     get_mock_event_api_without_venue,
     get_mock_event_api_free,
+    get_mock_event_discounts_api,
+    get_mock_event_tickets_api_by_event,
     get_mock_event_tickets_api_free,
     get_mock_event_tickets_api_paid,
     get_mock_event_tickets_api_paid_inverse_position,
 )
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.core.exceptions import PermissionDenied
+import copy
 import datetime
+import importlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+import time
+from requests.exceptions import Timeout
 from django.conf import settings
-
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from io import StringIO
+from social_core.backends.eventbrite import EventbriteOAuth2
+
+DUMMY_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
 
 # Create your tests here.
 
+REQUESTS_LOGGER = logging.getLogger('bundesliga_app.requests')
+REQUESTS_HANDLERS = []
+
+
+def setUpModule():
+    # The line of each request is not shown in the output of the tests,
+    # the tests of the line assert it with assertLogs
+    REQUESTS_HANDLERS[:] = REQUESTS_LOGGER.handlers
+    REQUESTS_LOGGER.handlers = [logging.NullHandler()]
+
+
+def tearDownModule():
+    REQUESTS_LOGGER.handlers = REQUESTS_HANDLERS[:]
+
 
 class BundesligaAppConfigTest(TestCase):
     def test_apps(self):
@@ -84,6 +192,7 @@ class BundesligaAppConfigTest(TestCase):
         )
 
 
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
 class TestBase(TestCase):
     def setUp(self):
         self.organizer = OrganizerFactory()
@@ -95,12 +204,6 @@ class TestBase(TestCase):
             username=self.auth.user.username,
             password='12345',
         )
-        setattr(settings, "CACHES", {
-            'default': {
-                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-            }
-        })
-        setattr(settings, "CACHE_TTL", 0)
         return login
 
 
@@ -121,9 +224,309 @@ class AuthTokenTest(TestBase):
             'UserSocialAuth does not exists!'
         )
 
+    def test_get_auth_token_loaded_once(self):
+        token = get_auth_token(self.organizer)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_auth_token(self.organizer), token)
+
+    def test_get_auth_token_invalid_user_loaded_once(self):
+        no_log_organizer = OrganizerFactory()
+        get_auth_token(no_log_organizer)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_auth_token(no_log_organizer),
+                'UserSocialAuth does not exists!'
+            )
+
+    def test_middleware_set_auth_token(self):
+        request = RequestFactory().get('/')
+        request.user = self.organizer
+        EventbriteTokenMiddleware(lambda request: None)(request)
+        self.assertEqual(
+            request.eb_auth_token,
+            self.auth.access_token,
+        )
+        self.assertEqual(
+            request.user.eb_auth_token,
+            self.auth.access_token,
+        )
+
+    def test_middleware_auth_token_is_lazy(self):
+        request = RequestFactory().get('/')
+        request.user = self.organizer
+        with self.assertNumQueries(0):
+            EventbriteTokenMiddleware(lambda request: None)(request)
+        self.assertFalse(hasattr(request.user, 'eb_auth_token'))
+
+    def test_middleware_auth_token_anonymous_user(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        EventbriteTokenMiddleware(lambda request: None)(request)
+        self.assertEqual(request.eb_auth_token, None)
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class RequestStatsMiddlewareTest(TestCase):
+    def get_response(self, request):
+        # The queries are counted without keeping their SQL
+        self.queries_logged = connection.queries_logged
+        list(Event.objects.all())
+        list(Event.objects.all())
+        start = time.time()
+
+        def call(user, id):
+            list(Event.objects.filter(event_id=id))
+            record_api_call(
+                'eb', start, get_eb_endpoint('/v3/events/{}/?expand=venue'.format(id)))
+        # The calls and queries made in the pool of threads are counted too
+        call_bulk_eb_api(call, 'USER', ['1', '2'])
+        record_api_call('ds', start)
+        record_cache_use(True, 'event-1')
+        record_cache_use(False, 'event-2')
+        return HttpResponse()
+
+    def test_server_timing_header(self):
+        request = RequestFactory().get('/')
+        with self.assertLogs('bundesliga_app.requests', 'INFO') as logs:
+            response = RequestStatsMiddleware(self.get_response)(request)
+        self.assertFalse(self.queries_logged)
+        timing = response['Server-Timing']
+        self.assertIn('desc="4 queries"', timing)
+        self.assertIn('eb;dur=', timing)
+        self.assertIn('desc="2 calls"', timing)
+        self.assertIn('desc="1 calls"', timing)
+        self.assertIn('cache;desc="1 hits, 1 misses"', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['db']['count'], 4)
+        self.assertEqual(line['eb']['endpoints'], {'/v3/events/{id}/': 2})
+        self.assertEqual(line['cache'], {'hits': 1, 'misses': 1})
+        self.assertEqual(line['over_budget'], [])
+
+    @override_settings(REQUEST_BUDGETS={'db': 1, 'eb': 2, 'time': 10})
+    def test_request_over_budget(self):
+        request = RequestFactory().get('/')
+        with self.assertLogs('bundesliga_app.requests', 'INFO') as logs:
+            RequestStatsMiddleware(self.get_response)(request)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual(
+            json.loads(logs.records[0].getMessage())['over_budget'],
+            ['db'],
+        )
+
+    def test_calls_out_of_request_not_counted(self):
+        record_api_call('eb', time.time(), '/v3/users/me/')
+        record_cache_use(True, 'event-1')
+        request = RequestFactory().get('/')
+        response = RequestStatsMiddleware(lambda request: HttpResponse())(request)
+        self.assertIn('eb;dur=0.0;desc="0 calls"', response['Server-Timing'])
+
+    def test_get_eb_endpoint(self):
+        self.assertEqual(
+            get_eb_endpoint(
+                'https://www.eventbriteapi.com/v3/organizations/123/discounts/?event_id=1'),
+            '/v3/organizations/{id}/discounts/',
+        )
+        self.assertEqual(get_eb_endpoint('/v3/users/me/'), '/v3/users/me/')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get_value(self, metric, **labels):
+        key = metric._key(labels)
+        return metric.values.get(key, 0)
+
+    def test_cache_requests_by_family(self):
+        misses = self.get_value(metrics.CACHE_REQUESTS, family='venue', result='miss')
+        hits = self.get_value(metrics.CACHE_REQUESTS, family='venue', result='hit')
+        fetch = MagicMock(return_value={'id': '1'})
+        get_cached_eb_api('venue-1', fetch, 60)
+        get_cached_eb_api('venue-1', fetch, 60)
+        self.assertEqual(
+            self.get_value(metrics.CACHE_REQUESTS, family='venue', result='miss'),
+            misses + 1,
+        )
+        self.assertEqual(
+            self.get_value(metrics.CACHE_REQUESTS, family='venue', result='hit'),
+            hits + 1,
+        )
+
+    @patch('bundesliga_app.utils.Thread')
+    @patch('bundesliga_app.utils.get_eb_client')
+    def test_cache_requests_of_bulk_fetch(self, mock_get_eb_client, mock_thread):
+        mock_get_eb_client.return_value.get.return_value = {'id': '3'}
+        misses = self.get_value(metrics.CACHE_REQUESTS, family='event', result='miss')
+        hits = self.get_value(metrics.CACHE_REQUESTS, family='event', result='hit')
+        set_cached_eb_api('event-1', {'id': '1'}, 60)
+        # The stale value is served while it is refreshed
+        cache.set('event-2', {'value': {'id': '2'}, 'fresh_until': time.time() - 1})
+        fetch_events_bulk('TEST', ['1', '2', '3'])
+        self.assertEqual(
+            self.get_value(metrics.CACHE_REQUESTS, family='event', result='miss'),
+            misses + 1,
+        )
+        self.assertEqual(
+            self.get_value(metrics.CACHE_REQUESTS, family='event', result='hit'),
+            hits + 2,
+        )
+
+    @patch('bundesliga_app.utils.Session.request', side_effect=Timeout)
+    def test_ds_validation_errors(self, mock_api_call):
+        errors = self.get_value(metrics.DS_VALIDATIONS, result='error')
+        count = metrics.DS_REQUEST_DURATION.values.get((), {}).get('count', 0)
+        validate_member_number_ds('1')
+        self.assertEqual(
+            self.get_value(metrics.DS_VALIDATIONS, result='error'),
+            errors + 1,
+        )
+        self.assertEqual(
+            metrics.DS_REQUEST_DURATION.values[()]['count'],
+            count + 1,
+        )
+
+    def test_render_histogram(self):
+        text = metrics.render({
+            'test_seconds': {
+                'type': 'histogram',
+                'help': 'Test',
+                'labels': ['endpoint'],
+                'buckets': [0.1, 1],
+                'values': [[['/v3/"me"/'], {'buckets': [1, 2], 'sum': 0.6, 'count': 3}]],
+            },
+        })
+        self.assertEqual(
+            text,
+            '# HELP test_seconds Test\n'
+            '# TYPE test_seconds histogram\n'
+            'test_seconds_bucket{endpoint="/v3/\\"me\\"/",le="0.1"} 1\n'
+            'test_seconds_bucket{endpoint="/v3/\\"me\\"/",le="1"} 2\n'
+            'test_seconds_bucket{endpoint="/v3/\\"me\\"/",le="+Inf"} 3\n'
+            'test_seconds_sum{endpoint="/v3/\\"me\\"/"} 0.6\n'
+            'test_seconds_count{endpoint="/v3/\\"me\\"/"} 3\n'
+        )
+
+    def _write_process_file(self, metrics_dir, pid, values):
+        path = os.path.join(metrics_dir, 'metrics-{}-1.json'.format(pid))
+        with open(path, 'w') as metrics_file:
+            json.dump(values, metrics_file)
+
+    def _get_finished_pid(self):
+        process = subprocess.Popen(['true'])
+        process.wait()
+        return process.pid
+
+    def test_collect_metrics_of_all_processes(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, \
+                patch('bundesliga_app.metrics.METRICS_DIR', metrics_dir):
+            own = metrics.dump_registry()
+            # The file of another worker with the same values
+            self._write_process_file(metrics_dir, os.getppid(), own)
+            collected = metrics.collect()
+            self.assertIn(
+                os.path.basename(metrics.get_metrics_path()),
+                os.listdir(metrics_dir),
+            )
+            self.assertIn(
+                'metrics-{}-1.json'.format(os.getppid()),
+                os.listdir(metrics_dir),
+            )
+        for key, value in own['cache_requests_total']['values']:
+            self.assertIn(
+                [key, value * 2],
+                collected['cache_requests_total']['values'],
+            )
+
+    def test_collect_archives_finished_processes(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, \
+                patch('bundesliga_app.metrics.METRICS_DIR', metrics_dir):
+            metrics.DISCOUNT_CODES_GENERATED.inc(0)
+            own = metrics.dump_registry()
+            # A finished worker, and a finished one with the pid of this one
+            self._write_process_file(metrics_dir, self._get_finished_pid(), own)
+            self._write_process_file(metrics_dir, os.getpid(), own)
+            collected = metrics.collect()
+            self.assertEqual(
+                sorted(
+                    file_name for file_name in os.listdir(metrics_dir)
+                    if file_name.endswith('.json')
+                ),
+                sorted([
+                    metrics.ARCHIVE_FILE_NAME,
+                    os.path.basename(metrics.get_metrics_path()),
+                ]),
+            )
+            # The archived values are counted once
+            self.assertEqual(metrics.collect(), collected)
+        count = dict(
+            (tuple(key), value)
+            for key, value in own['discount_codes_generated_total']['values']
+        )[()]
+        self.assertEqual(
+            collected['discount_codes_generated_total']['values'],
+            [[[], count * 3]],
+        )
+
+    def test_flush_errors_are_not_raised(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, \
+                patch('bundesliga_app.metrics.METRICS_DIR', metrics_dir), \
+                patch('bundesliga_app.metrics.os.replace', side_effect=OSError):
+            metrics.flush()
+            # The temporary file is removed
+            self.assertEqual(os.listdir(metrics_dir), [])
+        with tempfile.NamedTemporaryFile() as metrics_file, \
+                patch('bundesliga_app.metrics.METRICS_DIR', metrics_file.name):
+            metrics.DISCOUNT_CODES_GENERATED.inc(0)
+            metrics.flush()
+
+    def test_maybe_flush_while_flushing(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, \
+                patch('bundesliga_app.metrics.METRICS_DIR', metrics_dir), \
+                patch.dict(metrics.LAST_FLUSH, {'time': 0}):
+            with metrics.FLUSH_LOCK:
+                metrics.maybe_flush()
+            self.assertEqual(os.listdir(metrics_dir), [])
+            metrics.maybe_flush()
+            self.assertIn(
+                os.path.basename(metrics.get_metrics_path()),
+                os.listdir(metrics_dir),
+            )
+
+    def test_metrics_view_forbidden(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='TOKEN')
+    def test_metrics_view(self):
+        self.client.get('/metrics/')
+        response = self.client.get(
+            '/metrics/',
+            HTTP_AUTHORIZATION='Bearer TOKEN',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(
+            response,
+            '# TYPE eb_request_duration_seconds histogram',
+        )
+        self.assertContains(
+            response,
+            'view_duration_seconds_count{view="metrics"}',
+        )
+
 
-@patch('bundesliga_app.utils.Eventbrite.get', return_value={})
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
+@patch('bundesliga_app.utils.PooledEventbrite.get', return_value={})
 class UtilsApiEBTest(TestCase):
+    def setUp(self):
+        self.organizer = OrganizerFactory()
+        AuthFactory(
+            provider='eventbrite',
+            user=self.organizer,
+        )
 
     def test_get_user_eb_api(self, mock_api_call):
         get_user_eb_api('TEST')
@@ -174,7 +577,7 @@ class UtilsApiEBTest(TestCase):
 
     @patch('bundesliga_app.utils.get_user_eb_api', return_value=MOCK_USER_API)
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
-    @patch('bundesliga_app.utils.get_auth_token', return_value={})
+    @patch('bundesliga_app.utils.get_auth_token', return_value='TEST')
     def test_check_discount_code_in_eb(self,
                                        mock_get_auth_token,
                                        mock_check_discount_code_in_eb,
@@ -182,15 +585,51 @@ class UtilsApiEBTest(TestCase):
                                        mock_api_get_call
                                        ):
 
-        result = check_discount_code_in_eb('TEST', '1', '1')
+        result = check_discount_code_in_eb(self.organizer, '1', '1')
         self.assertEquals(
             mock_api_get_call.call_args_list[0][0][0],
             '/organizations/1234/discounts/?scope=event&event_id=1&code=1'
         )
 
-    @patch('bundesliga_app.utils.Eventbrite.post', return_value={'id': '1'})
+    @patch('bundesliga_app.utils.get_user_eb_api', return_value=MOCK_USER_API)
+    @patch('bundesliga_app.utils.get_auth_token', return_value='TEST')
+    def test_get_event_discounts_eb_api(self,
+                                        mock_get_auth_token,
+                                        mock_get_user_eb_api,
+                                        mock_api_get_call
+                                        ):
+        first_page = dict(
+            MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE,
+            pagination={'has_more_items': True, 'continuation': 'abc'},
+        )
+        second_discount = dict(
+            MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0],
+            code='other code',
+        )
+        second_page = {
+            'discounts': [second_discount],
+            'pagination': {'has_more_items': False},
+        }
+        mock_api_get_call.side_effect = [first_page, second_page]
+        result = get_event_discounts_eb_api(self.organizer, '1')
+        self.assertEquals(
+            [call[0][0] for call in mock_api_get_call.call_args_list],
+            [
+                '/organizations/1234/discounts/?scope=event&event_id=1',
+                '/organizations/1234/discounts/?scope=event&event_id=1&continuation=abc',
+            ]
+        )
+        self.assertEquals(
+            result,
+            {
+                '5680302082': MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE['discounts'][0],
+                'other code': second_discount,
+            }
+        )
+
+    @patch('bundesliga_app.utils.PooledEventbrite.post', return_value={'id': '1'})
     @patch('bundesliga_app.views.get_user_eb_api', return_value=MOCK_USER_API)
-    @patch('bundesliga_app.utils.get_auth_token', return_value={})
+    @patch('bundesliga_app.utils.get_auth_token', return_value='TEST')
     def test_post_ticket_discount_code_to_eb(
         self,
         mock_get_auth_token,
@@ -199,13 +638,13 @@ class UtilsApiEBTest(TestCase):
         mock_api_get_call
     ):
         mock_api_get_call.return_value = {'id': 1}
-        result = post_ticket_discount_code_to_eb('TEST', '1', '1', '20', '1', '1')
+        result = post_ticket_discount_code_to_eb(self.organizer, '1', '1', '20', '1', '1')
         mock_api_post_call.assert_called_once()
         self.assertEquals(result['id'], '1')
 
-    @patch('bundesliga_app.utils.Eventbrite.post', return_value={'id': '1'})
+    @patch('bundesliga_app.utils.PooledEventbrite.post', return_value={'id': '1'})
     @patch('bundesliga_app.views.get_user_eb_api', return_value=MOCK_USER_API)
-    @patch('bundesliga_app.utils.get_auth_token', return_value={})
+    @patch('bundesliga_app.utils.get_auth_token', return_value='TEST')
     def test_post_event_discount_code_to_eb(
         self,
         mock_get_auth_token,
@@ -214,13 +653,575 @@ class UtilsApiEBTest(TestCase):
         mock_api_get_call
     ):
         mock_api_get_call.return_value = {'id': 1}
-        result = post_event_discount_code_to_eb('TEST', '1', '1', '20', '1')
+        result = post_event_discount_code_to_eb(self.organizer, '1', '1', '20', '1')
         mock_api_post_call.assert_called_once()
         self.assertEquals(result['id'], '1')
 
 
+@override_settings(CACHES=LOCMEM_CACHE)
+@patch('bundesliga_app.utils.get_user_eb_api', return_value=MOCK_USER_API)
+class OrganizationIdTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = OrganizerFactory()
+        self.auth = AuthFactory(
+            provider='eventbrite',
+            user=self.organizer,
+        )
+
+    def test_get_organization_id(self, mock_get_user_eb_api):
+        self.assertEqual(
+            get_organization_id(self.organizer),
+            MOCK_USER_API['id'],
+        )
+        self.auth.refresh_from_db()
+        self.assertEqual(
+            self.auth.extra_data['organization_id'],
+            MOCK_USER_API['id'],
+        )
+
+    def _get_lookups(self, result):
+        return metrics.ORGANIZATION_ID_LOOKUPS.values.get((result,), 0)
+
+    def test_get_organization_id_only_once(self, mock_get_user_eb_api):
+        avoided = self._get_lookups('avoided')
+        fetched = self._get_lookups('fetched')
+        for i in range(3):
+            get_organization_id(self.organizer)
+        mock_get_user_eb_api.assert_called_once()
+        self.assertEqual(self._get_lookups('avoided') - avoided, 2)
+        self.assertEqual(self._get_lookups('fetched') - fetched, 1)
+
+    def test_get_organization_id_counts_concurrent_lookups(
+            self, mock_get_user_eb_api):
+        get_organization_id(self.organizer)
+        avoided = self._get_lookups('avoided')
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(
+                lambda number: get_organization_id(self.organizer),
+                range(40),
+            ))
+        self.assertEqual(self._get_lookups('avoided') - avoided, 40)
+
+    def test_get_organization_id_from_extra_data(self, mock_get_user_eb_api):
+        self.auth.extra_data['organization_id'] = '999'
+        self.auth.save()
+        self.assertEqual(get_organization_id(self.organizer), '999')
+        mock_get_user_eb_api.assert_not_called()
+
+    def test_clear_organization_id(self, mock_get_user_eb_api):
+        get_organization_id(self.organizer)
+        clear_organization_id(self.organizer)
+        self.auth.refresh_from_db()
+        self.assertNotIn('organization_id', self.auth.extra_data)
+        get_organization_id(self.organizer)
+        self.assertEqual(mock_get_user_eb_api.call_count, 2)
+
+    def test_login_reset_organization_id(self, mock_get_user_eb_api):
+        get_organization_id(self.organizer)
+        backend = EventbriteOAuth2()
+        reset_organization_id(backend, user=self.organizer)
+        get_organization_id(self.organizer)
+        self.assertEqual(mock_get_user_eb_api.call_count, 2)
+
+    @patch('bundesliga_app.utils.PooledEventbrite.get', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE)
+    def test_check_discount_code_in_eb_without_users_me(
+        self,
+        mock_api_get_call,
+        mock_get_user_eb_api,
+    ):
+        for i in range(3):
+            check_discount_code_in_eb(self.organizer, '1', 'code')
+        mock_get_user_eb_api.assert_called_once()
+        self.assertEqual(mock_api_get_call.call_count, 3)
+
+
+class EventbriteClientPoolTest(TestCase):
+    def setUp(self):
+        close_eb_clients()
+        self.stats = get_eb_pool_stats()
+
+    def tearDown(self):
+        close_eb_clients()
+
+    def test_same_token_reuse_client(self):
+        client = get_eb_client('TEST')
+        self.assertIs(get_eb_client('TEST'), client)
+        stats = get_eb_pool_stats()
+        self.assertEqual(stats['misses'] - self.stats['misses'], 1)
+        self.assertEqual(stats['hits'] - self.stats['hits'], 1)
+        self.assertEqual(stats['clients'], 1)
+
+    def test_different_tokens_different_clients(self):
+        self.assertIsNot(get_eb_client('TEST'), get_eb_client('OTHER'))
+        stats = get_eb_pool_stats()
+        self.assertEqual(stats['misses'] - self.stats['misses'], 2)
+        self.assertEqual(stats['clients'], 2)
+
+    def test_idle_client_is_replaced(self):
+        client = get_eb_client('TEST')
+        client.last_used -= settings.EB_POOL_IDLE_TIMEOUT + 1
+        self.assertIsNot(get_eb_client('TEST'), client)
+        self.assertEqual(get_eb_pool_stats()['clients'], 1)
+
+    def test_old_client_is_replaced(self):
+        client = get_eb_client('TEST')
+        client.created_at -= settings.EB_POOL_MAX_LIFETIME + 1
+        self.assertIsNot(get_eb_client('TEST'), client)
+
+    @patch('bundesliga_app.utils.Session.get')
+    def test_client_uses_keep_alive_session(self, mock_session_get):
+        mock_session_get.return_value.json.return_value = {'id': '1'}
+        get_eb_client('TEST').get('/users/me/')
+        mock_session_get.assert_called_once()
+        self.assertEqual(
+            mock_session_get.call_args[0][0],
+            'https://www.eventbriteapi.com/v3/users/me/',
+        )
+        self.assertEqual(
+            mock_session_get.call_args[1]['headers']['Authorization'],
+            'Bearer TEST',
+        )
+
+
+    @patch('bundesliga_app.utils.Session.delete')
+    @patch('bundesliga_app.utils.Session.post')
+    @patch('bundesliga_app.utils.Session.get')
+    def test_client_calls_have_timeout(self, *mock_session_calls):
+        for mock_session_call in mock_session_calls:
+            mock_session_call.return_value.json.return_value = {'id': '1'}
+        client = get_eb_client('TEST')
+        client.get('/users/me/')
+        client.post('/discounts/', {'discount': {}})
+        client.delete('/discounts/1/')
+        for mock_session_call in mock_session_calls:
+            self.assertEqual(
+                mock_session_call.call_args[1]['timeout'],
+                settings.EB_API_TIMEOUT,
+            )
+
+
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
+class FetchBulkEBTest(TestCase):
+
+    @patch('bundesliga_app.utils.get_event_eb_api')
+    def test_fetch_events_bulk_keeps_order(self, mock_get_event_eb_api):
+        mock_get_event_eb_api.side_effect = lambda token, event_id: {
+            'id': event_id,
+        }
+        events = fetch_events_bulk('TEST', ['3', '1', '2'])
+        self.assertEqual(
+            [event['id'] for event in events],
+            ['3', '1', '2'],
+        )
+        self.assertEqual(mock_get_event_eb_api.call_count, 3)
+
+    @patch('bundesliga_app.utils.get_event_eb_api')
+    def test_fetch_events_bulk_fetch_repeated_once(self, mock_get_event_eb_api):
+        mock_get_event_eb_api.side_effect = lambda token, event_id: {
+            'id': event_id,
+        }
+        events = fetch_events_bulk('TEST', ['1', '1'])
+        self.assertEqual(len(events), 2)
+        mock_get_event_eb_api.assert_called_once_with('TEST', '1')
+
+    @patch('bundesliga_app.utils.get_event_eb_api')
+    def test_fetch_events_bulk_concurrently(self, mock_get_event_eb_api):
+        def slow_event(token, event_id):
+            time.sleep(0.2)
+            return {'id': event_id}
+        mock_get_event_eb_api.side_effect = slow_event
+        start = time.time()
+        fetch_events_bulk('TEST', ['1', '2', '3', '4'])
+        self.assertLess(time.time() - start, 0.6)
+
+    @patch('bundesliga_app.utils.get_event_eb_api')
+    def test_fetch_events_bulk_deadline(self, mock_get_event_eb_api):
+        def slow_event(token, event_id):
+            if event_id == '2':
+                time.sleep(0.5)
+            return {'id': event_id}
+        mock_get_event_eb_api.side_effect = slow_event
+        events = fetch_events_bulk('TEST', ['1', '2'], deadline=0.1)
+        self.assertEqual(events[0], {'id': '1'})
+        self.assertIsNone(events[1])
+
+    @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=MOCK_EVENT_TICKETS[0])
+    def test_fetch_event_tickets_bulk(self, mock_get_event_tickets_eb_api):
+        tickets = fetch_event_tickets_bulk('TEST', ['1', '2'])
+        self.assertEqual(tickets, [MOCK_EVENT_TICKETS[0], MOCK_EVENT_TICKETS[0]])
+        self.assertEqual(mock_get_event_tickets_eb_api.call_count, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CachedEBTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fetch = MagicMock(return_value={'id': '1'})
+
+    def set_stale(self, key, value):
+        cache.set(key, {'value': value, 'fresh_until': time.time() - 1})
+
+    def test_fresh_value_fetched_once(self):
+        get_cached_eb_api('event-1', self.fetch, 60)
+        result = get_cached_eb_api('event-1', self.fetch, 60)
+        self.fetch.assert_called_once()
+        self.assertEqual(result, {'id': '1'})
+        self.assertFalse(cache.get('event-1-lock'))
+
+    @patch('bundesliga_app.utils.EB_CACHE_JITTER', 0.1)
+    def test_jittered_soft_ttl(self):
+        start = time.time()
+        set_cached_eb_api('event-1', {'id': '1'}, 100)
+        fresh_until = cache.get('event-1')['fresh_until']
+        self.assertGreaterEqual(fresh_until, start + 90)
+        self.assertLessEqual(fresh_until, time.time() + 100)
+
+    @patch('bundesliga_app.utils.Thread')
+    def test_stale_value_served_and_refreshed_once(self, mock_thread):
+        self.set_stale('event-1', {'id': 'old'})
+        first = get_cached_eb_api('event-1', self.fetch, 60)
+        second = get_cached_eb_api('event-1', self.fetch, 60)
+        self.assertEqual(first, {'id': 'old'})
+        self.assertEqual(second, {'id': 'old'})
+        self.fetch.assert_not_called()
+        mock_thread.assert_called_once_with(
+            target=refresh_cached_eb_api,
+            args=('event-1', self.fetch, 60),
+            daemon=True,
+        )
+
+    def test_refresh_releases_lock(self):
+        self.set_stale('event-1', {'id': 'old'})
+        cache.add('event-1-lock', True)
+        refresh_cached_eb_api('event-1', self.fetch, 60)
+        self.assertEqual(get_cached_eb_api('event-1', self.fetch, 60), {'id': '1'})
+        self.assertIsNone(cache.get('event-1-lock'))
+
+    @patch('bundesliga_app.utils.EB_CACHE_LOCK_WAIT', 0.1)
+    def test_miss_with_lock_taken_waits_then_fetches(self):
+        cache.add('event-1-lock', True)
+        result = get_cached_eb_api('event-1', self.fetch, 60)
+        self.fetch.assert_called_once()
+        self.assertEqual(result, {'id': '1'})
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class CallBulkEBTest(TestCase):
+    def test_call_bulk_eb_api_concurrently(self):
+        def call(user, id):
+            time.sleep(0.2)
+            return {'id': id}
+        start = time.time()
+        results = call_bulk_eb_api(call, 'USER', ['1', '2', '3', '4'])
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(
+            results,
+            {id: {'id': id} for id in ['1', '2', '3', '4']},
+        )
+
+    def test_call_bulk_eb_api_deadline_and_errors(self):
+        def call(user, id):
+            if id == 'slow':
+                time.sleep(0.5)
+            if id == 'error':
+                raise Exception('EB is down')
+            return {'id': id}
+        results = call_bulk_eb_api(
+            call, 'USER', ['1', 'slow', 'error'], deadline=0.1)
+        self.assertEqual(
+            results,
+            {'1': {'id': '1'}, 'slow': None, 'error': None},
+        )
+
+    def test_call_bulk_eb_api_closes_connections(self):
+        def call(user, id):
+            return id
+        # Each thread of the pool closes its connection to the DB
+        with patch('bundesliga_app.utils.connection') as mock_connection:
+            call_bulk_eb_api(call, 'USER', ['1', '2'])
+        self.assertEqual(mock_connection.close.call_count, 2)
+
+    def test_call_bulk_eb_api_late_calls_not_cancelled(self):
+        called = []
+
+        def call(user, id):
+            time.sleep(0.2)
+            called.append(id)
+        with patch('bundesliga_app.utils.EB_FETCH_WORKERS', 1):
+            results = call_bulk_eb_api(
+                call, 'USER', ['1', '2'], deadline=0.1, cancel_late=False)
+        self.assertEqual(results, {'1': None, '2': None})
+        # The calls that were queued at the deadline are made after
+        time.sleep(0.5)
+        self.assertEqual(sorted(called), ['1', '2'])
+
+
+def get_mock_events_page(ids, page_count=1, continuation=None):
+    events = []
+    for id in ids:
+        event = get_mock_events_api()
+        event['id'] = id
+        events.append(event)
+    return {
+        'events': events,
+        'pagination': {
+            'page_count': page_count,
+            'has_more_items': continuation is not None,
+            'continuation': continuation,
+        },
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EventsImportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @patch('bundesliga_app.utils.PooledEventbrite.get')
+    def test_import_follows_continuation(self, mock_api_call):
+        mock_api_call.side_effect = [
+            get_mock_events_page(['1', '2'], continuation='A'),
+            get_mock_events_page(['3'], continuation='B'),
+            get_mock_events_page(['4']),
+        ]
+        events = import_events_user_eb_api('TEST', parallel=False)
+        self.assertEqual([event['id'] for event in events], ['1', '2', '3', '4'])
+        self.assertEqual(
+            [call[0][0] for call in mock_api_call.call_args_list],
+            [
+                '/users/me/owned_events/?status=live',
+                '/users/me/owned_events/?status=live&continuation=A',
+                '/users/me/owned_events/?status=live&continuation=B',
+            ],
+        )
+
+    @patch('bundesliga_app.utils.PooledEventbrite.get')
+    def test_import_pages_in_parallel(self, mock_api_call):
+        def get_page(path):
+            if path.endswith('page=3'):
+                time.sleep(0.1)
+                return get_mock_events_page(['5', '6'], page_count=3)
+            if path.endswith('page=2'):
+                return get_mock_events_page(['3', '4'], page_count=3)
+            return get_mock_events_page(['1', '2'], page_count=3)
+        mock_api_call.side_effect = get_page
+        events = import_events_user_eb_api('TEST')
+        self.assertEqual(
+            [event['id'] for event in events],
+            ['1', '2', '3', '4', '5', '6'],
+        )
+        self.assertEqual(mock_api_call.call_count, 3)
+
+    @patch('bundesliga_app.utils.PooledEventbrite.get')
+    def test_import_saves_each_event_with_dates(self, mock_api_call):
+        mock_api_call.side_effect = [
+            get_mock_events_page(['1'], continuation='A'),
+            get_mock_events_page(['2']),
+        ]
+        import_events_user_eb_api('TEST', parallel=False)
+        event = cache.get('event-2')['value']
+        self.assertEqual(
+            event['start_date'],
+            datetime.datetime(2018, 11, 3, 19, 0),
+        )
+        self.assertEqual(
+            cache.get('events-import-TEST'),
+            {'ids': ['1', '2'], 'complete': False},
+        )
+
+    @patch('bundesliga_app.utils.Thread')
+    def test_partial_import_returns_first_events(self, mock_thread):
+        cache.add('events-TEST-lock', True)
+        set_cached_eb_api('event-1', get_mock_events_page(['1'])['events'][0], 60)
+        cache.set('events-import-TEST', {'ids': ['1'], 'complete': False})
+        events, complete = get_events_user_import('TEST', wait=0.1)
+        self.assertFalse(complete)
+        self.assertEqual([event['id'] for event in events], ['1'])
+        mock_thread.assert_not_called()
+
+    @patch('bundesliga_app.utils.Thread')
+    def test_import_started_in_background(self, mock_thread):
+        events, complete = get_events_user_import('TEST', wait=0.1)
+        self.assertEqual((events, complete), ([], False))
+        mock_thread.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
+
+    def test_complete_import(self):
+        set_cached_eb_api('events-TEST', MOCK_LIST_EVENTS_API, 60)
+        events, complete = get_events_user_import('TEST')
+        self.assertTrue(complete)
+        self.assertEqual(events, MOCK_LIST_EVENTS_API)
+
+
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
+class FakeAPIsTest(TestCase):
+    def setUp(self):
+        # The clients of other tests have the url of EB
+        close_eb_clients()
+        self.server = FakeAPIsServer(
+            ('127.0.0.1', 0),
+            events=120,
+            latency=0,
+        )
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        patcher = patch('bundesliga_app.utils.EB_API_URL', self.url + '/v3/')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        close_eb_clients()
+
+    def test_import_all_the_pages_of_events(self):
+        events = import_events_user_eb_api('TOKEN')
+        self.assertEqual(len(events), 120)
+        self.assertEqual(len({event['id'] for event in events}), 120)
+
+    def test_event_tickets_and_venue(self):
+        event_id = str(FIRST_EVENT_ID + 1)
+        self.assertEqual(get_event_eb_api('TOKEN', event_id)['id'], event_id)
+        tickets = get_event_tickets_eb_api('TOKEN', event_id)
+        self.assertEqual(tickets[0]['event_id'], event_id)
+        self.assertEqual(get_venue_eb_api('TOKEN', '7')['id'], '7')
+        self.assertEqual(
+            get_eb_client('TOKEN').get('/events/1/').status_code,
+            404,
+        )
+
+    def test_discounts(self):
+        eventbrite = get_eb_client('TOKEN')
+        discount = eventbrite.post('/organizations/1/discounts/', {
+            'discount': {'code': 'CODE', 'event_id': '1', 'quantity_available': 1},
+        })
+        found = eventbrite.get(
+            '/organizations/1/discounts/?scope=event&event_id=1&code=CODE')
+        self.assertEqual(found['discounts'][0]['id'], discount['id'])
+        self.assertEqual(
+            eventbrite.post('/discounts/{}/'.format(discount['id']), {
+                'discount': {'quantity_available': 3},
+            })['quantity_available'],
+            3,
+        )
+        self.assertTrue(
+            eventbrite.delete('/discounts/{}/'.format(discount['id']))['deleted']
+        )
+        self.assertEqual(
+            eventbrite.get('/organizations/1/discounts/?event_id=1')['discounts'],
+            [],
+        )
+
+    def test_validate_card(self):
+        with patch('bundesliga_app.utils.DS_API_URL', self.url + '/ds/'):
+            self.assertEqual(request_member_number_ds('12345')['Kartentyp'], '2')
+            self.assertEqual(request_member_number_ds('12340'), {'ERROR': -1})
+
+    def test_errors_and_rate_limit(self):
+        self.server.error_rate = 1
+        self.assertEqual(
+            get_eb_client('TOKEN').get('/users/me/').status_code,
+            500,
+        )
+        self.server.error_rate = 0
+        self.server.rate_limit = 1
+        eventbrite = get_eb_client('TOKEN')
+        self.assertEqual(eventbrite.get('/users/me/').status_code, 200)
+        self.assertEqual(eventbrite.get('/users/me/').status_code, 429)
+
+    def test_latency_distributions(self):
+        server = FakeAPIsServer(('127.0.0.1', 0), latency=0.1, seed=1)
+        server.server_close()
+        for distribution in ['fixed', 'uniform', 'exponential', 'lognormal']:
+            server.latency_distribution = distribution
+            latencies = [server.get_latency() for number in range(2000)]
+            self.assertAlmostEqual(
+                sum(latencies) / len(latencies), 0.1, delta=0.01)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BenchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get_request(self, time, queries=1, eb=0, ds=0):
+        return {
+            'time': time,
+            'status': 200,
+            'db': {'count': queries},
+            'eb': {'count': eb},
+            'ds': {'count': ds},
+            'cache': {'hits': 1, 'misses': 0},
+        }
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([3], 95), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize(self):
+        summary = summarize([
+            self.get_request(10, queries=2, eb=1),
+            self.get_request(30, queries=4, eb=1, ds=2),
+        ])
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['p50'], 10)
+        self.assertEqual(summary['p95'], 30)
+        self.assertEqual(summary['queries'], 3)
+        self.assertEqual(summary['eb_calls'], 1)
+        self.assertEqual(summary['ds_calls'], 1)
+        self.assertEqual(summary['statuses'], [200])
+
+    def test_compare(self):
+        baseline = make_baseline({
+            'home': summarize([self.get_request(10, queries=2)]),
+        }, {})
+        current = make_baseline({
+            'home': summarize([self.get_request(11, queries=3)]),
+        }, {})
+        rows, regressions = compare(baseline, current, threshold=20)
+        self.assertIn(('home', 'p50', 10, 11, 10, False), rows)
+        self.assertEqual(regressions, ['home queries'])
+        rows, regressions = compare(baseline, current, threshold=5)
+        self.assertEqual(regressions, ['home p50', 'home p95', 'home queries'])
+
+    def test_record_requests(self):
+        organizer = OrganizerFactory()
+        self.client.force_login(organizer)
+        with record_requests() as recorded:
+            self.client.get('/metrics/')
+        self.assertEqual(len(recorded), 1)
+        self.assertEqual(recorded[0]['path'], '/metrics/')
+        self.assertEqual(recorded[0]['status'], 200)
+
+    def test_bench_views(self):
+        with use_fake_apis(events=4, latency=0):
+            organizers = seed(organizers=2, events=2, tickets=2, member_codes=2)
+            self.assertEqual(Event.objects.count(), 4)
+            self.assertEqual(TicketTypeDiscount.objects.count(), 8)
+            self.assertEqual(MemberDiscountCode.objects.count(), 8)
+            results = run_bench(organizers, requests=2, warmup=1)
+        self.assertEqual(sorted(results), [
+            'event_discounts',
+            'home',
+            'landing_page',
+            'listing_page',
+            'select_events',
+        ])
+        self.assertEqual(results['select_events']['statuses'], [302])
+        self.assertEqual(results['listing_page']['ds_calls'], 1)
+        # A discount code was generated for each member number
+        self.assertEqual(DiscountCode.objects.filter(
+            discount_code__contains='-2000',
+        ).count(), 3)
+
+
+@override_settings(CACHES=DUMMY_CACHE)
 class UtilsApiDSTest(TestCase):
-    @patch('bundesliga_app.utils.request', return_value=MOCK_DS_API_VALID_NUMBER)
+    @patch('bundesliga_app.utils.Session.request', return_value=MOCK_DS_API_VALID_NUMBER)
     def test_validate_member_number_ds(self, mock_api_call):
         CardId = '1'
         result = validate_member_number_ds(CardId)
@@ -234,7 +1235,7 @@ class UtilsApiDSTest(TestCase):
             "2"
         )
 
-    @patch('bundesliga_app.utils.request', return_value=MOCK_DS_API_INVALID_REQUEST)
+    @patch('bundesliga_app.utils.Session.request', return_value=MOCK_DS_API_INVALID_REQUEST)
     def test_invalid_validate_member_number_ds(self, mock_api_call):
         CardId = '1'
         result = validate_member_number_ds(CardId)
@@ -249,6 +1250,77 @@ class UtilsApiDSTest(TestCase):
         )
 
 
+    @patch('bundesliga_app.utils.Session.request', side_effect=Timeout)
+    def test_validate_member_number_ds_timeout(self, mock_api_call):
+        result = validate_member_number_ds('1')
+        self.assertEquals(
+            mock_api_call.call_args_list[0][1]['timeout'],
+            DS_API_TIMEOUT,
+        )
+        self.assertEquals(result, 'Invalid Request')
+
+    def test_validate_member_numbers_ds_concurrently(self):
+        def validate(number):
+            time.sleep(0.2)
+            return {'Kartentyp': number}
+        start = time.time()
+        with patch('bundesliga_app.utils.validate_member_number_ds', side_effect=validate):
+            result = validate_member_numbers_ds(['1', '2', '3', '4', '5'])
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEquals(
+            result,
+            {number: {'Kartentyp': number} for number in ['1', '2', '3', '4', '5']}
+        )
+
+    def test_validate_member_numbers_ds_deadline(self):
+        def validate(number):
+            if number == 'slow':
+                time.sleep(0.5)
+            return {'Kartentyp': number}
+        with patch('bundesliga_app.utils.validate_member_number_ds', side_effect=validate):
+            result = validate_member_numbers_ds(['1', 'slow'], deadline=0.1)
+        self.assertEquals(result['1'], {'Kartentyp': '1'})
+        self.assertEquals(result['slow'], 'Invalid Request')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DSCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        DS_CACHE_STATS.update(hits=0, misses=0)
+
+    @patch('bundesliga_app.utils.Session.request', return_value=MOCK_DS_API_VALID_NUMBER)
+    def test_valid_number_cached(self, mock_api_call):
+        validate_member_number_ds('1')
+        result = validate_member_number_ds('1')
+        mock_api_call.assert_called_once()
+        self.assertEquals(result['Kartentyp'], "2")
+        self.assertEquals(cache.get('ds-card-1')['Kartentyp'], "2")
+        self.assertEquals(
+            get_ds_cache_stats(),
+            {'hits': 1, 'misses': 1, 'hit_rate': 0.5},
+        )
+
+    @patch('bundesliga_app.utils.CACHE_TTL_DS_INVALID', 5)
+    @patch('bundesliga_app.utils.Session.request', return_value=MOCK_DS_API_INVALID_NUMBER)
+    def test_invalid_number_cached(self, mock_api_call):
+        with patch('bundesliga_app.utils.cache.set') as mock_cache_set:
+            validate_member_number_ds('1')
+        mock_cache_set.assert_called_once_with('ds-card-1', {'ERROR': -1}, 5)
+
+    @patch('bundesliga_app.utils.Session.request', return_value=MOCK_DS_API_INVALID_REQUEST)
+    def test_invalid_request_not_cached(self, mock_api_call):
+        validate_member_number_ds('1')
+        validate_member_number_ds('1')
+        self.assertEquals(mock_api_call.call_count, 2)
+        self.assertIsNone(cache.get('ds-card-1'))
+
+    @patch('bundesliga_app.utils.Session.request', side_effect=Timeout)
+    def test_timeout_not_cached(self, mock_api_call):
+        validate_member_number_ds('1')
+        self.assertIsNone(cache.get('ds-card-1'))
+
+
 class HomeViewTest(TestBase):
     def setUp(self):
         super(HomeViewTest, self).setUp()
@@ -270,7 +1342,98 @@ class HomeViewTest(TestBase):
             is_active=True,
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    def _social_auth_queries(self):
+        """ Count the queries to get the token of the organizer
+        in a request to the home page """
+        with CaptureQueriesContext(connection) as queries:
+            self.response = self.client.get('/')
+        return len([
+            query for query in queries.captured_queries
+            if 'social_auth_usersocialauth' in query['sql']
+        ])
+
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_tickets_eb_api', side_effect=get_mock_event_tickets_api_by_event)
+    def test_auth_token_loaded_once_per_request(self,
+                                                mock_get_event_tickets_eb_api,
+                                                mock_get_event_eb_api,
+                                                ):
+        # One ticket type by event
+        for event in self.events:
+            EventTicketTypeFactory(
+                event=event,
+                ticket_id_eb='{}-0'.format(event.event_id),
+            )
+        self.assertEqual(self._social_auth_queries(), 1)
+        # More events and ticket types in the page does not add queries
+        for event in self.events:
+            EventTicketTypeFactory(
+                event=event,
+                ticket_id_eb='{}-1'.format(event.event_id),
+            )
+        self.assertEqual(self._social_auth_queries(), 1)
+        self.assertEqual(
+            len(self.response.context['events'][self.events[0].id]['tickets_type']),
+            2,
+        )
+
+    def test_events_and_tickets_share_the_deadline(self):
+        for event in self.events:
+            EventTicketTypeFactory(
+                event=event,
+                ticket_id_eb='{}-0'.format(event.event_id),
+            )
+
+        def get_event(token, event_id):
+            time.sleep(0.2)
+            return get_mock_events_api()
+
+        def get_tickets(token, event_id):
+            time.sleep(0.2)
+            return get_mock_event_tickets_api_by_event(token, event_id)
+        with patch('bundesliga_app.views.EB_FETCH_DEADLINE', 0.3), \
+                patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_event), \
+                patch('bundesliga_app.utils.get_event_tickets_eb_api', side_effect=get_tickets):
+            start = time.time()
+            response = self.client.get('/')
+            # The tickets are only waited for the time left
+            self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(response.context['events']), 4)
+        for event in response.context['events'].values():
+            self.assertEqual(event['tickets_type'], {})
+
+    def _add_discounts(self, event):
+        """ Add an event discount and two ticket types
+        with discount to the event """
+        EventDiscountFactory(event=event)
+        for index in range(2):
+            TicketTypeDiscountFactory(
+                ticket_type=EventTicketTypeFactory(
+                    event=event,
+                    ticket_id_eb='{}-{}'.format(event.event_id, index),
+                ),
+            )
+
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_tickets_eb_api', side_effect=get_mock_event_tickets_api_by_event)
+    def test_home_queries_do_not_grow_with_events(self,
+                                                  mock_get_event_tickets_eb_api,
+                                                  mock_get_event_eb_api,
+                                                  ):
+        self._add_discounts(self.events[0])
+        with self.assertNumQueries(7):
+            self.client.get('/')
+        for event in self.events[1:] + [
+                EventFactory(organizer=self.organizer, is_active=True)]:
+            self._add_discounts(event)
+        with self.assertNumQueries(7):
+            self.response = self.client.get('/')
+        self.assertEqual(len(self.response.context['events']), 5)
+        for event in self.response.context['events'].values():
+            self.assertTrue(event['has_discount'])
+            self.assertEqual(len(event['tickets_type']), 2)
+
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_homepage(self,
                       mock_get_event_tickets_eb_api,
@@ -284,7 +1447,7 @@ class HomeViewTest(TestBase):
         self.response = self.client.get('/')
         self.assertEqual(self.response.status_code, 200)
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_home_url_has_index_template(self,
                                          mock_get_event_tickets_eb_api,
@@ -296,7 +1459,7 @@ class HomeViewTest(TestBase):
             'index.html',
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_events_organizer(self,
                               mock_get_event_tickets_eb_api,
@@ -309,7 +1472,7 @@ class HomeViewTest(TestBase):
                 self.response.context_data['events']
             )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_events_organizer_not_active(self,
                                          mock_get_event_tickets_eb_api,
@@ -321,7 +1484,7 @@ class HomeViewTest(TestBase):
             self.no_active_events,
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_events_another_organizer(self,
                                       mock_get_event_tickets_eb_api,
@@ -334,7 +1497,7 @@ class HomeViewTest(TestBase):
                 event,
             )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_get_discount_ticket_if_exists(self,
                                     mock_get_event_tickets_eb_api,
@@ -357,7 +1520,7 @@ class HomeViewTest(TestBase):
                 str(self.tickets_type.id)]['discount']['id']
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_get_discount_event_if_exists(self,
                                           mock_get_event_tickets_eb_api,
@@ -373,11 +1536,11 @@ class HomeViewTest(TestBase):
             self.response.context['events'][self.events[0].id]['has_discount']
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_event_api_free)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_event_api_free)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
-    def test_if_event_is_free_delete_discount(self,
-                                              mock_get_event_tickets_eb_api,
-                                              mock_get_event_eb_api):
+    def test_if_event_is_free_not_delete_discount(self,
+                                                  mock_get_event_tickets_eb_api,
+                                                  mock_get_event_eb_api):
         event = EventFactory(
             organizer=self.organizer,
             is_active=True,
@@ -393,24 +1556,25 @@ class HomeViewTest(TestBase):
             value_type="percentage",
         )
         self.response = self.client.get('/')
+        # The GET does not write, reconcile_events deletes them
         self.assertEqual(
             len(TicketTypeDiscount.objects.filter(ticket_type=tickets_type)),
-            0,
+            1,
         )
         self.assertEqual(
             len(EventTicketType.objects.filter(event=event)),
-            0,
+            1,
         )
         self.assertContains(
             self.response,
             "It doesn't have any paid ticket",
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=MOCK_EVENT_TICKETS[0])
-    def test_free_ticket_type_delete_discount(self,
-                                              mock_get_event_tickets_eb_api,
-                                              mock_get_event_eb_api):
+    def test_free_ticket_type_discount_not_shown(self,
+                                                 mock_get_event_tickets_eb_api,
+                                                 mock_get_event_eb_api):
         event = EventFactory(
             organizer=self.organizer,
             is_active=True,
@@ -426,12 +1590,16 @@ class HomeViewTest(TestBase):
             value_type="percentage",
         )
         self.response = self.client.get('/')
-        self.assertEqual(
-            len(TicketTypeDiscount.objects.filter(ticket_type=tickets_type)),
-            0,
+        self.assertNotIn(
+            'discount',
+            self.response.context['events'][event.id]['tickets_type'][
+                str(tickets_type.id)],
+        )
+        self.assertFalse(
+            self.response.context['events'][event.id]['has_discount']
         )
         self.assertEqual(
-            len(EventTicketType.objects.filter(event=event)),
+            len(TicketTypeDiscount.objects.filter(ticket_type=tickets_type)),
             1,
         )
 
@@ -513,9 +1681,9 @@ class EventDiscountsViewTest(TestBase):
                 ticket_type.id)]['id'],
         )
 
-    @patch('bundesliga_app.utils.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE))
     def test_events_ticket_type_discounts_no_deleteable(self,
-                                                        mock_check_discount_code_in_eb,
+                                                        mock_get_event_discounts_eb_api,
                                                         mock_get_event_eb_api,
                                                         mock_get_event_tickets_eb_api):
         ticket_type = EventTicketTypeFactory(
@@ -529,6 +1697,7 @@ class EventDiscountsViewTest(TestBase):
         )
         DiscountCodeFactory(
             discount=discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.response = self.client.get(
             '/events_discount/{}/'.format(self.event.id)
@@ -538,9 +1707,9 @@ class EventDiscountsViewTest(TestBase):
                 ticket_type.id)]['discount']['deleteable'],
         )
 
-    @patch('bundesliga_app.utils.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE))
     def test_events_discount_no_deleteable(self,
-                                           mock_check_discount_code_in_eb,
+                                           mock_get_event_discounts_eb_api,
                                            mock_get_event_eb_api,
                                            mock_get_event_tickets_eb_api):
         discount = EventDiscountFactory(
@@ -550,6 +1719,7 @@ class EventDiscountsViewTest(TestBase):
         )
         DiscountCodeFactory(
             discount=discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.response = self.client.get(
             '/events_discount/{}/'.format(self.event.id)
@@ -558,6 +1728,33 @@ class EventDiscountsViewTest(TestBase):
             self.response.context_data['event_discount']['deleteable'],
         )
 
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE))
+    def test_events_discounts_in_eb_fetched_once(self,
+                                                 mock_get_event_discounts_eb_api,
+                                                 mock_get_event_eb_api,
+                                                 mock_get_event_tickets_eb_api):
+        event_discount = EventDiscountFactory(
+            event=self.event,
+        )
+        DiscountCodeFactory(
+            discount=event_discount,
+        )
+        for ticket in mock_get_event_tickets_eb_api.return_value:
+            ticket_type = EventTicketTypeFactory(
+                event=self.event,
+                ticket_id_eb=ticket['id'],
+            )
+            DiscountCodeFactory(
+                discount=TicketTypeDiscountFactory(ticket_type=ticket_type),
+            )
+        self.response = self.client.get(
+            '/events_discount/{}/'.format(self.event.id)
+        )
+        mock_get_event_discounts_eb_api.assert_called_once()
+        self.assertTrue(
+            self.response.context_data['event_discount']['deleteable'],
+        )
+
     def test_events_discount_in_response(self,
                                          mock_get_event_eb_api,
                                          mock_get_event_tickets_eb_api):
@@ -574,9 +1771,9 @@ class EventDiscountsViewTest(TestBase):
             self.response.context_data['event_discount']['id'],
         )
 
-    def test_events_ticket_type_delete(self,
-                                       mock_get_event_eb_api,
-                                       mock_get_event_tickets_eb_api):
+    def test_events_ticket_type_not_in_eb(self,
+                                          mock_get_event_eb_api,
+                                          mock_get_event_tickets_eb_api):
         # Ticket type with random ticket_eb_ids
         ticket_type = EventTicketTypeFactory(
             event=self.event,
@@ -586,9 +1783,146 @@ class EventDiscountsViewTest(TestBase):
             value=100.0,
             value_type="percentage",
         )
+        with self.assertNumQueries(9):
+            self.response = self.client.get(
+                '/events_discount/{}/'.format(self.event.id)
+            )
+        # It is not shown, and the GET does not write: the sync deletes it
+        self.assertEqual(self.response.context_data['tickets_type'], {})
+        self.assertEqual(
+            self.response.context_data['unsynced_tickets_type']['old'],
+            1,
+        )
+        self.assertTrue(
+            TicketTypeDiscount.objects.filter(ticket_type=ticket_type).exists()
+        )
+        self.assertEqual(
+            EventTicketType.objects.filter(event=self.event).count(),
+            1,
+        )
+
+    def test_events_ticket_type_free_discount_not_shown(self,
+                                                        mock_get_event_eb_api,
+                                                        mock_get_event_tickets_eb_api):
+        ticket_type = EventTicketTypeFactory(
+            event=self.event,
+            ticket_id_eb=mock_get_event_tickets_eb_api.return_value[0]['id']
+        )
+        TicketTypeDiscountFactory(
+            ticket_type=ticket_type,
+            value=100.0,
+            value_type="percentage",
+        )
         self.response = self.client.get(
             '/events_discount/{}/'.format(self.event.id)
         )
+        self.assertEqual(
+            ticket_type.ticket_id_eb,
+            self.response.context_data['tickets_type'][str(
+                ticket_type.id)]['id'],
+        )
+        self.assertNotIn(
+            'discount',
+            self.response.context_data['tickets_type'][str(ticket_type.id)],
+        )
+        self.assertEqual(
+            len(TicketTypeDiscount.objects.filter(ticket_type=ticket_type)),
+            1,
+        )
+
+    def test_events_new_ticket_type_shown_to_sync(self,
+                                                  mock_get_event_eb_api,
+                                                  mock_get_event_tickets_eb_api):
+        EventTicketTypeFactory(
+            event=self.event,
+            ticket_id_eb=mock_get_event_tickets_eb_api.return_value[1]['id']
+        )
+        self.response = self.client.get(
+            '/events_discount/{}/'.format(self.event.id)
+        )
+        # The ticket type that appeared in EB is shown, but not created
+        tickets_eb = mock_get_event_tickets_eb_api.return_value
+        self.assertEqual(
+            self.response.context_data['unsynced_tickets_type'],
+            {'new': tickets_eb[:1] + tickets_eb[2:], 'old': 0},
+        )
+        self.assertContains(
+            self.response,
+            '/events_discount/{}/sync/'.format(self.event.id),
+        )
+        self.assertEqual(
+            EventTicketType.objects.filter(event=self.event).count(),
+            1,
+        )
+
+    def test_events_synced_ticket_types_without_sync(self,
+                                                     mock_get_event_eb_api,
+                                                     mock_get_event_tickets_eb_api):
+        for ticket_eb in mock_get_event_tickets_eb_api.return_value:
+            EventTicketTypeFactory(event=self.event, ticket_id_eb=ticket_eb['id'])
+        self.response = self.client.get(
+            '/events_discount/{}/'.format(self.event.id)
+        )
+        self.assertEqual(
+            self.response.context_data['unsynced_tickets_type'],
+            {'new': [], 'old': 0},
+        )
+        self.assertNotContains(
+            self.response,
+            '/events_discount/{}/sync/'.format(self.event.id),
+        )
+
+
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
+@patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=MOCK_EVENT_TICKETS[0])
+@patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
+class SyncEventTicketsViewTest(TestBase):
+    def setUp(self):
+        super(SyncEventTicketsViewTest, self).setUp()
+        self.event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        self.sync_url = '/events_discount/{}/sync/'.format(self.event.id)
+
+    def test_events_ticket_type_created(self,
+                                        mock_get_event_eb_api,
+                                        mock_get_event_tickets_eb_api):
+        other_event = EventFactory(organizer=self.organizer, is_active=True)
+        self.response = self.client.post(self.sync_url)
+        self.assertRedirects(
+            self.response,
+            '/events_discount/{}/'.format(self.event.id),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(
+            set(EventTicketType.objects.filter(
+                event=self.event,
+            ).values_list('ticket_id_eb', flat=True)),
+            {ticket['id'] for ticket in MOCK_EVENT_TICKETS[0]},
+        )
+        # Only the event of the page is synced
+        mock_get_event_eb_api.assert_called_once_with(
+            self.auth.access_token,
+            str(self.event.event_id),
+        )
+        self.assertFalse(
+            EventTicketType.objects.filter(event=other_event).exists()
+        )
+
+    def test_events_ticket_type_delete(self,
+                                       mock_get_event_eb_api,
+                                       mock_get_event_tickets_eb_api):
+        # Ticket type with random ticket_eb_ids
+        ticket_type = EventTicketTypeFactory(
+            event=self.event,
+        )
+        TicketTypeDiscountFactory(
+            ticket_type=ticket_type,
+            value=100.0,
+            value_type="percentage",
+        )
+        self.client.post(self.sync_url)
         self.assertEqual(
             len(EventTicketType.objects.filter(id=ticket_type.id)),
             0,
@@ -603,26 +1937,144 @@ class EventDiscountsViewTest(TestBase):
                                                      mock_get_event_tickets_eb_api):
         ticket_type = EventTicketTypeFactory(
             event=self.event,
-            ticket_id_eb=mock_get_event_tickets_eb_api.return_value[0]['id']
+            ticket_id_eb=MOCK_EVENT_TICKETS[0][0]['id']
         )
         TicketTypeDiscountFactory(
             ticket_type=ticket_type,
             value=100.0,
             value_type="percentage",
         )
-        self.response = self.client.get(
-            '/events_discount/{}/'.format(self.event.id)
-        )
-        self.assertEqual(
-            ticket_type.ticket_id_eb,
-            self.response.context_data['tickets_type'][str(
-                ticket_type.id)]['id'],
+        self.client.post(self.sync_url)
+        self.assertTrue(
+            EventTicketType.objects.filter(id=ticket_type.id).exists()
         )
         self.assertEqual(
             len(TicketTypeDiscount.objects.filter(ticket_type=ticket_type)),
             0,
         )
 
+    def test_sync_of_other_organizer_denied(self,
+                                            mock_get_event_eb_api,
+                                            mock_get_event_tickets_eb_api):
+        event = EventFactory(organizer=OrganizerFactory(), is_active=True)
+        self.response = self.client.post(
+            '/events_discount/{}/sync/'.format(event.id)
+        )
+        self.assertEqual(self.response.status_code, 403)
+        mock_get_event_eb_api.assert_not_called()
+
+    def test_sync_get_not_allowed(self,
+                                  mock_get_event_eb_api,
+                                  mock_get_event_tickets_eb_api):
+        self.response = self.client.get(self.sync_url)
+        self.assertEqual(self.response.status_code, 405)
+        self.assertFalse(
+            EventTicketType.objects.filter(event=self.event).exists()
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalGetTest(TestBase):
+    def setUp(self):
+        super(ConditionalGetTest, self).setUp()
+        cache.clear()
+        self.event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        set_cached_eb_api(
+            'event-{}'.format(self.event.event_id),
+            get_mock_events_api(),
+            100,
+        )
+        set_cached_eb_api(
+            'tickets-{}'.format(self.event.event_id),
+            MOCK_EVENT_TICKETS[0],
+            100,
+        )
+        self.event_discounts_url = '/events_discount/{}/'.format(
+            self.event.id,
+        )
+
+    def test_home_not_modified(self):
+        first = self.client.get('/')
+        with patch('bundesliga_app.views.fetch_events_bulk') as mock_fetch:
+            response = self.client.get('/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(mock_fetch.called)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_home_without_etag_when_an_event_is_missing(self):
+        # The event could not be fetched from EB before the deadline
+        with patch('bundesliga_app.views.fetch_events_bulk',
+                   return_value=[None]):
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.context['events_missing'], 1)
+        self.assertContains(response, 'Some events could not be loaded')
+
+    def test_home_modified_by_discount(self):
+        first = self.client.get('/')
+        EventDiscountFactory(event=self.event)
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
+    def test_home_rendered_when_eb_value_is_not_in_cache(self, mock_get_event_eb_api):
+        first = self.client.get('/')
+        cache.delete('event-{}'.format(self.event.event_id))
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_event_eb_api.call_count, 1)
+
+    def test_event_discounts_not_modified(self):
+        first = self.client.get(self.event_discounts_url)
+        response = self.client.get(
+            self.event_discounts_url,
+            HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_event_discounts_modified_by_ticket_discount(self):
+        ticket_type = EventTicketTypeFactory(
+            event=self.event,
+            ticket_id_eb=MOCK_EVENT_TICKETS[0][1]['id'],
+        )
+        first = self.client.get(self.event_discounts_url)
+        TicketTypeDiscountFactory(ticket_type=ticket_type)
+        response = self.client.get(
+            self.event_discounts_url,
+            HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_event_discounts_of_other_organizer_denied(self):
+        event = EventFactory(organizer=OrganizerFactory(), is_active=True)
+        response = self.client.get(
+            '/events_discount/{}/'.format(event.id),
+            HTTP_IF_NONE_MATCH='*',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_content_scopes_of_views(self):
+        request = RequestFactory().get('/')
+        request.user = self.organizer
+        home = HomeView(request=request, kwargs={})
+        self.assertEqual(
+            home.get_content_scopes(),
+            ['organizer-{}'.format(self.organizer.id)],
+        )
+        event_discounts = EventDiscountsView(
+            request=request,
+            kwargs={'event_id': self.event.id},
+        )
+        self.assertEqual(
+            event_discounts.get_content_scopes(),
+            ['event-{}'.format(self.event.id)],
+        )
+
 
 class CreateDiscountEventViewTest(TestBase):
     def setUp(self):
@@ -1641,11 +3093,12 @@ class DeleteDiscountViewTest(TestBase):
             0,
         )
 
-    @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE))
     def test_not_delete_discount_used(self,
-                                      mock_check_discount_code_in_eb):
+                                      mock_get_event_discounts_eb_api):
         DiscountCodeFactory(
             discount=self.discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.response = self.client.post(
             '/events_discount/{}/{}/delete/'.format(
@@ -1659,13 +3112,14 @@ class DeleteDiscountViewTest(TestBase):
             1,
         )
 
-    @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE)
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE))
     @patch('bundesliga_app.views.delete_discount_code_from_eb', return_value=MOCK_DELETE_DISCOUNT_EB)
     def test_delete_discount_not_used(self,
                                       mock_delete_discount_code_from_eb,
-                                      mock_check_discount_code_in_eb):
+                                      mock_get_event_discounts_eb_api):
         DiscountCodeFactory(
             discount=self.discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.response = self.client.post(
             '/events_discount/{}/{}/delete/'.format(
@@ -1683,6 +3137,9 @@ class DeleteDiscountViewTest(TestBase):
 @patch('bundesliga_app.views.get_events_user_eb_api',
        return_value=MOCK_LIST_EVENTS_API,
        )
+@patch('bundesliga_app.views.get_events_user_import',
+       new=lambda token: (MOCK_LIST_EVENTS_API, True),
+       )
 class SelectEventsViewTest(TestBase):
     def setUp(self):
         super(SelectEventsViewTest, self).setUp()
@@ -1725,6 +3182,19 @@ class SelectEventsViewTest(TestBase):
                 datetime.datetime(2018, 11, 3, 19, 0),
             )
 
+    def test_select_events_while_loading(self,
+                                         mock_get_events_user_eb_api,
+                                         mock_get_user_eb_api,
+                                         ):
+        with patch(
+            'bundesliga_app.views.get_events_user_import',
+            return_value=(MOCK_LIST_EVENTS_API[:1], False),
+        ):
+            self.response = self.client.get('/select_events/')
+        self.assertTrue(self.response.context_data['events_loading'])
+        self.assertEqual(len(self.response.context_data['events']), 1)
+        self.assertContains(self.response, 'disabled')
+
     def test_selected_events(self,
                              mock_get_events_user_eb_api,
                              mock_get_user_eb_api,
@@ -1979,9 +3449,9 @@ class SelectEventsViewTest(TestBase):
             0,
         )
 
-    @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
+    @patch('bundesliga_app.views.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE))
     def test_post_event_with_buyed_discount(self,
-                                            mock_check_discount_code_in_eb,
+                                            mock_get_event_discounts_eb_api,
                                             mock_get_events_user_eb_api,
                                             mock_get_user_eb_api,
                                             ):
@@ -1999,6 +3469,7 @@ class SelectEventsViewTest(TestBase):
         )
         DiscountCodeFactory(
             discount=self.discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.response = self.client.post(
             path='/select_events/',
@@ -2025,11 +3496,11 @@ class SelectEventsViewTest(TestBase):
             1,
         )
 
-    @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE)
+    @patch('bundesliga_app.views.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE))
     @patch('bundesliga_app.views.delete_discount_code_from_eb', return_value=MOCK_DELETE_DISCOUNT_EB)
     def test_post_event_with_unused_discounts_in_eb(self,
                                                     mock_delete_discount_code_from_eb,
-                                                    mock_check_discount_code_in_eb,
+                                                    mock_get_event_discounts_eb_api,
                                                     mock_get_events_user_eb_api,
                                                     mock_get_user_eb_api,
                                                     ):
@@ -2047,6 +3518,7 @@ class SelectEventsViewTest(TestBase):
         )
         DiscountCodeFactory(
             discount=self.discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.response = self.client.post(
             path='/select_events/',
@@ -2071,13 +3543,117 @@ class SelectEventsViewTest(TestBase):
             0,
         )
         self.assertEqual(
-            len(discount_in_db),
-            0,
+            len(discount_in_db),
+            0,
+        )
+        self.assertEqual(
+            len(discount_code_in_db),
+            0,
+        )
+
+
+    def _create_unused_discount(self):
+        event_mock_api_eb = MOCK_LIST_EVENTS_API[0]
+        self.event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+            event_id=event_mock_api_eb['id'],
+        )
+        self.discount = EventDiscountFactory(event=self.event)
+        DiscountCodeFactory(
+            discount=self.discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
+        )
+
+    @patch('bundesliga_app.views.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE))
+    def test_post_event_deletes_discounts_in_eb_after_saving(self,
+                                                             mock_get_event_discounts_eb_api,
+                                                             mock_get_events_user_eb_api,
+                                                             mock_get_user_eb_api,
+                                                             ):
+        self._create_unused_discount()
+        calls = []
+
+        def sync_events(organizer, events_tickets):
+            calls.append('sync')
+            return sync_organizer_events(organizer, events_tickets)
+
+        def delete_discount(user, discount_id):
+            calls.append(discount_id)
+            return MOCK_DELETE_DISCOUNT_EB
+        with patch('bundesliga_app.views.sync_organizer_events', side_effect=sync_events), \
+                patch('bundesliga_app.views.delete_discount_code_from_eb', side_effect=delete_discount):
+            self.response = self.client.post(path='/select_events/')
+        self.assertEqual(self.response.status_code, 302)
+        self.assertFalse(Event.objects.get(id=self.event.id).is_active)
+        # The discount is deleted from EB once the events are saved
+        self.assertEqual(
+            calls,
+            ['sync', MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['id']],
+        )
+        mock_get_event_discounts_eb_api.assert_called_once_with(
+            self.organizer,
+            self.event.event_id,
+        )
+
+    def test_post_event_discounts_partially_deleted_in_eb(self,
+                                                         mock_get_events_user_eb_api,
+                                                         mock_get_user_eb_api,
+                                                         ):
+        self._create_unused_discount()
+        other_discount = dict(
+            MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0],
+            id='OTHER',
+            code='OTHER',
         )
+        DiscountCodeFactory(
+            discount=TicketTypeDiscountFactory(
+                ticket_type=EventTicketTypeFactory(event=self.event),
+            ),
+            discount_code='OTHER',
+        )
+        discounts_eb = get_mock_event_discounts_api(
+            MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE)
+        discounts_eb['OTHER'] = other_discount
+
+        def delete_discount(user, discount_id):
+            if discount_id == 'OTHER':
+                raise Exception('EB is down')
+            return MOCK_DELETE_DISCOUNT_EB
+        with patch('bundesliga_app.views.get_event_discounts_eb_api', return_value=discounts_eb), \
+                patch('bundesliga_app.views.delete_discount_code_from_eb', side_effect=delete_discount), \
+                self.assertLogs('bundesliga_app.views', 'WARNING') as logs:
+            self.response = self.client.post(path='/select_events/')
+        self.assertEqual(self.response.status_code, 302)
+        self.assertEqual(self.response.url, '/')
+        self.assertFalse(Event.objects.get(id=self.event.id).is_active)
+        self.assertIn('The discounts OTHER of the organizer', logs.output[0])
         self.assertEqual(
-            len(discount_code_in_db),
-            0,
+            [str(message) for message in get_messages(self.response.wsgi_request)],
+            ['1 discounts of the unselected events could not be deleted from Eventbrite yet, verify them in Eventbrite'],
+        )
+
+    @patch('bundesliga_app.views.delete_discount_code_from_eb')
+    def test_post_event_discounts_not_verified(self,
+                                               mock_delete_discount_code_from_eb,
+                                               mock_get_events_user_eb_api,
+                                               mock_get_user_eb_api,
+                                               ):
+        self._create_unused_discount()
+
+        def get_discounts(user, event_id):
+            time.sleep(0.5)
+            return get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE)
+        with patch('bundesliga_app.utils.EB_FETCH_DEADLINE', 0.1), \
+                patch('bundesliga_app.views.get_event_discounts_eb_api', side_effect=get_discounts):
+            self.response = self.client.post(path='/select_events/')
+        self.assertEqual(self.response.status_code, 302)
+        self.assertEqual(self.response.url, '/select_events/')
+        self.assertTrue(Event.objects.get(id=self.event.id).is_active)
+        self.assertTrue(
+            EventDiscount.objects.filter(id=self.discount.id).exists()
         )
+        mock_delete_discount_code_from_eb.assert_not_called()
 
 
 class EventAccessMixinTest(TestBase):
@@ -2315,9 +3891,9 @@ class DiscountAccessMixinTest(TestBase):
         with self.assertRaises(Http404):
             self.view.get_discount()
 
-    @patch('bundesliga_app.utils.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE))
     def test_create_ticket_discount_no_deleteable(self,
-                                           mock_check_discount_code_in_eb):
+                                           mock_get_event_discounts_eb_api):
         event = EventFactory(
             organizer=self.organizer,
             is_active=True,
@@ -2330,6 +3906,7 @@ class DiscountAccessMixinTest(TestBase):
         )
         DiscountCodeFactory(
             discount=event_discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         discount = TicketTypeDiscountFactory(
             ticket_type=event_ticket_type,
@@ -2348,9 +3925,9 @@ class DiscountAccessMixinTest(TestBase):
             "You have an used event discount so you can not manage ticket discounts for this event."
         )
 
-    @patch('bundesliga_app.utils.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
+    @patch('bundesliga_app.utils.get_event_discounts_eb_api', return_value=get_mock_event_discounts_api(MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE))
     def test_create_event_discount_no_deleteable(self,
-                                           mock_check_discount_code_in_eb):
+                                           mock_get_event_discounts_eb_api):
         event = EventFactory(
             organizer=self.organizer,
             is_active=True,
@@ -2366,6 +3943,7 @@ class DiscountAccessMixinTest(TestBase):
         )
         DiscountCodeFactory(
             discount=ticket_discount,
+            discount_code=MOCK_DISCOUNT_EXISTS_IN_EB_NO_USAGE['discounts'][0]['code'],
         )
         self.view.kwargs = {
             'event_id': event.id,
@@ -2382,6 +3960,7 @@ class DiscountAccessMixinTest(TestBase):
         )
 
 
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
 class LandingPageBuyerViewTest(TestCase):
     def setUp(self):
         self.organizer = OrganizerFactory()
@@ -2402,14 +3981,14 @@ class LandingPageBuyerViewTest(TestCase):
             is_active=True,
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     def test_landing_page_buyer(self, mock_get_event_eb_api):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
         )
         self.assertEqual(self.response.status_code, 200)
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     def test_landing_page_url_has_index_template(self, mock_get_event_eb_api):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
@@ -2419,7 +3998,7 @@ class LandingPageBuyerViewTest(TestCase):
             'buyer/landing_page_buyer.html',
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     def test_events_landing_page(self, mock_get_event_eb_api):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
@@ -2430,7 +4009,7 @@ class LandingPageBuyerViewTest(TestCase):
                 self.response.context_data['events'],
             )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     def test_events_landing_page_not_active(self, mock_get_event_eb_api):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
@@ -2440,7 +4019,7 @@ class LandingPageBuyerViewTest(TestCase):
             self.response.context_data['events'],
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     def test_events_another_organizer(self, mock_get_event_eb_api):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
@@ -2450,7 +4029,7 @@ class LandingPageBuyerViewTest(TestCase):
             self.response.context_data['events'],
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_get_discount_event(self,
                                 mock_get_event_tickets_eb_api,
@@ -2463,12 +4042,15 @@ class LandingPageBuyerViewTest(TestCase):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
         )
+        self.assertTrue(
+            self.response.context['events'][self.events[0].id]['has_discount'],
+        )
         self.assertEqual(
-            self.response.context['events'][self.events[0].id]['discounts'][discount.id]['id'],
-            discount.id,
+            self.response.context['events'][self.events[0].id]['max_discount'],
+            discount.value,
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_get_discount_if_exists_2(self,
                                       mock_get_event_tickets_eb_api,
@@ -2485,12 +4067,15 @@ class LandingPageBuyerViewTest(TestCase):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
         )
+        self.assertTrue(
+            self.response.context['events'][self.events[0].id]['has_discount'],
+        )
         self.assertEqual(
-            self.response.context['events'][self.events[0].id]['discounts'][discount.id]['id'],
-            discount.id,
+            self.response.context['events'][self.events[0].id]['max_discount'],
+            discount.value,
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_get_discount_if_exists_3(self,
                                       mock_get_event_tickets_eb_api,
@@ -2534,7 +4119,32 @@ class LandingPageBuyerViewTest(TestCase):
             discount_1.value,
         )
 
-    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_event_api_free)
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
+    def test_landing_page_queries_do_not_grow_with_events(
+            self, mock_get_event_eb_api):
+        # The discounts of all the events are read with the events
+        def get_landing_page():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    '/landing_page/{}/'.format(self.organizer.id)
+                )
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        queries = get_landing_page()
+        for event in self.events[:2]:
+            TicketTypeDiscountFactory(
+                ticket_type=EventTicketTypeFactory(event=event),
+            )
+            EventDiscountFactory(event=event)
+        self.events += EventFactory.create_batch(
+            2,
+            organizer=self.organizer,
+            is_active=True,
+        )
+        self.assertEqual(get_landing_page(), queries)
+
+    @patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_event_api_free)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     def test_event_free_no_discount(self,
                                     mock_get_event_tickets_eb_api,
@@ -2551,16 +4161,16 @@ class LandingPageBuyerViewTest(TestCase):
         self.response = self.client.get(
             '/landing_page/{}/'.format(self.organizer.id)
         )
-        self.assertEqual(
-            len(EventTicketType.objects.filter(event=self.events[0])),
-            0,
+        self.assertFalse(
+            self.response.context['events'][self.events[0].id]['has_discount'],
         )
         self.assertEqual(
             len(TicketTypeDiscount.objects.filter(ticket_type=ticket_type)),
-            0,
+            1,
         )
 
 
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
 @patch('bundesliga_app.views.get_venue_eb_api', return_value=MOCK_VENUE_API)
 class ListingPageEventViewTest(TestCase):
     def setUp(self):
@@ -2749,6 +4359,10 @@ class ListingPageEventViewTest(TestCase):
             event=self.event,
             ticket_id_eb=mock_get_event_tickets_eb_api.return_value[1]['id']
         )
+        # The prices of the summary are saved by the sync of the events
+        update_listing_summaries(get_events_tickets_type({
+            self.event.id: mock_get_event_tickets_eb_api.return_value,
+        }))
         self.response = self.client.get(
             '/landing_page/{}/event/{}/'.format(
                 self.organizer.id, self.event.id)
@@ -2782,6 +4396,10 @@ class ListingPageEventViewTest(TestCase):
             event=self.event,
             ticket_id_eb=mock_get_event_tickets_eb_api.return_value[1]['id']
         )
+        # The prices of the summary are saved by the sync of the events
+        update_listing_summaries(get_events_tickets_type({
+            self.event.id: mock_get_event_tickets_eb_api.return_value,
+        }))
         self.response = self.client.get(
             '/landing_page/{}/event/{}/'.format(
                 self.organizer.id, self.event.id)
@@ -2813,6 +4431,10 @@ class ListingPageEventViewTest(TestCase):
             event=self.event,
             ticket_id_eb=mock_get_event_tickets_eb_api.return_value[1]['id']
         )
+        # The prices of the summary are saved by the sync of the events
+        update_listing_summaries(get_events_tickets_type({
+            self.event.id: mock_get_event_tickets_eb_api.return_value,
+        }))
         self.response = self.client.get(
             '/landing_page/{}/event/{}/'.format(
                 self.organizer.id, self.event.id)
@@ -2829,7 +4451,7 @@ class ListingPageEventViewTest(TestCase):
         )
 
     @patch(
-        'bundesliga_app.forms.validate_member_number_ds',
+        'bundesliga_app.utils.validate_member_number_ds',
         return_value=MOCK_DS_API_VALID_NUMBER.text,
     )
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
@@ -2872,7 +4494,42 @@ class ListingPageEventViewTest(TestCase):
             1
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_INVALID_NUMBER.text,)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
+    @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
+    def test_eb_helpers_called_once_per_post(
+            self,
+            mock_post_ticket_discount_code_to_eb,
+            mock_get_event_tickets_eb_api,
+            mock_get_event_eb_api,
+            mock_validate_member_number_ds,
+            mock_get_venue_eb_api):
+        for ticket in mock_get_event_tickets_eb_api.return_value:
+            ticket_type = EventTicketTypeFactory(
+                event=self.event,
+                ticket_id_eb=ticket['id'],
+            )
+            TicketTypeDiscountFactory(
+                ticket_type=ticket_type
+            )
+        self.response = self.client.post(
+            '/landing_page/{}/event/{}/'.format(
+                self.organizer.id, self.event.id),
+            {
+                'tickets_type': ticket_type.id,
+                'member_number_1': '1234',
+                'g-recaptcha-response': '1234567'
+            },
+        )
+        self.assertEqual(self.response.status_code, 200)
+        mock_get_event_eb_api.assert_called_once()
+        mock_get_venue_eb_api.assert_called_once()
+        mock_get_event_tickets_eb_api.assert_called_once()
+        mock_validate_member_number_ds.assert_called_once()
+        mock_post_ticket_discount_code_to_eb.assert_called_once()
+
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_INVALID_NUMBER.text,)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -2916,7 +4573,7 @@ class ListingPageEventViewTest(TestCase):
             "Invalid member number"
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_INVALID_NUMBER.text,)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_INVALID_NUMBER.text,)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -2954,7 +4611,7 @@ class ListingPageEventViewTest(TestCase):
             "Invalid member numbers 1234, 45678"
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -2998,7 +4655,7 @@ class ListingPageEventViewTest(TestCase):
             2
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -3035,7 +4692,7 @@ class ListingPageEventViewTest(TestCase):
             'Repeated member number'
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -3083,7 +4740,7 @@ class ListingPageEventViewTest(TestCase):
             'Number 1234 has already used the discount for this event'
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -3131,13 +4788,15 @@ class ListingPageEventViewTest(TestCase):
             'Number 1234 has already used the discount for this event'
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_MULTIPLE_USAGES)
+    @patch('bundesliga_app.views.update_discount_code_to_eb', return_value=MOCK_UPDATE_DISCOUNT_CODE_TO_EB)
     def test_get_discount_for_unused_discount_multiple_uses(
         self,
+        mock_update_discount_code_to_eb,
         mock_check_discount_code_in_eb,
         mock_post_ticket_discount_code_to_eb,
         mock_get_event_tickets_eb_api,
@@ -3192,7 +4851,7 @@ class ListingPageEventViewTest(TestCase):
         )
 
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -3257,7 +4916,7 @@ class ListingPageEventViewTest(TestCase):
             self.used_status.id
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -3322,13 +4981,15 @@ class ListingPageEventViewTest(TestCase):
             self.used_status.id
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_ONE_USE_NOT_USED)
+    @patch('bundesliga_app.views.delete_discount_code_from_eb', return_value=MOCK_DELETE_DISCOUNT_EB)
     def test_get_discount_not_used(
         self,
+        mock_delete_discount_code_from_eb,
         mock_check_discount_code_in_eb,
         mock_post_ticket_discount_code_to_eb,
         mock_get_event_tickets_eb_api,
@@ -3372,7 +5033,7 @@ class ListingPageEventViewTest(TestCase):
             )
 
     @patch(
-        'bundesliga_app.forms.validate_member_number_ds',
+        'bundesliga_app.utils.validate_member_number_ds',
         return_value='Invalid Request',
     )
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
@@ -3414,7 +5075,7 @@ class ListingPageEventViewTest(TestCase):
         self.assertContains(self.response, "Invalid request")
 
     @patch(
-        'bundesliga_app.forms.validate_member_number_ds',
+        'bundesliga_app.utils.validate_member_number_ds',
         return_value=MOCK_DS_API_VALID_NUMBER.text,
     )
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
@@ -3454,7 +5115,88 @@ class ListingPageEventViewTest(TestCase):
             1
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch(
+        'bundesliga_app.utils.validate_member_number_ds',
+        return_value=MOCK_DS_API_VALID_NUMBER.text,
+    )
+    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    def test_valid_member_number_without_discount(
+            self,
+            mock_get_event_eb_api,
+            mock_validate_member_number_ds,
+            mock_get_venue_eb_api):
+        # The discount of the event was deleted after the page was loaded
+        self.response = self.client.post(
+            '/landing_page/{}/event/{}/'.format(
+                self.organizer.id, self.event.id),
+            {
+                'member_number_1': '1234',
+                'g-recaptcha-response': '1234567'
+            },
+        )
+        self.assertContains(
+            self.response,
+            'This event does not have discounts available',
+        )
+        self.assertFalse(DiscountCode.objects.exists())
+
+    def _post_member_numbers_with_prior_codes(self, members):
+        """ Post a family of members that have used and unknown codes
+        of the discount of other event, and count its queries """
+        other_discount = EventDiscountFactory(
+            event=EventFactory(organizer=self.organizer, is_active=True),
+            discount_type=self.discount_type_event,
+        )
+        data = {'g-recaptcha-response': '1234567'}
+        for member in range(1, members + 1):
+            member_number = str(1000 * members + member)
+            data['member_number_{}'.format(member)] = member_number
+            for status in (self.used_status, self.unknown_status):
+                MemberDiscountCodeFactory(
+                    member_number=member_number,
+                    discount_code=DiscountCodeFactory(discount=other_discount),
+                    status=status,
+                )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/landing_page/{}/event/{}/'.format(
+                    self.organizer.id, self.event.id),
+                data,
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+    @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
+    def test_verify_member_numbers_queries_do_not_grow_with_members(
+        self,
+        mock_post_event_discount_code_to_eb,
+        mock_get_event_eb_api,
+        mock_validate_member_number_ds,
+        mock_get_venue_eb_api):
+
+        EventDiscountFactory(
+            event=self.event,
+            discount_type=self.discount_type_event,
+        )
+        self.client.get(
+            '/landing_page/{}/event/{}/'.format(
+                self.organizer.id, self.event.id)
+        )
+        warm_lookups()
+        one_member_queries = self._post_member_numbers_with_prior_codes(1)
+        ten_members_queries = self._post_member_numbers_with_prior_codes(10)
+        self.assertEqual(one_member_queries, ten_members_queries)
+        self.assertEqual(
+            MemberDiscountCode.objects.filter(
+                status=self.unknown_status,
+                discount_code__discount__eventdiscount__event=self.event,
+            ).count(),
+            11,
+        )
+
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     def test_multiple_valid_numbers_event_discount(
@@ -3495,12 +5237,14 @@ class ListingPageEventViewTest(TestCase):
             2
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_ONE_USE_NOT_USED)
+    @patch('bundesliga_app.views.delete_discount_code_from_eb', return_value=MOCK_DELETE_DISCOUNT_EB)
     def test_get_discount_not_used_event_discount(
         self,
+        mock_delete_discount_code_from_eb,
         mock_check_discount_code_in_eb,
         mock_post_event_discount_code_to_eb,
         mock_get_event_eb_api,
@@ -3540,7 +5284,7 @@ class ListingPageEventViewTest(TestCase):
                 1
             )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
@@ -3585,7 +5329,7 @@ class ListingPageEventViewTest(TestCase):
             'Number 1234 has already used the discount for this event'
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_WITH_USAGE)
@@ -3630,12 +5374,14 @@ class ListingPageEventViewTest(TestCase):
             'Number 1234 has already used the discount for this event'
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_MULTIPLE_USAGES)
+    @patch('bundesliga_app.views.update_discount_code_to_eb', return_value=MOCK_UPDATE_DISCOUNT_CODE_TO_EB)
     def test_get_discount_for_unused_discount_multiple_uses_event_discount(
         self,
+        mock_update_discount_code_to_eb,
         mock_check_discount_code_in_eb,
         mock_post_event_discount_code_to_eb,
         mock_get_event_eb_api,
@@ -3687,7 +5433,7 @@ class ListingPageEventViewTest(TestCase):
             self.unknown_status.id
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_MULTIPLE_USAGES_ONE_USED)
@@ -3748,7 +5494,7 @@ class ListingPageEventViewTest(TestCase):
             self.used_status.id
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_MULTIPLE_USAGES_ONE_USED)
@@ -3809,7 +5555,7 @@ class ListingPageEventViewTest(TestCase):
             self.used_status.id
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_MULTIPLE_USAGES_ONE_USED)
@@ -3884,7 +5630,7 @@ class ListingPageEventViewTest(TestCase):
             2
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
     @patch('bundesliga_app.views.check_discount_code_in_eb', return_value=MOCK_DISCOUNT_EXISTS_IN_EB_MULTIPLE_USAGES_ONE_USED)
@@ -3960,7 +5706,7 @@ class ListingPageEventViewTest(TestCase):
             2
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_ticket_discount_code_to_eb', return_value={})
@@ -4012,7 +5758,7 @@ class ListingPageEventViewTest(TestCase):
             1
         )
 
-    @patch('bundesliga_app.forms.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
+    @patch('bundesliga_app.utils.validate_member_number_ds', return_value=MOCK_DS_API_VALID_NUMBER.text)
     @patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
     @patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=get_mock_event_tickets_api_paid())
     @patch('bundesliga_app.views.post_event_discount_code_to_eb', return_value={})
@@ -4085,3 +5831,982 @@ class ActivateLanguageViewTest(TestBase):
             self.page,
             "administrar los descuentos",
         )
+
+
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
+@patch('bundesliga_app.utils.get_auth_token', return_value='TEST')
+class ReconcileEventsTest(TestCase):
+    def setUp(self):
+        self.organizer = OrganizerFactory()
+        AuthFactory(user=self.organizer)
+        self.free_event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        self.paid_event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        EventDiscountFactory(event=self.free_event)
+        self.free_event_ticket_type = EventTicketTypeFactory(
+            event=self.free_event,
+        )
+        TicketTypeDiscountFactory(ticket_type=self.free_event_ticket_type)
+        self.free_ticket_type = EventTicketTypeFactory(
+            event=self.paid_event,
+            ticket_id_eb=MOCK_EVENT_TICKETS[0][0]['id'],
+        )
+        TicketTypeDiscountFactory(ticket_type=self.free_ticket_type)
+        self.paid_ticket_type = EventTicketTypeFactory(
+            event=self.paid_event,
+            ticket_id_eb=MOCK_EVENT_TICKETS[0][1]['id'],
+        )
+        TicketTypeDiscountFactory(ticket_type=self.paid_ticket_type)
+
+    def get_event(self, token, event_id):
+        if event_id == str(self.free_event.event_id):
+            return get_mock_event_api_free()
+        return get_mock_events_api()
+
+    def test_reconcile_organizer_events(self, mock_get_auth_token):
+        with patch('bundesliga_app.utils.get_event_eb_api', side_effect=self.get_event), \
+                patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=MOCK_EVENT_TICKETS[0]) as mock_get_event_tickets_eb_api:
+            deleted = reconcile_organizer_events(self.organizer)
+        self.assertEqual(
+            deleted,
+            {
+                'free_events': 1,
+                'event_discounts': 1,
+                'ticket_discounts': 2,
+                'tickets_type': 1,
+                'tickets_type_created': 2,
+                'summaries': 1,
+            }
+        )
+        # Only the tickets of the paid event are fetched
+        mock_get_event_tickets_eb_api.assert_called_once_with(
+            'TEST',
+            str(self.paid_event.event_id),
+        )
+        self.assertFalse(
+            EventDiscount.objects.filter(event=self.free_event).exists()
+        )
+        self.assertFalse(
+            EventTicketType.objects.filter(event=self.free_event).exists()
+        )
+        self.assertFalse(
+            TicketTypeDiscount.objects.filter(
+                ticket_type=self.free_ticket_type).exists()
+        )
+        self.assertTrue(
+            TicketTypeDiscount.objects.filter(
+                ticket_type=self.paid_ticket_type).exists()
+        )
+
+    def test_reconcile_ticket_types_not_in_eb(self, mock_get_auth_token):
+        old_ticket_type = EventTicketTypeFactory(event=self.paid_event)
+        TicketTypeDiscountFactory(ticket_type=old_ticket_type)
+        with patch('bundesliga_app.utils.get_event_eb_api', side_effect=self.get_event), \
+                patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=MOCK_EVENT_TICKETS[0]):
+            deleted = reconcile_organizer_events(self.organizer)
+        self.assertEqual(deleted['tickets_type'], 2)
+        self.assertEqual(deleted['ticket_discounts'], 3)
+        self.assertFalse(
+            EventTicketType.objects.filter(id=old_ticket_type.id).exists()
+        )
+        # The tickets of EB that were not in our DB are created
+        self.assertEqual(
+            set(EventTicketType.objects.filter(
+                event=self.paid_event,
+            ).values_list('ticket_id_eb', flat=True)),
+            {ticket['id'] for ticket in MOCK_EVENT_TICKETS[0]},
+        )
+        self.assertTrue(
+            TicketTypeDiscount.objects.filter(
+                ticket_type=self.paid_ticket_type).exists()
+        )
+
+    def test_reconcile_events_command(self, mock_get_auth_token):
+        out = StringIO()
+        with patch('bundesliga_app.utils.get_event_eb_api', side_effect=self.get_event), \
+                patch('bundesliga_app.utils.get_event_tickets_eb_api', return_value=MOCK_EVENT_TICKETS[0]):
+            call_command('reconcile_events', stdout=out)
+        self.assertEqual(
+            out.getvalue(),
+            'Organizer {}: 1 free events, deleted 1 event discounts, '
+            '2 ticket discounts and 1 ticket types, '
+            'created 2 ticket types\n'.format(
+                self.organizer.id),
+        )
+
+    def test_reconcile_events_command_error(self, mock_get_auth_token):
+        out = StringIO()
+        err = StringIO()
+        with patch('bundesliga_app.utils.get_event_eb_api', side_effect=Exception('EB is down')):
+            call_command('reconcile_events', stdout=out, stderr=err)
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(
+            err.getvalue(),
+            'Organizer {}: EB is down\n'.format(self.organizer.id),
+        )
+        self.assertTrue(
+            EventDiscount.objects.filter(event=self.free_event).exists()
+        )
+
+
+    @patch('bundesliga_app.management.commands.reconcile_events.sleep',
+           side_effect=[None, KeyboardInterrupt])
+    @patch('bundesliga_app.management.commands.reconcile_events.close_old_connections')
+    @patch('bundesliga_app.management.commands.reconcile_events.Command.reconcile',
+           side_effect=[DatabaseError('connection lost'), None])
+    def test_reconcile_events_worker_continues_after_error(
+            self,
+            mock_reconcile,
+            mock_close_old_connections,
+            mock_sleep,
+            mock_get_auth_token):
+        with self.assertLogs(
+                'bundesliga_app.management.commands.reconcile_events',
+                'ERROR') as logs, self.assertRaises(KeyboardInterrupt):
+            call_command('reconcile_events', interval=600)
+        self.assertEqual(mock_reconcile.call_count, 2)
+        # The connections are checked before each iteration
+        self.assertEqual(mock_close_old_connections.call_count, 2)
+        self.assertIn('connection lost', logs.output[0])
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class SyncOrganizerEventsTest(TestCase):
+    def setUp(self):
+        self.organizer = OrganizerFactory()
+        self.tickets_eb = MOCK_EVENT_TICKETS[0]
+        self.event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        self.free_ticket_type = EventTicketTypeFactory(
+            event=self.event,
+            ticket_id_eb=self.tickets_eb[0]['id'],
+        )
+        TicketTypeDiscountFactory(ticket_type=self.free_ticket_type)
+        self.old_ticket_type = EventTicketTypeFactory(event=self.event)
+        TicketTypeDiscountFactory(ticket_type=self.old_ticket_type)
+        self.unselected_event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        EventDiscountFactory(event=self.unselected_event)
+        EventTicketTypeFactory(event=self.unselected_event)
+        # The events of other organizers are not changed
+        self.other_ticket_type = EventTicketTypeFactory(
+            event=EventFactory(is_active=True),
+        )
+        TicketTypeDiscountFactory(ticket_type=self.other_ticket_type)
+
+    def test_sync_organizer_events(self):
+        synced = sync_organizer_events(self.organizer, {
+            str(self.event.event_id): self.tickets_eb[:2],
+            'NEW': self.tickets_eb[2:],
+        })
+        self.assertEqual(
+            synced,
+            {
+                'events_created': 1,
+                'events_deactivated': 1,
+                'tickets_type_created': 3,
+                'event_discounts': 1,
+                'ticket_discounts': 2,
+                'tickets_type': 2,
+            }
+        )
+        self.assertTrue(
+            Event.objects.get(event_id='NEW', organizer=self.organizer).is_active
+        )
+        self.assertFalse(
+            Event.objects.get(id=self.unselected_event.id).is_active
+        )
+        self.assertEqual(
+            set(EventTicketType.objects.filter(
+                event__organizer=self.organizer,
+            ).values_list('ticket_id_eb', flat=True)),
+            {ticket_eb['id'] for ticket_eb in self.tickets_eb},
+        )
+        self.assertTrue(
+            EventTicketType.objects.filter(id=self.free_ticket_type.id).exists()
+        )
+        self.assertFalse(
+            TicketTypeDiscount.objects.filter(
+                ticket_type=self.free_ticket_type).exists()
+        )
+        self.assertTrue(
+            TicketTypeDiscount.objects.filter(
+                ticket_type=self.other_ticket_type).exists()
+        )
+
+    def test_sync_organizer_events_nothing_changed(self):
+        sync_organizer_events(self.organizer, {
+            str(self.event.event_id): self.tickets_eb,
+        })
+        synced = sync_organizer_events(self.organizer, {
+            str(self.event.event_id): self.tickets_eb,
+        })
+        self.assertFalse(any(synced.values()))
+
+    def test_sync_organizer_events_queries_do_not_grow(self):
+        def sync(count):
+            events_tickets = {}
+            for number in range(count):
+                tickets = copy.deepcopy(self.tickets_eb[1:])
+                for ticket in tickets:
+                    ticket['id'] = '{}-{}-{}'.format(ticket['id'], count, number)
+                events_tickets['EVENT-{}-{}'.format(count, number)] = tickets
+            with CaptureQueriesContext(connection) as queries:
+                sync_organizer_events(OrganizerFactory(), events_tickets)
+            return len(queries)
+        self.assertEqual(sync(1), sync(10))
+
+    def test_sync_organizer_events_deletes_do_not_grow(self):
+        # The receivers of each deleted row are paused,
+        # the summary of the event is refreshed once
+        def create_event(count):
+            organizer = OrganizerFactory()
+            event = EventFactory(organizer=organizer, is_active=True)
+            EventDiscountFactory(event=event)
+            for number in range(count):
+                TicketTypeDiscountFactory(
+                    ticket_type=EventTicketTypeFactory(event=event),
+                )
+            return organizer, event
+
+        for count in (1, 10):
+            organizer, event = create_event(count)
+            with self.assertNumQueries(21):
+                synced = sync_organizer_events(organizer, {})
+            self.assertEqual(synced['tickets_type'], count)
+            self.assertEqual(synced['ticket_discounts'], count)
+            summary = EventListingSummary.objects.get(event=event)
+            self.assertEqual(summary.ticket_count, 0)
+            self.assertFalse(summary.tickets_discount_available)
+            self.assertFalse(summary.event_discount_available)
+            self.assertIsNone(summary.prices_updated)
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class EventListingSummaryTest(TestCase):
+    def setUp(self):
+        self.event = EventFactory(is_active=True)
+        self.tickets_eb = get_mock_event_tickets_api_paid()
+        self.ticket_type = EventTicketTypeFactory(
+            event=self.event,
+            ticket_id_eb=self.tickets_eb[0]['id'],
+        )
+        self.tickets_type = {str(self.ticket_type.id): self.tickets_eb[0]}
+
+    def _get_summary(self):
+        return get_listing_summary(
+            Event.objects.select_related('listing_summary').get(
+                id=self.event.id,
+            )
+        )
+
+    def test_summary_created_with_the_event(self):
+        summary = EventListingSummary.objects.get(event=self.event)
+        self.assertEqual(summary.ticket_count, 1)
+        self.assertIsNone(summary.min_price)
+        self.assertIsNone(summary.prices_updated)
+
+    def test_update_listing_summaries(self):
+        TicketTypeDiscountFactory(ticket_type=self.ticket_type, value=20)
+        saved = update_listing_summaries({self.event.id: self.tickets_type})
+        self.assertEqual(saved, 1)
+        summary = self._get_summary()
+        self.assertEqual(summary.min_discount, 20)
+        self.assertEqual(summary.max_discount, 20)
+        self.assertTrue(summary.tickets_discount_available)
+        self.assertFalse(summary.event_discount_available)
+        self.assertEqual(summary.ticket_count, 1)
+        self.assertEqual(
+            summary.min_price,
+            float(self.tickets_eb[0]['actual_cost']['major_value']),
+        )
+        self.assertIsNotNone(summary.prices_updated)
+
+    def test_update_listing_summaries_queries_do_not_grow(self):
+        def update(count):
+            events_tickets_type = {}
+            for number in range(count):
+                event = EventFactory(is_active=True)
+                ticket_type = EventTicketTypeFactory(event=event)
+                TicketTypeDiscountFactory(ticket_type=ticket_type)
+                EventDiscountFactory(event=event)
+                events_tickets_type[event.id] = {
+                    str(ticket_type.id): self.tickets_eb[0],
+                }
+            with CaptureQueriesContext(connection) as queries:
+                update_listing_summaries(events_tickets_type)
+            return len(queries)
+        self.assertEqual(update(1), update(10))
+
+    def test_get_events_tickets_type(self):
+        self.assertEqual(
+            get_events_tickets_type({self.event.id: self.tickets_eb}),
+            {self.event.id: self.tickets_type},
+        )
+
+    def test_get_listing_summary_without_queries(self):
+        update_listing_summaries({self.event.id: self.tickets_type})
+        event = Event.objects.select_related('listing_summary').get(
+            id=self.event.id,
+        )
+        # The summary is only read, the prices are not computed again
+        with self.assertNumQueries(0):
+            summary = get_listing_summary(event)
+        self.assertEqual(summary.max_price_display, '$20.00')
+
+    def test_get_listing_summary_of_event_without_summary(self):
+        TicketTypeDiscountFactory(ticket_type=self.ticket_type, value=20)
+        EventListingSummary.objects.all().delete()
+        event = Event.objects.select_related('listing_summary').get(
+            id=self.event.id,
+        )
+        # The summary is saved with the discounts of our DB
+        summary = get_listing_summary(event)
+        self.assertIsNotNone(summary.pk)
+        self.assertTrue(summary.tickets_discount_available)
+        self.assertEqual(summary.max_discount, 20)
+        self.assertIsNone(summary.prices_updated)
+
+    def test_fill_listing_summaries_migration(self):
+        migration = importlib.import_module(
+            'bundesliga_app.migrations.0006_fill_listing_summaries')
+        EventDiscountFactory(event=self.event, value=30)
+        other_event = EventFactory(is_active=True)
+        EventListingSummary.objects.all().delete()
+        with patch.object(migration, 'BATCH_SIZE', 1):
+            migration.fill_listing_summaries(apps, None)
+        summary = EventListingSummary.objects.get(event=self.event)
+        self.assertTrue(summary.event_discount_available)
+        self.assertEqual(summary.event_discount, 30)
+        self.assertEqual(summary.ticket_count, 1)
+        self.assertTrue(
+            EventListingSummary.objects.filter(event=other_event).exists()
+        )
+
+    def test_summary_updated_when_discounts_change(self):
+        discount = TicketTypeDiscountFactory(
+            ticket_type=self.ticket_type,
+            value=10,
+        )
+        EventDiscountFactory(event=self.event, value=30)
+        summary = EventListingSummary.objects.get(event=self.event)
+        self.assertEqual(summary.max_discount, 10)
+        self.assertTrue(summary.tickets_discount_available)
+        self.assertEqual(summary.event_discount, 30)
+        self.assertTrue(summary.event_discount_available)
+        discount.delete()
+        summary.refresh_from_db()
+        self.assertFalse(summary.tickets_discount_available)
+        self.assertEqual(summary.max_discount, 0)
+
+    def test_summary_prices_reset_when_ticket_types_change(self):
+        update_listing_summaries({self.event.id: self.tickets_type})
+        EventTicketTypeFactory(event=self.event)
+        summary = EventListingSummary.objects.get(event=self.event)
+        self.assertEqual(summary.ticket_count, 2)
+        self.assertIsNone(summary.prices_updated)
+
+    def test_update_and_refresh_give_the_same_summary(self):
+        TicketTypeDiscountFactory(ticket_type=self.ticket_type, value=20)
+        # The ticket type is not in EB until the next sync deletes it
+        TicketTypeDiscountFactory(
+            ticket_type=EventTicketTypeFactory(event=self.event),
+            value=50,
+        )
+        fields = [
+            'min_discount',
+            'max_discount',
+            'tickets_discount_available',
+            'event_discount',
+            'event_discount_available',
+            'ticket_count',
+        ]
+        update_listing_summaries({self.event.id: self.tickets_type})
+        updated = EventListingSummary.objects.filter(
+            event=self.event,
+        ).values(*fields).get()
+        refresh_listing_summary(self.event.id)
+        refreshed = EventListingSummary.objects.filter(
+            event=self.event,
+        ).values(*fields).get()
+        self.assertEqual(updated, refreshed)
+        self.assertEqual(refreshed['max_discount'], 50)
+
+    def test_refresh_without_summary_does_not_create_it(self):
+        EventListingSummary.objects.all().delete()
+        refresh_listing_summary(self.event.id)
+        self.assertFalse(
+            EventListingSummary.objects.filter(event=self.event).exists()
+        )
+
+    def test_event_with_summary_deleted(self):
+        TicketTypeDiscountFactory(ticket_type=self.ticket_type)
+        self.event.delete()
+        self.assertFalse(EventListingSummary.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CACHE_TTL=0)
+@patch('bundesliga_app.views.get_venue_eb_api', return_value=MOCK_VENUE_API)
+@patch('bundesliga_app.views.get_event_eb_api', side_effect=get_mock_events_api)
+@patch('bundesliga_app.utils.get_event_eb_api', side_effect=get_mock_events_api)
+class CachedPageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = OrganizerFactory()
+        self.event = EventFactory(
+            organizer=self.organizer,
+            is_active=True,
+        )
+        self.landing_url = '/landing_page/{}/'.format(self.organizer.id)
+        self.listing_url = '/landing_page/{}/event/{}/'.format(
+            self.organizer.id,
+            self.event.id,
+        )
+
+    def test_landing_page_served_from_cache(self, mock_utils_event, *args):
+        first = self.client.get(self.landing_url)
+        second = self.client.get(self.landing_url)
+        self.assertEqual(mock_utils_event.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('public', second['Cache-Control'])
+        self.assertIn('Last-Modified', second)
+
+    def test_landing_page_not_modified(self, *args):
+        first = self.client.get(self.landing_url)
+        response = self.client.get(
+            self.landing_url,
+            HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_landing_page_not_modified_only_while_cached(self, mock_utils_event, *args):
+        first = self.client.get(self.landing_url)
+        # The values of EB could have changed when the page expires
+        cache.clear()
+        with patch('bundesliga_app.views.LandingPageBuyerView._get_events',
+                   return_value={}):
+            response = self.client.get(
+                self.landing_url,
+                HTTP_IF_NONE_MATCH=first['ETag'],
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_landing_page_not_cached_when_an_event_is_missing(self, *args):
+        # The event could not be fetched from EB before the deadline
+        with patch('bundesliga_app.views.fetch_events_bulk',
+                   return_value=[None]) as mock_fetch:
+            first = self.client.get(self.landing_url)
+            second = self.client.get(self.landing_url)
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertNotIn('ETag', second)
+        self.assertIn('no-cache', second['Cache-Control'])
+        self.assertNotIn('public', second['Cache-Control'])
+        self.assertContains(first, 'Some events could not be loaded')
+        # The complete page is cached again
+        self.client.get(self.landing_url)
+        self.assertIn('public', self.client.get(self.landing_url)['Cache-Control'])
+
+    def test_landing_page_invalidated_by_discount(self, mock_utils_event, *args):
+        first = self.client.get(self.landing_url)
+        EventDiscountFactory(event=self.event)
+        second = self.client.get(self.landing_url)
+        self.assertEqual(mock_utils_event.call_count, 2)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_pages_of_other_organizer_not_invalidated(self, *args):
+        version = get_organizer_pages_version(self.organizer.id)
+        invalidate_organizer_pages(OrganizerFactory().id)
+        self.assertEqual(
+            get_organizer_pages_version(self.organizer.id),
+            version,
+        )
+
+    def test_listing_page_has_csrf_token_of_user(self, *args):
+        self.client.get(self.listing_url)
+        response = self.client.get(self.listing_url)
+        content = response.content.decode()
+        self.assertNotIn('CSRF-TOKEN-PLACEHOLDER', content)
+        self.assertIn('csrfmiddlewaretoken', content)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_listing_page_not_modified_is_private(self, *args):
+        first = self.client.get(self.listing_url)
+        response = self.client.get(
+            self.listing_url,
+            HTTP_IF_NONE_MATCH=first['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+        # The shared caches do not keep the token of the visitor
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_authenticated_user_not_cached(self, mock_utils_event, *args):
+        AuthFactory(provider='eventbrite', user=self.organizer)
+        self.client.login(username=self.organizer.username, password='12345')
+        self.client.get(self.landing_url)
+        response = self.client.get(self.landing_url)
+        self.assertEqual(mock_utils_event.call_count, 2)
+        self.assertNotIn('ETag', response)
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class LookupsTest(TestCase):
+    def setUp(self):
+        clear_lookups()
+
+    def tearDown(self):
+        # The edits of the tests are rolled back
+        clear_lookups()
+
+    def test_lookups_without_queries_after_warm(self):
+        warm_lookups()
+        with self.assertNumQueries(0):
+            status = get_lookup(StatusMemberDiscountCode, 'Used')
+            discount_type = get_lookup(DiscountType, 'Event')
+        self.assertEqual(
+            status,
+            StatusMemberDiscountCode.objects.get(name='Used'),
+        )
+        self.assertEqual(discount_type, DiscountType.objects.get(name='Event'))
+
+    def test_lookup_does_not_exist(self):
+        with self.assertRaises(StatusMemberDiscountCode.DoesNotExist):
+            get_lookup(StatusMemberDiscountCode, 'Expired')
+
+    def test_lookup_edited(self):
+        status = get_lookup(StatusMemberDiscountCode, 'Canceled')
+        status.name = 'Cancelled'
+        status.save()
+        self.assertEqual(
+            get_lookup(StatusMemberDiscountCode, 'Cancelled').id,
+            status.id,
+        )
+        with self.assertRaises(StatusMemberDiscountCode.DoesNotExist):
+            get_lookup(StatusMemberDiscountCode, 'Canceled')
+
+    def test_lookup_loaded_again_when_expired(self):
+        get_lookup(DiscountType, 'Event')
+        LOOKUPS[DiscountType]['expires'] = 0
+        with self.assertNumQueries(1):
+            get_lookup(DiscountType, 'Event')
+
+
+@override_settings(CACHES=DUMMY_CACHE)
+class QueryPlanTest(TestCase):
+    """ The plans of the queries of the hot paths, each one uses an index """
+
+    def _explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            else:
+                # The tables of the tests are too small to use an index
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def test_active_events_of_organizer(self):
+        plan = self._explain(Event.objects.filter(
+            organizer=OrganizerFactory(),
+            is_active=True,
+        ).order_by('id'))
+        self.assertTrue(
+            Event._meta.indexes[0].name in plan or
+            'bundesliga_event_active_idx' in plan,
+            plan,
+        )
+
+    def test_member_number_with_status(self):
+        plan = self._explain(MemberDiscountCode.objects.filter(
+            member_number='1234',
+            status=StatusMemberDiscountCode.objects.get(name='Unknown'),
+        ))
+        self.assertIn(MemberDiscountCode._meta.indexes[0].name, plan)
+
+    def test_discount_code(self):
+        plan = self._explain(DiscountCode.objects.filter(
+            discount_code='code',
+        ))
+        self.assertIn(DiscountCode._meta.indexes[0].name, plan)
+
+    def test_codes_of_discount(self):
+        plan = self._explain(DiscountCode.objects.filter(
+            discount=EventDiscountFactory(),
+        ).values_list('discount_code', flat=True))
+        self.assertIn(DiscountCode._meta.indexes[1].name, plan)
+
+    def test_tickets_type_of_event(self):
+        plan = self._explain(EventTicketType.objects.filter(
+            event=EventFactory(),
+        ).values_list('ticket_id_eb', flat=True))
+        self.assertIn(EventTicketType._meta.indexes[0].name, plan)
+
+    def test_event_has_one_discount(self):
+        event_discount = EventDiscountFactory()
+        with self.assertRaises(IntegrityError):
+            EventDiscountFactory(event=event_discount.event)
+
+    def test_ticket_type_has_one_discount(self):
+        ticket_discount = TicketTypeDiscountFactory()
+        with self.assertRaises(IntegrityError):
+            TicketTypeDiscountFactory(ticket_type=ticket_discount.ticket_type)
+
+
+class QueryBudgetsTest(TestCase):
+    def test_scaling_exponent(self):
+        self.assertEqual(scaling_exponent({1: 8, 2: 8, 4: 8}), 0)
+        self.assertAlmostEqual(scaling_exponent({1: 8, 2: 9, 4: 11}), 1)
+        self.assertAlmostEqual(scaling_exponent({1: 8, 2: 10, 4: 14}), 1)
+        self.assertAlmostEqual(scaling_exponent({1: 8, 2: 9, 4: 17}), 2)
+        # One more query for any size over the first one
+        self.assertAlmostEqual(scaling_exponent({1: 8, 2: 9, 4: 9}), 0)
+
+    def test_record_queries_with_call_site(self):
+        with record_queries() as queries:
+            get_lookup(StatusMemberDiscountCode, 'Used')
+            list(Event.objects.all())
+        self.assertEqual(len(queries), 2)
+        self.assertIn('bundesliga_app/utils.py', queries[0]['site'])
+        self.assertIn('in load_lookup', queries[0]['site'])
+        # The queries of the tests do not have a call site in the app
+        self.assertEqual(queries[1]['site'], 'unknown')
+        self.assertEqual(
+            top_call_sites(queries + queries[:1]),
+            [(queries[0]['site'], 2), ('unknown', 1)],
+        )
+
+    def test_save_budget(self):
+        path = os.path.join(tempfile.mkdtemp(), 'budgets.json')
+        self.assertEqual(load_budgets(path), {})
+        save_budget('home', {1: 8, 2: 8}, 0, path)
+        save_budget('landing', {1: 5, 2: 6}, 1, path)
+        self.assertEqual(load_budgets(path), {
+            'home': {'exponent': 0, 'queries': {'1': 8, '2': 8}},
+            'landing': {'exponent': 1, 'queries': {'1': 5, '2': 6}},
+        })
+
+
+# The budgets of the queries of each view of the urls, by the name of the url
+URL_QUERY_BUDGETS = {
+    'index': ('home:events', 'home:tickets_type'),
+    'select_events': (
+        'select_events:get_events',
+        'select_events:events',
+        'select_events:deleted_tickets_type',
+    ),
+    'events_discount': ('event_discounts:tickets_type',),
+    'sync_event_tickets': ('sync_event_tickets:tickets_type',),
+    'create_discount_ticket_type': (
+        'modify_discount_ticket_type:tickets_type',
+        'modify_discount_ticket_type:post_tickets_type',
+    ),
+    'modify_discount_ticket_type': (
+        'modify_discount_ticket_type:tickets_type',
+        'modify_discount_ticket_type:post_tickets_type',
+    ),
+    'create_discount_event': (
+        'create_discount_event:tickets_type',
+        'create_discount_event:post_tickets_type',
+    ),
+    'modify_discount_event': (
+        'create_discount_event:tickets_type',
+        'create_discount_event:post_tickets_type',
+    ),
+    'delete_discount': ('delete_discount:discount_codes',),
+    'landing_page_buyer': ('landing_page:events',),
+    'listing_page_event': ('listing_page:tickets_type',),
+    'activate_language': ('activate_language:events',),
+    'metrics': ('metrics:events',),
+}
+
+
+@override_settings(CACHES=DUMMY_CACHE, CACHE_TTL=0)
+class ViewsQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """ The queries of the views by the size of their data,
+    the budgets are in query_budgets.json """
+
+    def setUp(self):
+        clear_lookups()
+        self.next_event = 0
+        fake_apis = use_fake_apis(events=200, latency=0)
+        fake_apis.__enter__()
+        self.addCleanup(fake_apis.__exit__, None, None, None)
+
+    def _create_organizer(self):
+        organizer = OrganizerFactory()
+        AuthFactory(
+            user=organizer,
+            uid=str(organizer.id),
+            extra_data={'access_token': 'TOKEN-{}'.format(organizer.id)},
+        )
+        return organizer
+
+    def _create_events(self, organizer, count, tickets=2):
+        """ Create events of the fake APIs, with tickets type with discount
+        and a member discount code for each one """
+        events = []
+        for number in range(count):
+            event = EventFactory(
+                event_id=str(FIRST_EVENT_ID + self.next_event),
+                organizer=organizer,
+                is_active=True,
+            )
+            self.next_event += 1
+            for ticket in range(1, tickets + 1):
+                discount = TicketTypeDiscountFactory(
+                    ticket_type=EventTicketTypeFactory(
+                        event=event,
+                        ticket_id_eb='{}-{}'.format(event.event_id, ticket),
+                    ),
+                    discount_type=get_lookup(DiscountType, 'Ticket Type'),
+                )
+                MemberDiscountCodeFactory(
+                    discount_code=DiscountCodeFactory(discount=discount),
+                    status=get_lookup(StatusMemberDiscountCode, 'Unknown'),
+                )
+            events.append(event)
+        return events
+
+    def test_home_by_events(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            self._create_events(organizer, size)
+            self.client.force_login(organizer)
+            return lambda: self.client.get('/')
+        self.assertQueryBudget('home:events', prepare)
+
+    def test_home_by_tickets_type(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            self._create_events(organizer, 2, tickets=size)
+            self.client.force_login(organizer)
+            return lambda: self.client.get('/')
+        self.assertQueryBudget('home:tickets_type', prepare, (1, 2, 3))
+
+    def test_event_discounts_by_tickets_type(self):
+        # The event has in EB the paid tickets type of our DB
+        def get_tickets(token, event_id):
+            return [
+                dict(copy.deepcopy(TICKETS[1]), id=ticket_type.ticket_id_eb)
+                for ticket_type in EventTicketType.objects.filter(
+                    event__event_id=event_id)
+            ]
+
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            self.client.force_login(organizer)
+            return lambda: self.client.get(
+                '/events_discount/{}/'.format(event.id))
+        with patch(
+                'bundesliga_app.views.get_event_tickets_eb_api',
+                side_effect=get_tickets):
+            self.assertQueryBudget('event_discounts:tickets_type', prepare)
+
+    def test_select_events_by_events(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            self.client.force_login(organizer)
+            events_id = [
+                str(FIRST_EVENT_ID + self.next_event + number)
+                for number in range(size)
+            ]
+            self.next_event += size
+            return lambda: self.client.post(
+                '/select_events/',
+                '&'.join('event_{}=on'.format(event_id)
+                         for event_id in events_id),
+                content_type='application/x-www-form-urlencoded',
+            )
+        self.assertQueryBudget('select_events:events', prepare)
+
+    def test_select_events_by_deleted_tickets_type(self):
+        # The event is not selected anymore, its tickets type are deleted.
+        # Its discounts are not in EB, the threads of the calls to EB
+        # do not see the organizer of the transaction of the test
+        def prepare(size):
+            organizer = self._create_organizer()
+            self._create_events(organizer, 1, tickets=size)
+            self.client.force_login(organizer)
+            return lambda: self.client.post(
+                '/select_events/',
+                '',
+                content_type='application/x-www-form-urlencoded',
+            )
+        with patch(
+                'bundesliga_app.views.get_event_discounts_eb_api',
+                return_value={}):
+            self.assertQueryBudget(
+                'select_events:deleted_tickets_type', prepare)
+
+    def test_landing_page_by_events(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            self._create_events(organizer, size)
+            return lambda: self.client.get(
+                '/landing_page/{}/'.format(organizer.id))
+        self.assertQueryBudget('landing_page:events', prepare)
+
+    def test_listing_page_by_tickets_type(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            return lambda: self.client.get(
+                '/landing_page/{}/event/{}/'.format(organizer.id, event.id))
+        self.assertQueryBudget(
+            'listing_page:tickets_type', prepare, (1, 2, 3))
+
+    def test_sync_event_tickets_by_tickets_type(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            self.client.force_login(organizer)
+            return lambda: self.client.post(
+                '/events_discount/{}/sync/'.format(event.id))
+        self.assertQueryBudget(
+            'sync_event_tickets:tickets_type', prepare, (1, 2, 3))
+
+    def test_create_discount_event_by_tickets_type(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            self.client.force_login(organizer)
+            return lambda: self.client.get(
+                '/events_discount/{}/event/new/'.format(event.id))
+        self.assertQueryBudget(
+            'create_discount_event:tickets_type', prepare, (1, 2, 3))
+
+    def test_create_discount_event_post_by_tickets_type(self):
+        # The discounts of the tickets type are replaced by the new one
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            self.client.force_login(organizer)
+            return lambda: self.client.post(
+                '/events_discount/{}/event/new/'.format(event.id),
+                {'discount_name': 'Members', 'discount_value': 10},
+            )
+        self.assertQueryBudget(
+            'create_discount_event:post_tickets_type', prepare, (1, 2, 3))
+
+    def test_modify_discount_ticket_type_by_tickets_type(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            ticket_type = EventTicketType.objects.filter(
+                event=event,
+            ).order_by('id').first()
+            self.client.force_login(organizer)
+            return lambda: self.client.get(
+                '/events_discount/{}/ticket_type/{}/{}/'.format(
+                    event.id,
+                    ticket_type.id,
+                    ticket_type.tickettypediscount.id,
+                ))
+        self.assertQueryBudget(
+            'modify_discount_ticket_type:tickets_type', prepare, (1, 2, 3))
+
+    def test_modify_discount_ticket_type_post_by_tickets_type(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=size)[0]
+            ticket_type = EventTicketType.objects.filter(
+                event=event,
+            ).order_by('id').first()
+            self.client.force_login(organizer)
+            return lambda: self.client.post(
+                '/events_discount/{}/ticket_type/{}/{}/'.format(
+                    event.id,
+                    ticket_type.id,
+                    ticket_type.tickettypediscount.id,
+                ),
+                {
+                    'discount_name': 'Members',
+                    'discount_value': 10,
+                    'ticket_type': 'Ticket',
+                },
+            )
+        self.assertQueryBudget(
+            'modify_discount_ticket_type:post_tickets_type',
+            prepare,
+            (1, 2, 3),
+        )
+
+    def test_delete_discount_by_discount_codes(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            event = self._create_events(organizer, 1, tickets=1)[0]
+            discount = TicketTypeDiscount.objects.get(
+                ticket_type__event=event,
+            )
+            DiscountCodeFactory.create_batch(size - 1, discount=discount)
+            self.client.force_login(organizer)
+            return lambda: self.client.post(
+                '/events_discount/{}/{}/delete/'.format(
+                    event.id, discount.id))
+        self.assertQueryBudget('delete_discount:discount_codes', prepare)
+
+    def test_select_events_get_by_events(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            self._create_events(organizer, size)
+            self.client.force_login(organizer)
+            return lambda: self.client.get('/select_events/')
+        self.assertQueryBudget('select_events:get_events', prepare)
+
+    def test_activate_language_by_events(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            self._create_events(organizer, size)
+            self.client.force_login(organizer)
+            return lambda: self.client.get(
+                '/language/activate/de/', HTTP_REFERER='/')
+        self.assertQueryBudget('activate_language:events', prepare)
+
+    def test_metrics_by_events(self):
+        def prepare(size):
+            organizer = self._create_organizer()
+            organizer.is_staff = True
+            organizer.save()
+            self._create_events(organizer, size)
+            self.client.force_login(organizer)
+            return lambda: self.client.get('/metrics/')
+        self.assertQueryBudget('metrics:events', prepare)
+
+    def test_url_views_have_budget(self):
+        # A new view of the urls needs a test of its queries above
+        budgets = load_budgets(self.query_budgets_file)
+        for pattern in urlpatterns:
+            self.assertIn(pattern.name, URL_QUERY_BUDGETS)
+            for name in URL_QUERY_BUDGETS[pattern.name]:
+                self.assertIn(name, budgets)
+
+    def test_over_budget(self):
+        path = os.path.join(tempfile.mkdtemp(), 'budgets.json')
+        save_budget('events', {1: 1, 2: 1, 4: 1}, 0, path)
+        self.query_budgets_file = path
+
+        def prepare(size):
+            EventFactory.create_batch(size)
+            # An N+1 of the events and their organizers
+            return lambda: [
+                event.organizer for event in Event.objects.all()
+            ]
+        with patch.dict(os.environ, {'QUERY_BUDGETS_UPDATE': ''}):
+            with self.assertRaises(AssertionError) as error:
+                self.assertQueryBudget('events', prepare)
+        self.assertIn('grow faster than the exponent 0', str(error.exception))
+        self.assertIn('Top call sites', str(error.exception))
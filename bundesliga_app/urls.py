@@ -5,16 +5,19 @@ from .views import (
     HomeView,
     SelectEvents,
     EventDiscountsView,
+    SyncEventTicketsView,
     DeleteDiscountView,
     LandingPageBuyerView,
     ListingPageEventView,
-    ActivateLanguageView
+    ActivateLanguageView,
+    MetricsView,
 )
 
 urlpatterns = [
     url(r'^$', HomeView.as_view(), name='index'),
     url(r'^select_events/$', SelectEvents.as_view(), name='select_events'),
     url(r'^events_discount/(?P<event_id>[0-9]+)/$', EventDiscountsView.as_view(), name='events_discount'),
+    url(r'^events_discount/(?P<event_id>[0-9]+)/sync/$', SyncEventTicketsView.as_view(), name='sync_event_tickets'),
     url(r'^events_discount/(?P<event_id>[0-9]+)/ticket_type/(?P<ticket_type_id>[0-9]+)/new/$', ManageDiscountTicketType.as_view(), name='create_discount_ticket_type'),
     url(r'^events_discount/(?P<event_id>[0-9]+)/ticket_type/(?P<ticket_type_id>[0-9]+)/(?P<discount_id>[0-9]+)/$', ManageDiscountTicketType.as_view(), name='modify_discount_ticket_type'),
     url(r'^events_discount/(?P<event_id>[0-9]+)/event/new/$', ManageDiscountEvent.as_view(), name='create_discount_event'),
@@ -23,4 +26,5 @@ urlpatterns = [
     url(r'^landing_page/(?P<organizer_id>[0-9]+)/$', LandingPageBuyerView.as_view(), name='landing_page_buyer'),
     url(r'^landing_page/(?P<organizer_id>[0-9]+)/event/(?P<event_id>[0-9]+)/$', ListingPageEventView.as_view(), name='listing_page_event'),
     url(r'language/activate/(?P<language_code>[a-z]+)/', ActivateLanguageView.as_view(), name='activate_language'),
+    url(r'^metrics/$', MetricsView.as_view(), name='metrics'),
 ]
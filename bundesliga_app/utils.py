@@ -1,27 +1,311 @@
 """ This are the methods that supports the behaviour of the views """
 from social_django.models import UserSocialAuth
 from eventbrite import Eventbrite
+from eventbrite.decorators import objectify
+from eventbrite.utils import format_path
+from eventbrite.compat import json
+from eventbrite.utils import EVENTBRITE_API_URL
 from .models import (
     Event,
     EventDiscount,
     Discount,
     DiscountCode,
+    DiscountType,
+    EventListingSummary,
     EventTicketType,
+    MemberDiscountCode,
+    StatusMemberDiscountCode,
     TicketTypeDiscount,
 )
 from django.utils.translation import ugettext_lazy as _
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
-from bundesliga_site.settings import (
-    API_KEY_DEUTSCHER_SPORTAUSWEIS,
-    DS_API_URL,
-)
-from requests import request
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.translation import get_language
+from django.http import HttpResponse, HttpResponseNotModified
+from django.middleware.csrf import get_token
+from django.contrib.messages import get_messages
+from hashlib import md5
+from . import metrics
+from requests import Session
+from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
 from json import loads
+from re import sub
+from urllib.parse import urlparse
+from random import uniform
+from threading import Lock, Thread, local
+from time import sleep, time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from dateutil import parser
 from django.core.cache import cache
 from django.conf import settings
 CACHE_TTL = getattr(settings, "CACHE_TTL")
+API_KEY_DEUTSCHER_SPORTAUSWEIS = getattr(settings, "API_KEY_DEUTSCHER_SPORTAUSWEIS")
+DS_API_URL = getattr(settings, "DS_API_URL")
+EB_API_URL = getattr(settings, "EB_API_URL", EVENTBRITE_API_URL)
 CACHE_TTL_TICKETS = getattr(settings, "CACHE_TTL_TICKETS")
+EB_POOL_SIZE = getattr(settings, "EB_POOL_SIZE", 10)
+EB_POOL_IDLE_TIMEOUT = getattr(settings, "EB_POOL_IDLE_TIMEOUT", 60)
+EB_POOL_MAX_LIFETIME = getattr(settings, "EB_POOL_MAX_LIFETIME", 60 * 10)
+# A stuck connection to EB does not hold a thread and a pooled connection
+EB_API_TIMEOUT = getattr(settings, "EB_API_TIMEOUT", 10)
+EB_FETCH_WORKERS = getattr(settings, "EB_FETCH_WORKERS", 8)
+EB_FETCH_DEADLINE = getattr(settings, "EB_FETCH_DEADLINE", 10)
+EB_CACHE_STALE_TTL = getattr(settings, "EB_CACHE_STALE_TTL", 60 * 60)
+EB_CACHE_JITTER = getattr(settings, "EB_CACHE_JITTER", 0.1)
+EB_CACHE_LOCK_TTL = getattr(settings, "EB_CACHE_LOCK_TTL", 30)
+EB_CACHE_LOCK_WAIT = getattr(settings, "EB_CACHE_LOCK_WAIT", 2)
+CACHE_TTL_PAGE = getattr(settings, "CACHE_TTL_PAGE", 60 * 5)
+CACHE_TTL_ORGANIZATION = getattr(settings, "CACHE_TTL_ORGANIZATION", 60 * 60 * 24)
+DS_POOL_SIZE = getattr(settings, "DS_POOL_SIZE", 10)
+DS_API_TIMEOUT = getattr(settings, "DS_API_TIMEOUT", 5)
+DS_API_DEADLINE = getattr(settings, "DS_API_DEADLINE", 8)
+CACHE_TTL_DS_VALID = getattr(settings, "CACHE_TTL_DS_VALID", 60 * 60 * 24)
+CACHE_TTL_DS_INVALID = getattr(settings, "CACHE_TTL_DS_INVALID", 60 * 10)
+LOOKUPS_TTL = getattr(settings, "LOOKUPS_TTL", 60 * 5)
+
+# The stats of the request that each thread is serving
+REQUEST_STATS = local()
+# If the receivers of the changes of the rows are paused in this thread
+CONTENT_SIGNALS = local()
+
+
+@contextmanager
+def pause_content_signals():
+    """
+    The receivers of signals.py do not refresh the listing summaries nor
+    the versions of the pages for the rows changed in the block,
+    the caller refreshes them once for each event
+    """
+    CONTENT_SIGNALS.paused = True
+    try:
+        yield
+    finally:
+        CONTENT_SIGNALS.paused = False
+
+
+def content_signals_paused():
+    return getattr(CONTENT_SIGNALS, 'paused', False)
+
+
+def start_request_stats():
+    """
+    This method starts the stats of the request served by this thread,
+    the queries, the calls to EB and DS and the uses of the cache
+    are counted in them
+    """
+    REQUEST_STATS.current = {
+        'lock': Lock(),
+        'db': {'count': 0, 'time': 0},
+        'eb': {'count': 0, 'time': 0, 'endpoints': {}},
+        'ds': {'count': 0, 'time': 0},
+        'cache': {'hits': 0, 'misses': 0},
+    }
+    return REQUEST_STATS.current
+
+
+def stop_request_stats():
+    """ This method stops the stats of this thread and returns them """
+    stats = getattr(REQUEST_STATS, 'current', None)
+    REQUEST_STATS.current = None
+    return stats
+
+
+def bind_request_stats(method):
+    """
+    This method will receive a method that will run in another thread,
+    and returns a method that counts its calls in the stats of the
+    request of this thread. The thread closes its connection to the DB
+    when the method ends, Django only closes the ones of the requests
+    """
+    stats = getattr(REQUEST_STATS, 'current', None)
+
+    def bound(*args, **kwargs):
+        REQUEST_STATS.current = stats
+        try:
+            return method(*args, **kwargs)
+        finally:
+            REQUEST_STATS.current = None
+            connection.close()
+    return bound
+
+
+def record_api_call(api, start, endpoint=None):
+    """
+    This method will receive the api called ('eb' or 'ds'), the time
+    when the call started and the endpoint of EB, and adds the call
+    to the metrics and to the stats of the request
+    """
+    duration = time() - start
+    if api == 'eb':
+        metrics.EB_REQUEST_DURATION.observe(duration, endpoint=endpoint)
+    else:
+        metrics.DS_REQUEST_DURATION.observe(duration)
+    stats = getattr(REQUEST_STATS, 'current', None)
+    if stats is None:
+        return
+    with stats['lock']:
+        stats[api]['count'] += 1
+        stats[api]['time'] += duration
+        if endpoint:
+            endpoints = stats[api]['endpoints']
+            endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+
+
+def record_db_query(start):
+    """
+    This method will receive the time when a query started
+    and adds it to the stats of the request, without its SQL
+    """
+    stats = getattr(REQUEST_STATS, 'current', None)
+    if stats is None:
+        return
+    duration = time() - start
+    with stats['lock']:
+        stats['db']['count'] += 1
+        stats['db']['time'] += duration
+
+
+class QueryStatsCursor(object):
+    """
+    Cursor that counts and times its queries in the stats of the request
+    of its thread, it wraps the cursor made by the connection
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.cursor.__exit__(type, value, traceback)
+
+    def execute(self, sql, params=None):
+        start = time()
+        try:
+            return self.cursor.execute(sql, params)
+        finally:
+            record_db_query(start)
+
+    def executemany(self, sql, param_list):
+        start = time()
+        try:
+            return self.cursor.executemany(sql, param_list)
+        finally:
+            record_db_query(start)
+
+
+def count_connection_queries(connection):
+    """
+    This method will receive a connection of the database and wraps
+    the cursors it makes, so their queries are counted in the stats of
+    the request. Each thread has its own connection, like the ones of the
+    pools of threads, so their queries are counted in the same stats
+    """
+    if getattr(connection, 'queries_counted', False):
+        return
+    prepare_cursor = connection._prepare_cursor
+    connection._prepare_cursor = lambda cursor: QueryStatsCursor(
+        prepare_cursor(cursor))
+    connection.queries_counted = True
+
+
+def record_cache_use(hit, key):
+    """
+    This method will receive if the read of a key of cache was a hit,
+    and adds it to the metrics of the family of the key (like event or
+    tickets) and to the stats of the request
+    """
+    metrics.CACHE_REQUESTS.inc(
+        family=key.split('-')[0],
+        result='hit' if hit else 'miss',
+    )
+    stats = getattr(REQUEST_STATS, 'current', None)
+    if stats is None:
+        return
+    with stats['lock']:
+        stats['cache']['hits' if hit else 'misses'] += 1
+
+
+def get_eb_endpoint(path):
+    """
+    This method will receive an url of EB and returns its endpoint,
+    without the query and with the ids replaced, like /v3/events/{id}/
+    """
+    return sub(r'/\d+(?=/|$)', '/{id}', urlparse(path).path)
+
+
+# The rows of the small lookup tables by model, loaded once in the process
+LOOKUPS = {}
+LOOKUPS_LOCK = Lock()
+
+
+def load_lookup(model):
+    """
+    This method will receive a lookup model (DiscountType or
+    StatusMemberDiscountCode) and loads all its rows by name
+    """
+    lookup = {
+        'rows': {row.name: row for row in model.objects.all()},
+        'expires': time() + LOOKUPS_TTL,
+    }
+    with LOOKUPS_LOCK:
+        LOOKUPS[model] = lookup
+    return lookup
+
+
+def get_lookup(model, name):
+    """
+    This method will receive a lookup model and a name and returns its row.
+    The rows are kept in the process and loaded again after LOOKUPS_TTL,
+    so the edits made by other processes are seen
+    """
+    lookup = LOOKUPS.get(model)
+    if lookup is None or lookup['expires'] < time() or (
+            name not in lookup['rows']):
+        lookup = load_lookup(model)
+    if name not in lookup['rows']:
+        raise model.DoesNotExist(
+            '{} matching query does not exist.'.format(model.__name__)
+        )
+    return lookup['rows'][name]
+
+
+def clear_lookups(model=None):
+    """
+    This method will forget the rows of a lookup model,
+    or of all of them, so they are loaded again
+    """
+    with LOOKUPS_LOCK:
+        if model is None:
+            LOOKUPS.clear()
+        else:
+            LOOKUPS.pop(model, None)
+
+
+def warm_lookups():
+    """
+    This method will load the rows of the lookup models at startup,
+    if the database is not available they are loaded when used
+    """
+    try:
+        for model in (DiscountType, StatusMemberDiscountCode):
+            load_lookup(model)
+    except DatabaseError:
+        clear_lookups()
 
 
 class EventAccessMixin(object):
@@ -40,26 +324,260 @@ class EventAccessMixin(object):
             raise PermissionDenied(_("You don't have access to this event"))
         return event
 
-    def _verify_if_discount_was_used(self, discount, event):
+    def _get_discounts_in_eb(self, event):
+        """ Get the discounts of the event in EB by code,
+        they are fetched only once for each event in the request """
+        if not hasattr(self, 'discounts_in_eb'):
+            self.discounts_in_eb = {}
+        if event.event_id not in self.discounts_in_eb:
+            self.discounts_in_eb[event.event_id] = get_event_discounts_eb_api(
+                self.request.user,
+                event.event_id,
+            )
+        return self.discounts_in_eb[event.event_id]
+
+    def _verify_if_discount_was_used(self, discount, event, discount_codes=None):
         """ This method verify if the discount has been used in EB
             if at least one discount it has been sold more than onces,
-            it will return False """
+            it will return False.
+            The codes of the discount can be given if they are already loaded """
 
-        if DiscountCode.objects.filter(
-                discount=discount['id']).exists():
-            discount_codes = DiscountCode.objects.filter(
-                discount=discount['id'])
+        if discount_codes is None:
+            discount_codes = list(DiscountCode.objects.filter(
+                discount=discount['id']).values_list('discount_code', flat=True))
+        if discount_codes:
+            discounts_in_eb = self._get_discounts_in_eb(event)
             for discount_code in discount_codes:
-                discount_in_eb = check_discount_code_in_eb(
-                    self.request.user,
-                    event.event_id,
-                    discount_code.discount_code,
-                )
-                if not discount_in_eb['discounts'][0]['quantity_sold'] == 0:
+                discount_in_eb = discounts_in_eb.get(discount_code)
+                if discount_in_eb and not discount_in_eb['quantity_sold'] == 0:
                     return False
         return True
 
 
+def get_content_version(scope):
+    """
+    This method will receive the scope of a content, like 'organizer-1'
+    or 'event-2', and returns its version, the time of its last change
+    """
+    key = 'version-' + scope
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time(), None)
+        version = cache.get(key) or time()
+    return version
+
+
+def invalidate_content(*scopes):
+    """
+    This method will receive scopes of contents and changes their versions,
+    so the responses made with them are not used anymore
+    """
+    now = time()
+    cache.set_many({'version-' + scope: now for scope in scopes}, None)
+
+
+def get_organizer_pages_version(organizer_id):
+    """
+    This method will receive the id of an organizer and returns
+    the version of its public pages
+    """
+    return get_content_version('organizer-{}'.format(organizer_id))
+
+
+def invalidate_organizer_pages(organizer_id):
+    """
+    This method will receive the id of an organizer and changes
+    the version of its pages, so their cached responses are not used
+    """
+    invalidate_content('organizer-{}'.format(organizer_id))
+
+
+def invalidate_event_pages(event_id, organizer_id=None):
+    """
+    This method will receive the id of an event and changes the version
+    of the event and the version of the pages of its organizer
+    """
+    if organizer_id is None:
+        organizer_id = Event.objects.filter(
+            id=event_id,
+        ).values_list('organizer_id', flat=True).first()
+        if organizer_id is None:
+            return
+    invalidate_content(
+        'organizer-{}'.format(organizer_id),
+        'event-{}'.format(event_id),
+    )
+
+
+class ConditionalGetMixin(object):
+    """ This mixin answers the GET of a page of the organizer with a 304
+    when the browser has the last version of the page, without calling EB
+    or rendering it. The ETag has the versions of the contents of the page
+    and the time of the last refresh of the values of EB that it shows,
+    if one of these values is stale the page is rendered to refresh it.
+    A page without some values of EB, because the view set partial_page,
+    does not have ETag, so it is rendered again in the next request """
+
+    partial_page = False
+
+    def get_content_scopes(self):
+        """ The page of an event changes with the event,
+        the other pages with the events of the logged organizer """
+        if isinstance(self, EventAccessMixin):
+            return ['event-{}'.format(self.get_event().id)]
+        return ['organizer-{}'.format(self.request.user.id)]
+
+    def get_eb_entries(self):
+        return []
+
+    def get_content_etag(self):
+        entries = self.get_eb_entries()
+        if not all(is_fresh_cached_eb_api(entry) for entry in entries):
+            return None
+        key = '{}-{}-{}-{}-{}'.format(
+            self.request.user.id,
+            self.request.GET.get('page', '1'),
+            get_language(),
+            [get_content_version(scope)
+             for scope in self.get_content_scopes()],
+            [entry['fresh_until'] for entry in entries],
+        )
+        return quote_etag(md5(key.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        # The messages of a redirect are shown only once
+        if get_messages(request):
+            return super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs)
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        etag = if_none_match and self.get_content_etag()
+        if etag and etag in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = super(ConditionalGetMixin, self).get(
+                request, *args, **kwargs)
+            response.render()
+            # The render could refresh the values of EB
+            etag = None if self.partial_page else self.get_content_etag()
+        if etag:
+            response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+        return response
+
+
+def get_cached_events_eb_entries(event_ids, free_tickets=False):
+    """
+    This method will receive a list of ids of events of EB and returns
+    the entries in cache of the events and of the tickets of the events,
+    the tickets of the free events only if free_tickets is True
+    """
+    events = cache.get_many(['event-' + event_id for event_id in event_ids])
+    entries = [events.get('event-' + event_id) for event_id in event_ids]
+    tickets_ids = [
+        event_id
+        for event_id in event_ids
+        if free_tickets or (
+            events.get('event-' + event_id) and
+            not events['event-' + event_id]['value']['is_free']
+        )
+    ]
+    tickets = cache.get_many(['tickets-' + event_id for event_id in tickets_ids])
+    return entries + [
+        tickets.get('tickets-' + event_id)
+        for event_id in tickets_ids
+    ]
+
+
+CSRF_TOKEN_PLACEHOLDER = 'CSRF-TOKEN-PLACEHOLDER'
+
+
+class CachedPageMixin(object):
+    """ This mixin caches the whole response of the GET of a public page
+    of an organizer for the anonymous users. The key has the version
+    of the pages of the organizer, the event, the page number and
+    the language. The responses have ETag and Last-Modified headers,
+    so the browsers can revalidate them while the page is cached.
+    A page without some values of EB, because the view set partial_page,
+    is not cached by us nor by the browsers. A page with the CSRF token
+    of the visitor is private, so the shared caches do not keep it """
+
+    cache_control = {'max_age': 60}
+    partial_page = False
+
+    def get_context_data(self, **kwargs):
+        context = super(CachedPageMixin, self).get_context_data(**kwargs)
+        # The token of each user is set when the cached page is served
+        if getattr(self, 'caching_page', False):
+            context['csrf_token'] = CSRF_TOKEN_PLACEHOLDER
+        return context
+
+    def _set_cache_headers(self, response, page, version):
+        response['ETag'] = page['etag']
+        response['Last-Modified'] = http_date(version)
+        if CSRF_TOKEN_PLACEHOLDER in page['content']:
+            patch_cache_control(response, private=True, **self.cache_control)
+        else:
+            patch_cache_control(response, public=True, **self.cache_control)
+        patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+        return response
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super(CachedPageMixin, self).get(request, *args, **kwargs)
+
+        version = get_organizer_pages_version(self.kwargs['organizer_id'])
+        key = 'cached-page-{}-{}-{}-{}-{}'.format(
+            self.kwargs['organizer_id'],
+            self.kwargs.get('event_id', ''),
+            request.GET.get('page', '1'),
+            get_language(),
+            version,
+        )
+        page = cache.get(key)
+        record_cache_use(page is not None, key)
+        # The ETag is the one of the cached body, so a 304 is answered
+        # only while the body is cached, with the values of EB it was made
+        if page is not None and page['etag'] in request.META.get(
+                'HTTP_IF_NONE_MATCH', ''):
+            return self._set_cache_headers(
+                HttpResponseNotModified(), page, version)
+
+        if page is None:
+            self.caching_page = True
+            response = super(CachedPageMixin, self).get(
+                request, *args, **kwargs)
+            response.render()
+            if response.status_code != 200:
+                return response
+            content = response.content.decode()
+            if self.partial_page:
+                response.content = content.replace(
+                    CSRF_TOKEN_PLACEHOLDER,
+                    get_token(request),
+                )
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ('Cookie', 'Accept-Language'))
+                return response
+            page = {
+                'content': content,
+                'etag': quote_etag(md5(content.encode()).hexdigest()),
+            }
+            cache.set(key, page, CACHE_TTL_PAGE)
+        else:
+            response = HttpResponse()
+
+        content = page['content']
+        if CSRF_TOKEN_PLACEHOLDER in content:
+            content = content.replace(
+                CSRF_TOKEN_PLACEHOLDER,
+                get_token(request),
+            )
+        response.content = content
+        return self._set_cache_headers(response, page, version)
+
+
 class DiscountAccessMixin(EventAccessMixin):
     """
     This mixin deny the access to a discount
@@ -69,22 +587,24 @@ class DiscountAccessMixin(EventAccessMixin):
 
     def verify_deleteable_discount(self, discount_type):
         if discount_type == 'Event':
-            tickets = EventTicketType.objects.filter(
-                event=self.kwargs['event_id'],
-            )
-            for ticket in tickets:
-                if TicketTypeDiscount.objects.filter(
-                        ticket_type=ticket).exists():
-                    discount = TicketTypeDiscount.objects.get(
-                        ticket_type=ticket
-                    ).__dict__
-                    if not self._verify_if_discount_was_used(
-                        discount,
-                        ticket.event,
-                    ):
-                        raise PermissionDenied(_(
-                            "You have an used ticket discount so you can not manage event discount for this event.")
-                        )
+            # The codes of all the ticket discounts are loaded at once
+            discount_codes = {}
+            for discount_id, discount_code in DiscountCode.objects.filter(
+                    discount__tickettypediscount__ticket_type__event=self.kwargs['event_id'],
+            ).values_list('discount', 'discount_code'):
+                discount_codes.setdefault(discount_id, []).append(
+                    discount_code)
+            if discount_codes:
+                event = Event.objects.get(id=self.kwargs['event_id'])
+            for discount_id, codes in discount_codes.items():
+                if not self._verify_if_discount_was_used(
+                    {'id': discount_id},
+                    event,
+                    codes,
+                ):
+                    raise PermissionDenied(_(
+                        "You have an used ticket discount so you can not manage event discount for this event.")
+                    )
         else:
             if EventDiscount.objects.filter(
                     event=self.kwargs['event_id']).exists():
@@ -105,7 +625,7 @@ class DiscountAccessMixin(EventAccessMixin):
             id=self.kwargs['discount_id'],
         )
 
-        if discount.discount_type.name == 'Event':
+        if discount.discount_type_id == get_lookup(DiscountType, 'Event').id:
             if discount.eventdiscount.event.organizer != self.request.user:
                 raise PermissionDenied(_(
                     "You don't have access to this discount")
@@ -115,7 +635,7 @@ class DiscountAccessMixin(EventAccessMixin):
                     "This discount does not match with the event")
                 )
 
-        elif discount.discount_type.name == 'Ticket Type':
+        elif discount.discount_type_id == get_lookup(DiscountType, 'Ticket Type').id:
             if discount.tickettypediscount.ticket_type.event.organizer != self.request.user:
                 raise PermissionDenied(_(
                     "You don't have access to this discount"))
@@ -127,18 +647,156 @@ class DiscountAccessMixin(EventAccessMixin):
         return discount
 
 
+class PooledEventbrite(Eventbrite):
+    """
+    Eventbrite client that sends its requests through a keep-alive
+    session, so the connections to EB are reused between calls
+    instead of paying a new TCP and TLS handshake every time
+    """
+
+    def __init__(self, oauth_token, pool_size=EB_POOL_SIZE):
+        super(PooledEventbrite, self).__init__(oauth_token, EB_API_URL)
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+        )
+        self.session = Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.created_at = time()
+        self.last_used = self.created_at
+
+    def is_expired(self, now):
+        """ The client expires when it has been idle or alive for too long """
+        return (
+            now - self.last_used > EB_POOL_IDLE_TIMEOUT or
+            now - self.created_at > EB_POOL_MAX_LIFETIME
+        )
+
+    def close(self):
+        self.session.close()
+
+    @objectify
+    def get(self, path, data=None, expand=()):
+        headers = self.headers
+        headers.pop('content-type')
+        path = format_path(path, self.eventbrite_api_url)
+        if data is None:
+            data = {}
+        # Manage expansions in the same way of the EB sdk
+        if not data.get('expand'):
+            if expand:
+                data['expand'] = ','.join(expand)
+            else:
+                data['expand'] = 'none'
+        start = time()
+        try:
+            return self.session.get(
+                path,
+                headers=headers,
+                params=data,
+                timeout=EB_API_TIMEOUT,
+            )
+        finally:
+            record_api_call('eb', start, get_eb_endpoint(path))
+
+    @objectify
+    def post(self, path, data=None):
+        path = format_path(path, self.eventbrite_api_url)
+        start = time()
+        try:
+            return self.session.post(
+                path,
+                headers=self.headers,
+                data=json.dumps(data or {}),
+                timeout=EB_API_TIMEOUT,
+            )
+        finally:
+            record_api_call('eb', start, get_eb_endpoint(path))
+
+    @objectify
+    def delete(self, path, data=None):
+        path = format_path(path, self.eventbrite_api_url)
+        start = time()
+        try:
+            return self.session.delete(
+                path,
+                headers=self.headers,
+                data=data or {},
+                timeout=EB_API_TIMEOUT,
+            )
+        finally:
+            record_api_call('eb', start, get_eb_endpoint(path))
+
+
+# Registry of EB clients of this worker, the key is the token
+EB_CLIENTS = {}
+EB_CLIENTS_LOCK = Lock()
+EB_POOL_STATS = {
+    'hits': 0,
+    'misses': 0,
+}
+
+
+def get_eb_client(token):
+    """
+    This method will receive a valid token for user of EB,
+    and returns the pooled client of this worker for that token.
+    If the client does not exist or it has expired, it creates a new one
+    """
+    now = time()
+    with EB_CLIENTS_LOCK:
+        client = EB_CLIENTS.get(token)
+        if client and not client.is_expired(now):
+            EB_POOL_STATS['hits'] += 1
+        else:
+            EB_POOL_STATS['misses'] += 1
+            # Close the expired clients, so their sockets are released
+            for expired_token in [
+                key for key, value in EB_CLIENTS.items()
+                if value.is_expired(now)
+            ]:
+                EB_CLIENTS.pop(expired_token).close()
+            client = PooledEventbrite(token)
+            EB_CLIENTS[token] = client
+        client.last_used = now
+    return client
+
+
+def get_eb_pool_stats():
+    """
+    This method returns the hits and misses of the EB clients registry
+    and the number of clients alive in this worker
+    """
+    with EB_CLIENTS_LOCK:
+        stats = dict(EB_POOL_STATS)
+        stats['clients'] = len(EB_CLIENTS)
+    return stats
+
+
+def close_eb_clients():
+    """ Close every client of the registry and their connections """
+    with EB_CLIENTS_LOCK:
+        for client in EB_CLIENTS.values():
+            client.close()
+        EB_CLIENTS.clear()
+
+
 def get_auth_token(user):
     """
     This method will receive a user and
-    returns its repesctive social_auth token
+    returns its repesctive social_auth token.
+    The token is kept in the user, so it is loaded
+    only once for each request, also when it does not exist
     """
-    try:
-        token = user.social_auth.get(
-            provider='eventbrite'
-        ).access_token
-    except UserSocialAuth.DoesNotExist:
-        return _('UserSocialAuth does not exists!')
-    return token
+    if not hasattr(user, 'eb_auth_token'):
+        try:
+            user.eb_auth_token = user.social_auth.get(
+                provider='eventbrite'
+            ).access_token
+        except UserSocialAuth.DoesNotExist:
+            user.eb_auth_token = _('UserSocialAuth does not exists!')
+    return user.eb_auth_token
 
 
 def get_user_eb_api(token):
@@ -146,27 +804,253 @@ def get_user_eb_api(token):
     This method will receive a valid token for user of EB,
     and returns the user of EB
     """
-    eventbrite = Eventbrite(token)
+    eventbrite = get_eb_client(token)
     return eventbrite.get('/users/me/')
 
 
+def get_organization_id(user):
+    """
+    This method will receive an user and returns the id of its organization
+    in EB. The id is saved in the extra data of its social auth and in cache,
+    so /users/me/ is only called the first time. The calls avoided and made
+    are counted in metrics.ORGANIZATION_ID_LOOKUPS
+    """
+    organization_id = cache.get('organization-{}'.format(user.id))
+    if organization_id:
+        metrics.ORGANIZATION_ID_LOOKUPS.inc(result='avoided')
+        return organization_id
+
+    social_auth = user.social_auth.get(provider='eventbrite')
+    organization_id = social_auth.extra_data.get('organization_id')
+    if organization_id:
+        metrics.ORGANIZATION_ID_LOOKUPS.inc(result='avoided')
+    else:
+        metrics.ORGANIZATION_ID_LOOKUPS.inc(result='fetched')
+        organization_id = get_user_eb_api(social_auth.access_token)['id']
+        social_auth.extra_data['organization_id'] = organization_id
+        social_auth.save(update_fields=['extra_data'])
+    cache.set(
+        'organization-{}'.format(user.id),
+        organization_id,
+        timeout=CACHE_TTL_ORGANIZATION,
+    )
+    return organization_id
+
+
+def clear_organization_id(user):
+    """
+    This method will receive an user and forget the id of its organization,
+    so it is loaded again from EB the next time
+    """
+    cache.delete('organization-{}'.format(user.id))
+    for social_auth in user.social_auth.filter(provider='eventbrite'):
+        if social_auth.extra_data.pop('organization_id', None):
+            social_auth.save(update_fields=['extra_data'])
+
+
+def is_fresh_cached_eb_api(entry):
+    """
+    This method will receive an entry saved by set_cached_eb_api
+    and returns True if it has not reached its soft TTL
+    """
+    return entry is not None and entry['fresh_until'] > time()
+
+
+def set_cached_eb_api(key, value, ttl):
+    """
+    This method will save in cache a value of EB with a jittered soft TTL,
+    after it the value is stale but it's kept EB_CACHE_STALE_TTL more seconds
+    so it can be served while it's refreshed
+    """
+    ttl = ttl * (1 - uniform(0, EB_CACHE_JITTER))
+    cache.set(
+        key,
+        {'value': value, 'fresh_until': time() + ttl},
+        timeout=int(ttl + EB_CACHE_STALE_TTL),
+    )
+
+
+def refresh_cached_eb_api(key, fetch, ttl):
+    """
+    This method will fetch again a value of EB and save it in cache,
+    it releases the lock of the key when it finishes
+    """
+    try:
+        set_cached_eb_api(key, fetch(), ttl)
+    finally:
+        cache.delete(key + '-lock')
+
+
+def get_cached_eb_api(key, fetch, ttl):
+    """
+    This method will receive a key of cache, a method that fetch
+    the value from EB and the soft TTL of the value.
+    A stale value is returned while a single worker, the one that gets
+    the lock of the key, refreshes it in background.
+    When there is nothing in cache, only the worker with the lock calls EB
+    and the others wait for its value EB_CACHE_LOCK_WAIT seconds
+    """
+    entry = cache.get(key)
+    record_cache_use(entry is not None, key)
+    if entry is not None:
+        if not is_fresh_cached_eb_api(entry) and cache.add(
+                key + '-lock', True, EB_CACHE_LOCK_TTL):
+            Thread(
+                target=refresh_cached_eb_api,
+                args=(key, fetch, ttl),
+                daemon=True,
+            ).start()
+        return entry['value']
+
+    if cache.add(key + '-lock', True, EB_CACHE_LOCK_TTL):
+        try:
+            value = fetch()
+            set_cached_eb_api(key, value, ttl)
+        finally:
+            cache.delete(key + '-lock')
+        return value
+
+    # Another worker is calling EB, wait for its value
+    wait_until = time() + EB_CACHE_LOCK_WAIT
+    while time() < wait_until:
+        sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+    value = fetch()
+    set_cached_eb_api(key, value, ttl)
+    return value
+
+
+def parse_event_dates(event):
+    """
+    This method will receive an event of EB and adds to it
+    its start and end dates parsed, so they are not parsed in each render
+    """
+    event['start_date'] = parser.parse(event['start']['local'])
+    event['end_date'] = parser.parse(event['end']['local'])
+    return event
+
+
+def import_events_user_eb_api(token, parallel=True):
+    """
+    This method will receive a valid token for user of EB and walks
+    all the pages of its live events. Each page is saved in cache when it
+    arrives, the events by id and the progress of the import with the ids,
+    so the first events can be shown before the rest has arrived.
+    When EB returns the count of pages and parallel is True, the rest
+    of the pages are fetched concurrently by number, else they are
+    fetched one after the other with the continuation.
+    It returns the list of all the events
+    """
+    eventbrite = get_eb_client(token)
+    path = '/users/me/owned_events/?status=live'
+    pages = {}
+
+    def save_page(number, events):
+        pages[number] = [parse_event_dates(event) for event in events]
+        for event in pages[number]:
+            set_cached_eb_api('event-' + event['id'], event, CACHE_TTL)
+        # The pages are shown in order, until the first that is missing
+        ids = []
+        for page in range(1, len(pages) + 1):
+            if page not in pages:
+                break
+            ids.extend(event['id'] for event in pages[page])
+        cache.set(
+            'events-import-' + token,
+            {'ids': ids, 'complete': False},
+            EB_CACHE_LOCK_TTL,
+        )
+
+    response = eventbrite.get(path)
+    save_page(1, response['events'])
+    pagination = response.get('pagination', {})
+
+    page_count = pagination.get('page_count') or 1
+    if parallel and page_count > 1:
+        executor = ThreadPoolExecutor(
+            max_workers=min(EB_FETCH_WORKERS, page_count - 1)
+        )
+        futures = {
+            executor.submit(
+                bind_request_stats(eventbrite.get),
+                '{}&page={}'.format(path, number),
+            ): number
+            for number in range(2, page_count + 1)
+        }
+        try:
+            for future in as_completed(futures):
+                save_page(futures[future], future.result()['events'])
+        finally:
+            executor.shutdown(wait=False)
+    else:
+        while pagination.get('has_more_items'):
+            response = eventbrite.get('{}&continuation={}'.format(
+                path,
+                pagination['continuation'],
+            ))
+            save_page(len(pages) + 1, response['events'])
+            pagination = response.get('pagination', {})
+
+    return [
+        event
+        for number in sorted(pages)
+        for event in pages[number]
+    ]
+
+
 def get_events_user_eb_api(token):
     """
     This method will receive a valid token for user of EB,
-    and returns a list of events with specific state
-    """
-    events = cache.get('events-' + token)
-    if not events:
-        eventbrite = Eventbrite(token)
-        events = [
-            event
-            # Status : live, draft, canceled, started, ended, all
-            for event in eventbrite.get(
-                '/users/me/owned_events/?status=live'
-            )['events']
-        ]
-        cache.set('events-' + token, events, timeout=CACHE_TTL)
-    return events
+    and returns a list of all its live events
+    """
+    def fetch():
+        return import_events_user_eb_api(token)
+    return get_cached_eb_api('events-' + token, fetch, CACHE_TTL)
+
+
+def get_events_user_import(token, wait=None):
+    """
+    This method will receive a valid token for user of EB and returns
+    a tuple with its live events and True if they are all the events.
+    If they are not in cache, they are imported in background and it
+    returns the events that have arrived when the first page arrives
+    or after wait seconds
+    """
+    if cache.get('events-' + token) is not None:
+        return get_events_user_eb_api(token), True
+
+    # Only one worker imports the events
+    if cache.add('events-' + token + '-lock', True, EB_CACHE_LOCK_TTL):
+        Thread(
+            target=refresh_cached_eb_api,
+            args=('events-' + token, lambda: import_events_user_eb_api(
+                token), CACHE_TTL),
+            daemon=True,
+        ).start()
+
+    if wait is None:
+        wait = EB_FETCH_DEADLINE
+    wait_until = time() + wait
+    progress = None
+    while time() < wait_until:
+        entry = cache.get('events-' + token)
+        if entry is not None:
+            return entry['value'], True
+        progress = cache.get('events-import-' + token)
+        if progress and progress['ids']:
+            break
+        sleep(0.05)
+    if not progress:
+        return [], False
+
+    events = cache.get_many(['event-' + id for id in progress['ids']])
+    return [
+        events['event-' + id]['value']
+        for id in progress['ids']
+        if 'event-' + id in events
+    ], False
 
 
 def get_event_eb_api(token, event_id):
@@ -174,12 +1058,10 @@ def get_event_eb_api(token, event_id):
     This method will receive an event id and token from logged user
     and returns an event
     """
-    event = cache.get('event-' + event_id)
-    if not event:
-        eventbrite = Eventbrite(token)
-        event = eventbrite.get('/events/{}/'.format(event_id))
-        cache.set('event-' + event_id, event, timeout=CACHE_TTL)
-    return event
+    def fetch():
+        eventbrite = get_eb_client(token)
+        return eventbrite.get('/events/{}/'.format(event_id))
+    return get_cached_eb_api('event-' + event_id, fetch, CACHE_TTL)
 
 
 def get_venue_eb_api(token, venue_id):
@@ -187,12 +1069,10 @@ def get_venue_eb_api(token, venue_id):
     This method will receive a venue id and token from logged user
     and returns an venue
     """
-    venue = cache.get('venue-' + venue_id)
-    if not venue:
-        eventbrite = Eventbrite(token)
-        venue = eventbrite.get('/venues/{}/'.format(venue_id))
-        cache.set('venue-' + venue_id, venue, timeout=CACHE_TTL)
-    return venue
+    def fetch():
+        eventbrite = get_eb_client(token)
+        return eventbrite.get('/venues/{}/'.format(venue_id))
+    return get_cached_eb_api('venue-' + venue_id, fetch, CACHE_TTL)
 
 
 def get_event_tickets_eb_api(token, event_id):
@@ -200,22 +1080,398 @@ def get_event_tickets_eb_api(token, event_id):
     This method will receive a event id and token from logged user
     and returns a list of tickets
     """
-    tickets = cache.get('tickets-' + event_id)
-    if not tickets:
-        eventbrite = Eventbrite(token)
-        tickets = [
+    def fetch():
+        eventbrite = get_eb_client(token)
+        return [
             ticket
             for ticket in eventbrite.get(
                 '/events/{}/ticket_classes/'.format(event_id)
             )['ticket_classes']
         ]
-        cache.set('tickets-' + event_id, tickets, timeout=CACHE_TTL_TICKETS)
-    return tickets
+    return get_cached_eb_api('tickets-' + event_id, fetch, CACHE_TTL_TICKETS)
+
+
+def fetch_bulk_eb_api(fetch, cache_prefix, token, ids, deadline=None):
+    """
+    This method will receive a fetch method of EB (like get_event_eb_api),
+    the prefix of its cache keys, a token and a list of ids.
+    The ids that are not in cache are fetched concurrently
+    in a bounded thread pool, and it returns a list with the results
+    in the same order of the ids.
+    If a fetch has not finished before the deadline, its result is None.
+    The deadline is the time left in seconds, so the fetches of a request
+    can share one deadline (see get_time_left)
+    """
+    if deadline is None:
+        deadline = EB_FETCH_DEADLINE
+    cached = cache.get_many([cache_prefix + id for id in ids])
+    results = {}
+    for id in ids:
+        # The stale values are fetched, so they are refreshed
+        if is_fresh_cached_eb_api(cached.get(cache_prefix + id)):
+            results[id] = cached[cache_prefix + id]['value']
+    misses = [id for id in set(ids) if id not in results]
+    # The misses and the stale values are recorded by the cache read
+    # of their fetch, so each lookup is recorded once
+    for id in set(results):
+        record_cache_use(True, cache_prefix + id)
+
+    if misses:
+        executor = ThreadPoolExecutor(
+            max_workers=min(EB_FETCH_WORKERS, len(misses))
+        )
+        futures = {
+            executor.submit(bind_request_stats(fetch), token, id): id
+            for id in misses
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        """ Do not wait for the late fetches. The ones that are running
+        finish in background and save their result in cache,
+        the ones that did not start yet are cancelled """
+        for future in not_done:
+            # A fetch that did not start has not read the cache
+            if future.cancel():
+                record_cache_use(False, cache_prefix + futures[future])
+        executor.shutdown(wait=False)
+        for future in done:
+            results[futures[future]] = future.result()
+
+    return [results.get(id) for id in ids]
+
+
+def call_bulk_eb_api(call, user, ids, deadline=None, cancel_late=True):
+    """
+    This method will receive a method that calls EB with an user and an id
+    (like delete_discount_code_from_eb), an user and a list of ids.
+    The calls are made concurrently in a bounded thread pool, and it
+    returns a dict with the result of the call of each id.
+    If a call has failed or has not finished before the deadline,
+    its result is None. The calls that did not start before the deadline
+    are cancelled, unless cancel_late is False (like the deletes of EB),
+    then they are made in background after it returns
+    """
+    if deadline is None:
+        deadline = EB_FETCH_DEADLINE
+    ids = list(set(ids))
+    results = {id: None for id in ids}
+    if not ids:
+        return results
+
+    def safe_call(id):
+        # An error of EB with an id does not stop the others
+        try:
+            return call(user, id)
+        except Exception:
+            return None
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(EB_FETCH_WORKERS, len(ids))
+    )
+    futures = {
+        executor.submit(bind_request_stats(safe_call), id): id
+        for id in ids
+    }
+    done, not_done = wait(futures, timeout=deadline)
+    if cancel_late:
+        for future in not_done:
+            # A fetch that did not start has not read the cache
+            if future.cancel():
+                record_cache_use(False, cache_prefix + futures[future])
+    executor.shutdown(wait=False)
+    for future in done:
+        results[futures[future]] = future.result()
+    return results
+
+
+def get_time_left(wait_until):
+    """
+    This method will receive the time of the deadline of the fetches
+    of EB of a request, like time() + EB_FETCH_DEADLINE at its start,
+    and returns the seconds left to the next fetch
+    """
+    return max(wait_until - time(), 0)
+
+
+def fetch_events_bulk(token, event_ids, deadline=None):
+    """
+    This method will receive a token from logged user and a list of event ids
+    and returns the list of events of EB in the same order
+    """
+    return fetch_bulk_eb_api(
+        get_event_eb_api,
+        'event-',
+        token,
+        event_ids,
+        deadline,
+    )
+
+
+def fetch_event_tickets_bulk(token, event_ids, deadline=None):
+    """
+    This method will receive a token from logged user and a list of event ids
+    and returns the list of tickets of each event in the same order
+    """
+    return fetch_bulk_eb_api(
+        get_event_tickets_eb_api,
+        'tickets-',
+        token,
+        event_ids,
+        deadline,
+    )
+
+
+def reconcile_organizer_events(organizer, event_ids=None):
+    """
+    This method will receive an organizer and deletes in bulk
+    the discounts and ticket types of its events that are free in EB,
+    and the discounts of its ticket types that are free in EB.
+    The ticket types of the paid events are synced with EB, the new ones
+    are created and the ones that are not in EB are deleted with their
+    discounts. If it receives the ids of some events of our DB, only those
+    events are reconciled, like the sync of the event discounts page.
+    It returns a dict with the number of rows changed of each model
+    """
+    token = get_auth_token(organizer)
+    events = Event.objects.filter(
+        organizer=organizer,
+        is_active=True,
+    )
+    if event_ids is not None:
+        events = events.filter(id__in=event_ids)
+    events = list(events)
+    events_eb = fetch_events_bulk(
+        token,
+        [event.event_id for event in events],
+    )
+    # The events that could not be fetched are not reconciled
+    free_events = [
+        event
+        for event, event_eb in zip(events, events_eb)
+        if event_eb and event_eb['is_free']
+    ]
+    paid_events = [
+        event
+        for event, event_eb in zip(events, events_eb)
+        if event_eb and not event_eb['is_free']
+    ]
+    paid_events_tickets = fetch_event_tickets_bulk(
+        token,
+        [event.event_id for event in paid_events],
+    )
+    free_tickets = [
+        ticket_eb['id']
+        for tickets_eb in paid_events_tickets
+        if tickets_eb
+        for ticket_eb in tickets_eb
+        if ticket_eb['free']
+    ]
+    # The events that could not be fetched keep their ticket types
+    synced_events_tickets = {
+        event.id: {ticket_eb['id'] for ticket_eb in tickets_eb}
+        for event, tickets_eb in zip(paid_events, paid_events_tickets)
+        if tickets_eb is not None
+    }
+    old_tickets = Q()
+    for event_id, tickets_id in synced_events_tickets.items():
+        old_tickets |= Q(event_id=event_id) & ~Q(ticket_id_eb__in=tickets_id)
+
+    # The summaries and the pages are refreshed once for each event after
+    with transaction.atomic(), pause_content_signals():
+        existing_tickets = set(EventTicketType.objects.filter(
+            ticket_id_eb__in=[
+                ticket_id
+                for tickets_id in synced_events_tickets.values()
+                for ticket_id in tickets_id
+            ],
+        ).values_list('ticket_id_eb', flat=True))
+        new_tickets = EventTicketType.objects.bulk_create([
+            EventTicketType(event_id=event_id, ticket_id_eb=ticket_id)
+            for event_id, tickets_id in synced_events_tickets.items()
+            for ticket_id in sorted(tickets_id)
+            if ticket_id not in existing_tickets
+        ])
+        event_discounts = EventDiscount.objects.filter(
+            event__in=free_events,
+        ).delete()[1]
+        ticket_discounts = TicketTypeDiscount.objects.filter(
+            ticket_type__event__in=free_events,
+        ).delete()[1]
+        free_ticket_discounts = TicketTypeDiscount.objects.filter(
+            ticket_type__event__in=paid_events,
+            ticket_type__ticket_id_eb__in=free_tickets,
+        ).delete()[1]
+        old_ticket_discounts = TicketTypeDiscount.objects.filter(
+            ticket_type__in=EventTicketType.objects.filter(old_tickets),
+        ).delete()[1] if synced_events_tickets else {}
+        tickets_type = EventTicketType.objects.filter(
+            event__in=free_events,
+        ).delete()[1]
+        old_tickets_type = EventTicketType.objects.filter(
+            old_tickets,
+        ).delete()[1] if synced_events_tickets else {}
+
+    for event in free_events:
+        refresh_listing_summary(event.id)
+    # Refresh the listing summary of the paid events with the prices of EB
+    summaries = update_listing_summaries(get_events_tickets_type({
+        event.id: tickets_eb
+        for event, tickets_eb in zip(paid_events, paid_events_tickets)
+        if tickets_eb is not None
+    }))
+
+    deleted = {
+        'free_events': len(free_events),
+        'event_discounts': event_discounts.get(
+            EventDiscount._meta.label, 0),
+        'ticket_discounts': sum(
+            discounts.get(TicketTypeDiscount._meta.label, 0)
+            for discounts in (
+                ticket_discounts,
+                free_ticket_discounts,
+                old_ticket_discounts,
+            )
+        ),
+        'tickets_type': sum(
+            deleted_tickets.get(EventTicketType._meta.label, 0)
+            for deleted_tickets in (tickets_type, old_tickets_type)
+        ),
+        'tickets_type_created': len(new_tickets),
+    }
+    # The pages of the organizer and its events show the changed rows
+    if any(deleted[key] for key in deleted if key != 'free_events'):
+        invalidate_content(
+            'organizer-{}'.format(organizer.id),
+            *['event-{}'.format(event.id) for event in events]
+        )
+    deleted['summaries'] = summaries
+    return deleted
+
+
+def sync_organizer_events(organizer, events_tickets):
+    """
+    This method will receive an organizer and a dict with the ids of EB
+    of its selected events and the tickets of EB of each one.
+    In one transaction, it creates the selected events and ticket types
+    that are not in our DB yet, deactivates the events of the organizer
+    that are not selected, and deletes the discounts of the unselected
+    events, of the free ticket types and of the ticket types of the
+    organizer that are not in EB anymore, with these ticket types.
+    The ticket types of the unselected events are not in the dict,
+    so they are deleted too.
+    It returns a dict with the number of rows changed of each model
+    """
+    tickets_eb = {
+        ticket_eb['id']: ticket_eb
+        for tickets in events_tickets.values()
+        for ticket_eb in tickets
+    }
+    free_tickets = [
+        ticket_id
+        for ticket_id, ticket_eb in tickets_eb.items()
+        if ticket_eb['free']
+    ]
+
+    with transaction.atomic():
+        existing_events = set(Event.objects.filter(
+            event_id__in=events_tickets.keys(),
+        ).values_list('event_id', flat=True))
+        Event.objects.bulk_create([
+            Event(event_id=event_id, organizer=organizer, is_active=True)
+            for event_id in events_tickets
+            if event_id not in existing_events
+        ])
+        Event.objects.filter(
+            event_id__in=existing_events,
+        ).update(organizer=organizer, is_active=True)
+        events = dict(Event.objects.filter(
+            event_id__in=events_tickets.keys(),
+        ).values_list('event_id', 'id'))
+
+        unselected_events = list(Event.objects.filter(
+            organizer=organizer,
+            is_active=True,
+        ).exclude(
+            event_id__in=events_tickets.keys(),
+        ).values_list('id', flat=True))
+        Event.objects.filter(id__in=unselected_events).update(
+            is_active=False,
+        )
+
+        existing_tickets = set(EventTicketType.objects.filter(
+            ticket_id_eb__in=tickets_eb.keys(),
+        ).values_list('ticket_id_eb', flat=True))
+        new_tickets = [
+            EventTicketType(event_id=events[event_id], ticket_id_eb=ticket_eb['id'])
+            for event_id, tickets in events_tickets.items()
+            for ticket_eb in tickets
+            if ticket_eb['id'] not in existing_tickets
+        ]
+        EventTicketType.objects.bulk_create(new_tickets)
+
+        old_ticket_discounts = TicketTypeDiscount.objects.filter(
+            ticket_type__event__organizer=organizer,
+        ).filter(
+            Q(ticket_type__ticket_id_eb__in=free_tickets) |
+            ~Q(ticket_type__ticket_id_eb__in=tickets_eb.keys())
+        )
+        old_tickets_type = EventTicketType.objects.filter(
+            event__organizer=organizer,
+        ).exclude(
+            ticket_id_eb__in=tickets_eb.keys(),
+        )
+        # The events of the deleted rows are refreshed once after
+        discounts_events = set(unselected_events) | set(
+            old_ticket_discounts.values_list('ticket_type__event_id', flat=True))
+        deleted_tickets_events = set(
+            old_tickets_type.values_list('event_id', flat=True))
+        with pause_content_signals():
+            event_discounts = EventDiscount.objects.filter(
+                event_id__in=unselected_events,
+            ).delete()[1]
+            ticket_discounts = old_ticket_discounts.delete()[1]
+            tickets_type = old_tickets_type.delete()[1]
+
+        # The new and deleted ticket types change the prices of the listing
+        tickets_events = deleted_tickets_events | {
+            ticket.event_id for ticket in new_tickets
+        }
+        # The summaries of the selected events have the prices of EB
+        update_listing_summaries(get_events_tickets_type({
+            events[event_id]: tickets
+            for event_id, tickets in events_tickets.items()
+        }))
+
+    for event_id in (discounts_events | deleted_tickets_events) - set(
+            events.values()):
+        refresh_listing_summary(
+            event_id,
+            reset_prices=event_id in deleted_tickets_events,
+        )
+    # The pages of the organizer and of the changed events are not valid
+    invalidate_content(
+        'organizer-{}'.format(organizer.id),
+        *[
+            'event-{}'.format(event_id)
+            for event_id in set(events.values()) | set(unselected_events) |
+            tickets_events
+        ]
+    )
+
+    return {
+        'events_created': len(events_tickets) - len(existing_events),
+        'events_deactivated': len(unselected_events),
+        'tickets_type_created': len(new_tickets),
+        'event_discounts': event_discounts.get(
+            EventDiscount._meta.label, 0),
+        'ticket_discounts': ticket_discounts.get(
+            TicketTypeDiscount._meta.label, 0),
+        'tickets_type': tickets_type.get(EventTicketType._meta.label, 0),
+    }
 
 
 def check_discount_code_in_eb(user, event_id, discount_code):
-    eventbrite = Eventbrite(get_auth_token(user))
-    organization_id = get_user_eb_api(get_auth_token(user))['id']
+    eventbrite = get_eb_client(get_auth_token(user))
+    organization_id = get_organization_id(user)
     return eventbrite.get(
         '/organizations/{}/discounts/?scope={}&event_id={}&code={}'.format(
             organization_id,
@@ -226,9 +1482,39 @@ def check_discount_code_in_eb(user, event_id, discount_code):
     )
 
 
+def get_event_discounts_eb_api(user, event_id):
+    """
+    This method will receive an user and an event id of EB,
+    and returns a dict with all the discounts of the event in EB,
+    the key is the code of the discount.
+    It walks all the pages of discounts of the event
+    """
+    eventbrite = get_eb_client(get_auth_token(user))
+    path = '/organizations/{}/discounts/?scope={}&event_id={}'.format(
+        get_organization_id(user),
+        'event',
+        event_id,
+    )
+    discounts = {}
+    continuation = None
+    while True:
+        if continuation:
+            page = eventbrite.get(
+                path + '&continuation={}'.format(continuation)
+            )
+        else:
+            page = eventbrite.get(path)
+        for discount in page['discounts']:
+            discounts[discount['code']] = discount
+        pagination = page.get('pagination', {})
+        if not pagination.get('has_more_items'):
+            return discounts
+        continuation = pagination['continuation']
+
+
 def post_ticket_discount_code_to_eb(user, event_id, discount_code, discount_value, ticket_type, uses):
-    eventbrite = Eventbrite(get_auth_token(user))
-    organization_id = get_user_eb_api(get_auth_token(user))['id']
+    eventbrite = get_eb_client(get_auth_token(user))
+    organization_id = get_organization_id(user)
     data = {
         "discount": {
             "code": discount_code,
@@ -246,8 +1532,8 @@ def post_ticket_discount_code_to_eb(user, event_id, discount_code, discount_valu
 
 
 def post_event_discount_code_to_eb(user, event_id, discount_code, discount_value, uses):
-    eventbrite = Eventbrite(get_auth_token(user))
-    organization_id = get_user_eb_api(get_auth_token(user))['id']
+    eventbrite = get_eb_client(get_auth_token(user))
+    organization_id = get_organization_id(user)
     data = {
         "discount": {
             "code": discount_code,
@@ -264,7 +1550,7 @@ def post_event_discount_code_to_eb(user, event_id, discount_code, discount_value
 
 
 def update_discount_code_to_eb(user, discount_id, uses):
-    eventbrite = Eventbrite(get_auth_token(user))
+    eventbrite = get_eb_client(get_auth_token(user))
     data = {
         "discount": {
             "quantity_available": uses
@@ -280,7 +1566,7 @@ def update_discount_code_to_eb(user, discount_id, uses):
 
 def delete_discount_code_from_eb(user, discount_id):
 
-    eventbrite = Eventbrite(get_auth_token(user))
+    eventbrite = get_eb_client(get_auth_token(user))
     return eventbrite.delete(
         '/discounts/{}/'.format(
             discount_id
@@ -288,10 +1574,81 @@ def delete_discount_code_from_eb(user, discount_id):
     )
 
 
+def get_ds_session():
+    """
+    This method returns the session used to call the API of DS,
+    it keeps alive the connections between the requests of the worker
+    """
+    global DS_SESSION
+    with DS_SESSION_LOCK:
+        if DS_SESSION is None:
+            DS_SESSION = Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=DS_POOL_SIZE,
+            )
+            DS_SESSION.mount('https://', adapter)
+            DS_SESSION.mount('http://', adapter)
+        return DS_SESSION
+
+
+DS_SESSION = None
+DS_SESSION_LOCK = Lock()
+
+
+DS_CACHE_STATS = {
+    'hits': 0,
+    'misses': 0,
+}
+DS_CACHE_STATS_LOCK = Lock()
+
+
+def get_ds_cache_stats():
+    """
+    This method returns the hits and misses of the cache of member numbers
+    validated in DS, and the hit rate
+    """
+    with DS_CACHE_STATS_LOCK:
+        stats = dict(DS_CACHE_STATS)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+
 def validate_member_number_ds(member_number):
     """
     This method will receive a possible member number of Deutscher Sportausweis
-    and return a json with the info
+    and return a json with the info.
+    The valid and invalid numbers are saved in cache with their own TTL,
+    the failed requests are not saved
+    """
+    key = 'ds-card-{}'.format(member_number)
+    result = cache.get(key)
+    record_cache_use(result is not None, key)
+    if result is not None:
+        with DS_CACHE_STATS_LOCK:
+            DS_CACHE_STATS['hits'] += 1
+        return result
+    with DS_CACHE_STATS_LOCK:
+        DS_CACHE_STATS['misses'] += 1
+
+    result = request_member_number_ds(member_number)
+    if isinstance(result, dict):
+        if 'Kartentyp' in result:
+            metrics.DS_VALIDATIONS.inc(result='valid')
+            cache.set(key, result, CACHE_TTL_DS_VALID)
+        else:
+            metrics.DS_VALIDATIONS.inc(result='invalid')
+            cache.set(key, result, CACHE_TTL_DS_INVALID)
+    else:
+        metrics.DS_VALIDATIONS.inc(result='error')
+    return result
+
+
+def request_member_number_ds(member_number):
+    """
+    This method will receive a possible member number of Deutscher Sportausweis
+    and call the API of DS to validate it
     """
     url = DS_API_URL
     # "https://admin.sportausweis.de/DSARestWs/RestController.php"
@@ -306,12 +1663,19 @@ def validate_member_number_ds(member_number):
         'Accept': "application/json",
     }
 
-    response = request(
-        "GET",
-        url,
-        headers=headers,
-        params=querystring
-    )
+    start = time()
+    try:
+        response = get_ds_session().request(
+            "GET",
+            url,
+            headers=headers,
+            params=querystring,
+            timeout=DS_API_TIMEOUT,
+        )
+    except RequestException:
+        return _('Invalid Request')
+    finally:
+        record_api_call('ds', start)
 
     if response.status_code == 200:
         # Return the text of response as JSON
@@ -320,6 +1684,261 @@ def validate_member_number_ds(member_number):
         return _('Invalid Request')
 
 
+def validate_member_numbers_ds(member_numbers, deadline=None):
+    """
+    This method will receive a list of possible member numbers
+    of Deutscher Sportausweis and validates them concurrently.
+    It returns a dict, the key is the member number and the value
+    is the response of validate_member_number_ds.
+    If a number has not been validated before the deadline,
+    its value is 'Invalid Request'
+    """
+    if deadline is None:
+        deadline = DS_API_DEADLINE
+    numbers = list(set(member_numbers))
+    results = {number: _('Invalid Request') for number in numbers}
+    if not numbers:
+        return results
+    executor = ThreadPoolExecutor(max_workers=len(numbers))
+    futures = {
+        executor.submit(
+            bind_request_stats(validate_member_number_ds),
+            number,
+        ): number
+        for number in numbers
+    }
+    done, not_done = wait(futures, timeout=deadline)
+    for future in not_done:
+        future.cancel()
+    executor.shutdown(wait=False)
+    for future in done:
+        results[futures[future]] = future.result()
+    return results
+
+
+def get_event_tickets_type(user, event):
+    """
+    This method will receive an user and an event of our DB
+    and returns the tickets type of the event in a dict, the key is the id
+    of ticket type in our DB and the value is the ticket_type from EB.
+    The tickets type of EB are fetched once for all of them
+    """
+    tickets_type = list(EventTicketType.objects.filter(event=event))
+    if not tickets_type:
+        return {}
+    tickets_type_eb = {
+        ticket_type_eb['id']: ticket_type_eb
+        for ticket_type_eb in get_event_tickets_eb_api(
+            get_auth_token(user),
+            event.event_id,
+        )
+    }
+    return {
+        str(ticket_type.id): tickets_type_eb[ticket_type.ticket_id_eb]
+        for ticket_type in tickets_type
+        if ticket_type.ticket_id_eb in tickets_type_eb
+    }
+
+
+def get_tickets_values(tickets):
+    """
+    This method will receive the tickets type of an event from EB
+    and returns a dict with the min and max value of the tickets
+    """
+    ticket_values = {
+        'min_value': None,
+        'min_value_display': None,
+        'max_value': None,
+        'max_value_display': None,
+    }
+    for ticket_id, ticket in tickets.items():
+
+        # Free ticket, min value 0
+        if ticket['free']:
+            ticket_values['min_value'] = 0
+            ticket_values['min_value_display'] = "$0.00"
+        else:
+            # Get the value of the ticket
+            ticket_value = float(ticket['actual_cost']['major_value'])
+
+            """ If the max value is not setted yet (first paid ticket for example),
+            set max value with the ticket value """
+            if ticket_values['max_value'] is None:
+                ticket_values['max_value'] = ticket_value
+                ticket_values['max_value_display'] = ticket['actual_cost']['display']
+
+            """ If the min value is not setted yet (first paid ticket for example),
+            set min value with the ticket value """
+            if ticket_values['min_value'] is None:
+                ticket_values['min_value'] = ticket_value
+                ticket_values['min_value_display'] = ticket['actual_cost']['display']
+
+            # If the actual ticket value is bigger than the actual max value
+            if ticket_value > ticket_values['max_value']:
+                ticket_values['max_value'] = ticket_value
+                ticket_values['max_value_display'] = ticket['actual_cost']['display']
+
+            # If the actual ticket value is lower than the actual min value
+            if ticket_value < ticket_values['min_value']:
+                ticket_values['min_value'] = ticket_value
+                ticket_values['min_value_display'] = ticket['actual_cost']['display']
+
+    return ticket_values
+
+
+def get_events_tickets_type(events_tickets_eb):
+    """
+    This method will receive a dict, the key is the id of an event of our
+    DB and the value is the list of its tickets type from EB. It returns the
+    tickets type of EB of each event that are in our DB in a dict, like the
+    ones returned by get_event_tickets_type, loaded in one query
+    """
+    tickets_eb = {
+        ticket_eb['id']: ticket_eb
+        for tickets in events_tickets_eb.values()
+        for ticket_eb in tickets
+    }
+    events_tickets_type = {event_id: {} for event_id in events_tickets_eb}
+    for ticket_type in EventTicketType.objects.filter(
+            event_id__in=events_tickets_eb.keys(),
+            ticket_id_eb__in=tickets_eb.keys(),
+    ):
+        events_tickets_type[ticket_type.event_id][str(ticket_type.id)] = \
+            tickets_eb[ticket_type.ticket_id_eb]
+    return events_tickets_type
+
+
+def get_listing_discounts(event_ids):
+    """
+    This method will receive a list of ids of events of our DB and returns
+    the discounts of the summary of the listing of each one, by event id.
+    All the summaries are made with it, the ticket types that are not
+    in EB anymore and their discounts are deleted by the sync of the events
+    """
+    tickets_discounts = {
+        discounts['ticket_type__event_id']: discounts
+        for discounts in TicketTypeDiscount.objects.filter(
+            ticket_type__event_id__in=event_ids,
+        ).values(
+            'ticket_type__event_id',
+        ).annotate(
+            min=Min('value'),
+            max=Max('value'),
+        ).order_by()
+    }
+    event_discounts = dict(EventDiscount.objects.filter(
+        event_id__in=event_ids,
+    ).values_list('event_id', 'value'))
+    ticket_counts = dict(EventTicketType.objects.filter(
+        event_id__in=event_ids,
+    ).values('event_id').annotate(
+        count=Count('id'),
+    ).order_by().values_list('event_id', 'count'))
+    discounts = {}
+    for event_id in event_ids:
+        tickets_discount = tickets_discounts.get(event_id)
+        discounts[event_id] = {
+            'min_discount': tickets_discount['min'] if tickets_discount else 0,
+            'max_discount': tickets_discount['max'] if tickets_discount else 0,
+            'tickets_discount_available': tickets_discount is not None,
+            'event_discount': event_discounts.get(event_id, 0),
+            'event_discount_available': event_id in event_discounts,
+            'ticket_count': ticket_counts.get(event_id, 0),
+        }
+    return discounts
+
+
+def update_listing_summaries(events_tickets_type):
+    """
+    This method will receive a dict, the key is the id of an event of our DB
+    and the value is its tickets type from EB, like the ones returned by
+    get_events_tickets_type, and saves the summaries of their listings with
+    the prices of those tickets type, in a fixed number of queries.
+    It returns the number of summaries saved
+    """
+    if not events_tickets_type:
+        return 0
+    discounts = get_listing_discounts(list(events_tickets_type))
+    now = timezone.now()
+    summaries = []
+    for event_id, tickets_type in events_tickets_type.items():
+        values = get_listing_prices(tickets_type)
+        values.update(discounts[event_id])
+        summaries.append(EventListingSummary(
+            event_id=event_id,
+            prices_updated=now,
+            **values
+        ))
+    with transaction.atomic():
+        EventListingSummary.objects.filter(
+            event_id__in=events_tickets_type.keys(),
+        ).delete()
+        EventListingSummary.objects.bulk_create(summaries)
+    return len(summaries)
+
+
+def get_listing_prices(tickets_type):
+    """
+    This method will receive the tickets type of an event from EB
+    and returns the prices of the summary of its listing
+    """
+    tickets_values = get_tickets_values(tickets_type)
+    return {
+        'min_price': tickets_values['min_value'],
+        'min_price_display': tickets_values['min_value_display'],
+        'max_price': tickets_values['max_value'],
+        'max_price_display': tickets_values['max_value_display'],
+    }
+
+
+def refresh_listing_summary(event_id, reset_prices=False):
+    """
+    This method will receive the id of an event of our DB
+    and updates the discounts of its listing summary, if it has one.
+    If reset_prices is True, the prices are marked as outdated until
+    reconcile_organizer_events or sync_organizer_events saves them again
+    """
+    values = get_listing_discounts([event_id])[event_id]
+    if reset_prices:
+        values['prices_updated'] = None
+    EventListingSummary.objects.filter(event_id=event_id).update(**values)
+
+
+def get_listing_summary(event):
+    """
+    This method will receive an event of our DB, loaded with
+    select_related('listing_summary'), and returns the summary of its
+    listing without more queries. The summaries are saved by
+    sync_organizer_events, reconcile_organizer_events and the receivers of
+    signals.py. If the event does not have one yet, it is saved with
+    the discounts of our DB, its prices are saved by the next sync
+    """
+    try:
+        return event.listing_summary
+    except EventListingSummary.DoesNotExist:
+        summary, created = EventListingSummary.objects.get_or_create(
+            event=event,
+            defaults=get_listing_discounts([event.id])[event.id],
+        )
+        return summary
+
+
+def get_member_discount_codes(member_numbers, statuses):
+    """
+    This method will receive a list of member numbers and a list of status,
+    and returns the member discount codes of the discount codes that any
+    of the numbers has with one of the status, ordered by id.
+    The discount of each code and its event are loaded in the same query
+    """
+    return list(MemberDiscountCode.objects.filter(
+        discount_code__memberdiscountcode__member_number__in=member_numbers,
+        discount_code__memberdiscountcode__status__in=statuses,
+    ).select_related(
+        'discount_code__discount__eventdiscount',
+        'discount_code__discount__tickettypediscount__ticket_type',
+    ).distinct().order_by('id'))
+
+
 def get_ticket_type(user, event_id, ticket_type_id):
     """
     This method will receive an user, event_id from EB
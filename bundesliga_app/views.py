@@ -9,9 +9,12 @@ from django.urls import reverse, reverse_lazy
 from django.shortcuts import redirect
 from django.utils.decorators import method_decorator
 from django.http import (
+    HttpResponse,
     HttpResponseRedirect,
     JsonResponse,
 )
+import logging
+from time import time
 from .models import (
     Discount,
     DiscountCode,
@@ -24,21 +27,42 @@ from .models import (
     TicketTypeDiscount,
 )
 from .utils import (
+    EB_FETCH_DEADLINE,
+    CachedPageMixin,
+    ConditionalGetMixin,
     EventAccessMixin,
     DiscountAccessMixin,
     check_discount_code_in_eb,
     delete_discount_code_from_eb,
+    fetch_event_tickets_bulk,
+    fetch_events_bulk,
     get_auth_token,
+    get_time_left,
+    get_event_discounts_eb_api,
     get_event_eb_api,
     get_events_user_eb_api,
+    get_events_user_import,
     get_ticket_type,
     get_user_eb_api,
     get_venue_eb_api,
     get_event_tickets_eb_api,
+    get_event_tickets_type,
+    get_listing_summary,
+    get_lookup,
+    get_member_discount_codes,
+    parse_event_dates,
+    get_cached_events_eb_entries,
+    invalidate_event_pages,
+    reconcile_organizer_events,
+    sync_organizer_events,
+    call_bulk_eb_api,
     post_event_discount_code_to_eb,
     post_ticket_discount_code_to_eb,
+    pause_content_signals,
+    refresh_listing_summary,
     update_discount_code_to_eb,
 )
+from . import metrics
 from .forms import (
     DiscountTicketForm,
     DiscountEventForm,
@@ -53,13 +77,18 @@ from django.utils.translation import ugettext as _
 from django.contrib.auth import get_user_model
 from dateutil import parser
 from django.conf import settings
+from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from django.utils.crypto import constant_time_compare
 from django.core.cache.backends.base import DEFAULT_TIMEOUT
 
 CACHE_TTL = getattr(settings, 'CACHE_TTL', DEFAULT_TIMEOUT)
 
+logger = logging.getLogger(__name__)
+
 
 @method_decorator(login_required, name='dispatch')
-class HomeView(ListView, LoginRequiredMixin):
+class HomeView(ConditionalGetMixin, ListView, LoginRequiredMixin):
 
     """ This is the home view.
     Here we show all the events of the user in our app """
@@ -68,11 +97,32 @@ class HomeView(ListView, LoginRequiredMixin):
     model = Event
     context_object_name = 'own_events'
     paginate_by = 5
+    # The events of the page that could not be fetched from EB
+    events_missing = 0
 
     def get_queryset(self):
+        # Load the discounts and ticket types of the page in constant queries
         return Event.objects.filter(
             organizer=self.request.user,
-        ).filter(is_active=True).order_by('id')
+        ).filter(is_active=True).order_by('id').select_related(
+            'eventdiscount',
+        ).prefetch_related(
+            'eventtickettype_set__tickettypediscount',
+        )
+
+    def get_eb_entries(self):
+        # The events of EB shown in the page, they are known after the render
+        if not hasattr(self, 'events_id'):
+            events_id = Event.objects.filter(
+                organizer=self.request.user,
+            ).filter(is_active=True).order_by('id').values_list(
+                'event_id',
+                flat=True,
+            )
+            self.events_id = list(
+                self.paginate_queryset(events_id, self.paginate_by)[2]
+            )
+        return get_cached_events_eb_entries(self.events_id)
 
     def _get_events(self, own_events):
         """ Get all the data of organizer events from EB API
@@ -80,88 +130,98 @@ class HomeView(ListView, LoginRequiredMixin):
         a boolean with the info about their discounts"""
 
         events = {}
-
-        for event in own_events:
+        token = get_auth_token(self.request.user)
+        # The events and their tickets share the deadline of the request
+        wait_until = time() + EB_FETCH_DEADLINE
+        # Fetch the events of the page from EB concurrently
+        events_eb = fetch_events_bulk(
+            token,
+            [event.event_id for event in own_events],
+            get_time_left(wait_until),
+        )
+        paid_events = [
+            event
+            for event, event_eb in zip(own_events, events_eb)
+            if event_eb and not event_eb['is_free']
+        ]
+        tickets_eb = dict(zip(
+            [event.id for event in paid_events],
+            fetch_event_tickets_bulk(
+                token,
+                [event.event_id for event in paid_events],
+                get_time_left(wait_until),
+            ),
+        ))
+
+        for event, event_eb in zip(own_events, events_eb):
+            # The event or its tickets could not be fetched before the
+            # deadline, the page is not complete so it is not cached
+            if not event_eb or (
+                    event.id in tickets_eb and tickets_eb[event.id] is None):
+                self.events_missing += 1
+                self.partial_page = True
+            if not event_eb:
+                continue
             """ Add event to dictionary with the id as key
             and event from API as value """
-            events[event.id] = get_event_eb_api(
-                get_auth_token(self.request.user),
-                event.event_id,
-            )
+            events[event.id] = event_eb
             # Add local_date format
             events[event.id]['start_date'] = parser.parse(
                 events[event.id]['start']['local'])
             events[event.id]['end_date'] = parser.parse(
                 events[event.id]['end']['local'])
 
-            """ If the event is free at the moment to load the page it will
-            delete the discounts and ticket types in our database"""
-            if events[event.id]['is_free']:
-                # Search the tickets type of this event
-                events_tickets_type = EventTicketType.objects.filter(
-                    event=event.id
-                )
-                for event_ticket_type in events_tickets_type:
-                    # For each ticket type,delete the related discounts
-                    TicketTypeDiscount.objects.filter(
-                        ticket_type=event_ticket_type
-                    ).delete()
-                # Delete tickets type
-                events_tickets_type.delete()
-            else:
+            """ If the event is free at the moment to load the page
+            its discounts are not shown, the command reconcile_events
+            deletes them from our database"""
+            if not events[event.id]['is_free']:
                 # If not free, set the tickets types
                 events[event.id]['has_discount'] = False
 
                 # If has a event discount, set has discount in true
-                if EventDiscount.objects.filter(
-                        event=event).exists():
+                if hasattr(event, 'eventdiscount'):
                     events[event.id]['has_discount'] = True
 
-                self._set_tickets_type(events[event.id], event)
+                self._set_tickets_type(
+                    events[event.id],
+                    event,
+                    tickets_eb[event.id] or [],
+                )
         return events
 
-    def _set_tickets_type(self, event_api, event_own):
-        """ Receive 2 params:
+    def _set_tickets_type(self, event_api, event_own, tickets_eb):
+        """ Receive 3 params:
         - event_api: The dict with the event info for context data
         - event_own: The event of our DB
+        - tickets_eb: The tickets type of the event from EB
         This method set all the tickets type of the event with its discount
-        If the ticket type its free and has a discount, delete it"""
+        If the ticket type its free, its discount is not shown"""
 
         event_api['tickets_type'] = {}
 
-        tickets_type_own = EventTicketType.objects.filter(
-            event=event_own
-        )
+        tickets_eb = {ticket_eb['id']: ticket_eb for ticket_eb in tickets_eb}
 
-        for ticket_type_own in tickets_type_own:
+        for ticket_type_own in event_own.eventtickettype_set.all():
             """ Add ticket_type to dictionary with the id as key
             and ticket type from API as value """
-            event_api['tickets_type'].update(get_ticket_type(
-                self.request.user,
-                event_own.event_id,
-                ticket_type_own.id,
-            ))
+            # The ticket type is not in EB anymore
+            if ticket_type_own.ticket_id_eb not in tickets_eb:
+                continue
+            event_api['tickets_type'][str(ticket_type_own.id)] = tickets_eb[
+                ticket_type_own.ticket_id_eb]
 
-            if TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_type_own).exists():
+            if hasattr(ticket_type_own, 'tickettypediscount') and not event_api[
+                    'tickets_type'][str(ticket_type_own.id)]['free']:
 
                 event_api['has_discount'] = True
-
-                if event_api['tickets_type'][str(
-                        ticket_type_own.id)]['free']:
-                    TicketTypeDiscount.objects.filter(
-                        ticket_type=ticket_type_own,
-                    ).delete()
-                else:
-                    discount = TicketTypeDiscount.objects.get(
-                        ticket_type=ticket_type_own
-                    )
-                    event_api['tickets_type'][str(
-                        ticket_type_own.id)]['discount'] = discount.__dict__
+                event_api['tickets_type'][str(
+                    ticket_type_own.id)]['discount'] = ticket_type_own.tickettypediscount.__dict__
 
     def get_context_data(self, **kwargs):
         context = super(HomeView, self).get_context_data(**kwargs)
+        self.events_id = [event.event_id for event in context['own_events']]
         context['events'] = self._get_events(context['own_events'])
+        context['events_missing'] = self.events_missing
         context['organizer'] = self.request.user
         context['attendee_url'] = self.request.get_host() + reverse(
             'landing_page_buyer',
@@ -185,6 +245,11 @@ class SelectEvents(TemplateView, LoginRequiredMixin):
             get_auth_token(self.request.user)
         )
 
+    def _get_events_import(self):
+        return get_events_user_import(
+            get_auth_token(self.request.user)
+        )
+
     def _get_event_tickets(self, event_id):
         return get_event_tickets_eb_api(
             get_auth_token(self.request.user),
@@ -206,202 +271,88 @@ class SelectEvents(TemplateView, LoginRequiredMixin):
             events_id.append(event[0])
         return events_id
 
-    def _delete_unselected_events(self, selected_events_id):
-        """ See if had unselected any event active
-            and delete every discount and ticket type that has associated
+    def _get_unused_discounts_eb(self, events, selected_events_id):
         """
-
-        # Get actives events from DB and put them in an array
-        db_selected_ids = []
-        for event in Event.objects.filter(
-                organizer=self.request.user).filter(is_active=True):
-
-            db_selected_ids.append(event.event_id)
-
-        for db_event_id in db_selected_ids:
-            """ If the event its not selected change as no active event
-            """
-            if db_event_id not in selected_events_id:
-                event_in_db = Event.objects.filter(
-                    event_id=db_event_id)
-                event_in_db.update(is_active=False)
-                event_in_db = event_in_db.get()
-
-                event_tickets_type = EventTicketType.objects.filter(
-                    event=event_in_db
-                )
-
-                # Delete the event discount if exists
-                if EventDiscount.objects.filter(
-                        event=event_in_db):
-                    EventDiscount.objects.filter(
-                        event=event_in_db
-                    ).delete()
-
-                """ For each tycket type
-                delete the discount if exists and delete the ticket type
-                """
-                for ticket_type in event_tickets_type:
-                    ticket_type_discounts = TicketTypeDiscount.objects.filter(
-                        ticket_type=ticket_type
-                    )
-                    if ticket_type_discounts:
-                        TicketTypeDiscount.objects.filter(
-                            ticket_type=ticket_type
-                        ).delete()
-                    ticket_type.delete()
-
-    def _create_event(self, event_in_api_id):
-        """ Create the event with the tickets type from EB """
-
-        created_event = Event.objects.create(
-            event_id=event_in_api_id,
-            organizer=self.request.user,
-            is_active=True,
-        )
-
-        tickets_id_eb = []
-        # Search the tickets of the event of EB and save it in db
-        tickets = self._get_event_tickets(event_in_api_id)
-        for ticket in tickets:
-            tickets_id_eb.append(ticket['id'])
-            EventTicketType.objects.create(
-                event=created_event,
-                ticket_id_eb=ticket['id'],
-            )
-
-        return tickets_id_eb
-
-    def _update_event(self, event_in_api_id):
-        """ Update the event with the tickets type from EB,
-            also delete the discounts of a free ticket type
-            and returns the tickets id of eb which have been added
-        """
-
-        # Get the event and update it as an active event
-        event = Event.objects.filter(event_id=event_in_api_id)
-        event.update(
-            event_id=event_in_api_id,
-            organizer=self.request.user,
-            is_active=True,
-        )
-
-        # Update tickets of event
-        tickets_id_eb = self._update_tickets(event_in_api_id, event)
-
-        return tickets_id_eb
-
-    def _update_tickets(self, event_in_api_id, event):
-        """ Search the tickets in EB, create if are not in DB yet,
-            and if is in the DB and the ticket is free, delete it discount
-            It returns the id of tickets type from eB
+        Get the discounts of EB of the discount codes of the unselected
+        events. The discounts of EB of each event are fetched concurrently.
+        If a discount was already used by a member, or the discounts of
+        an event could not be fetched before the deadline, the event can't
+        be unselected and it returns None, else it returns the ids of EB
+        of the discounts to delete
         """
 
-        tickets = self._get_event_tickets(event_in_api_id)
-
-        tickets_id_eb = []
-        for ticket in tickets:
-            tickets_id_eb.append(ticket['id'])
+        unselected_events = {
+            event['id']: event
+            for event in events
+            if event['id'] not in selected_events_id
+        }
+        # The codes of the discounts of the events and of its tickets type
+        discount_codes = {}
+        for code, event_id, ticket_event_id in DiscountCode.objects.filter(
+            Q(discount__eventdiscount__event__event_id__in=unselected_events) |
+            Q(discount__tickettypediscount__ticket_type__event__event_id__in=unselected_events)
+        ).values_list(
+            'discount_code',
+            'discount__eventdiscount__event__event_id',
+            'discount__tickettypediscount__ticket_type__event__event_id',
+        ):
+            discount_codes.setdefault(
+                event_id or ticket_event_id, []
+            ).append(code)
 
-            # If the ticket is not in our DB yet, add it
-            if not EventTicketType.objects.filter(
-                ticket_id_eb=ticket['id'],
-            ).exists():
-                EventTicketType.objects.create(
-                    event=event.get(),
-                    ticket_id_eb=ticket['id'],
-                )
-            else:
-                """ If the ticket is in our DB and
-             its free but has a discount, delete it"""
-                event_ticket_type = EventTicketType.objects.filter(
-                    ticket_id_eb=ticket['id'],
-                )
-                if ticket['free'] and TicketTypeDiscount.objects.filter(
-                    ticket_type=event_ticket_type,
-                ).exists():
-                    TicketTypeDiscount.objects.filter(
-                        ticket_type=event_ticket_type,
-                    ).delete()
-        return tickets_id_eb
-
-    def _delete_old_tickets_types(self, tickets_id_eb):
-        """
-        Verify if exists a ticket type in our db that does not
-        exists anymore in EB, and delete it with its discount
-        """
+        discounts_in_eb = call_bulk_eb_api(
+            get_event_discounts_eb_api,
+            self.request.user,
+            discount_codes.keys(),
+        )
+        discounts_id_eb = []
+        for event_id, event in unselected_events.items():
+            if event_id not in discount_codes:
+                continue
+            if discounts_in_eb[event_id] is None:
+                messages.error(
+                    self.request,
+                    _("The discounts of '{}' could not be verified in Eventbrite, try again later").format(
+                        event['name']['text']))
+                return None
+            for code in discount_codes[event_id]:
+                discount_in_eb = discounts_in_eb[event_id].get(code)
+                # The code does not exist in EB
+                if not discount_in_eb:
+                    continue
+                if not discount_in_eb['quantity_sold'] == 0:
+                    messages.error(
+                        self.request,
+                        _(
+                            "You can not delete '{}' , because it has a discount that was already used by a member").format(
+                            event['name']['text']))
+                    return None
+                discounts_id_eb.append(discount_in_eb['id'])
+        return discounts_id_eb
 
-        # Get all the EventTicketType from db
-        tickets_type_in_db = EventTicketType.objects.all()
-        for ticket_type_in_db in tickets_type_in_db:
-            """ Verify if the ticket in db,
-            is not anymore in eb and delete it with its discount
-            """
-            if ticket_type_in_db.ticket_id_eb not in tickets_id_eb:
-                event_ticket_type = EventTicketType.objects.get(
-                    ticket_id_eb=ticket_type_in_db.ticket_id_eb
-                )
-                # If the ticket type has a discount, delete it
-                if TicketTypeDiscount.objects.filter(
-                    ticket_type=event_ticket_type,
-                ).exists():
-                    TicketTypeDiscount.objects.get(
-                        ticket_type=event_ticket_type
-                    ).delete()
-                # Delete event ticket type
-                event_ticket_type.delete()
-
-    def _verify_if_exists_buyed_discount(self, events, selected_events_id):
+    def _delete_discounts_eb(self, discounts_id_eb):
         """
-        Verify if exists the event has a buyed discount, if it has it will return
-        True and if it hasn't, it will delete the discounts code from EB
+        Delete concurrently the discounts from EB,
+        it returns the number of discounts deleted and the ids of EB
+        of the ones that failed or were not deleted before the deadline.
+        The late deletes are not cancelled, they keep running in background
         """
 
-        for event in events:
-            """ If the event its not selected verify if it has a discount
-            """
-            if event['id'] not in selected_events_id:
-                if Event.objects.filter(event_id=event['id']).exists():
-                    event_in_db = Event.objects.get(event_id=event['id'])
-                    discounts = []
-
-                    if EventDiscount.objects.filter(
-                            event=event_in_db).exists():
-                        discounts.append(EventDiscount.objects.get(
-                            event=event_in_db))
-                    for ticket in EventTicketType.objects.filter(event=event_in_db):
-                        if TicketTypeDiscount.objects.filter(
-                                ticket_type=ticket).exists():
-                            discounts.append(
-                                TicketTypeDiscount.objects.get(
-                                    ticket_type=ticket)
-                            )
-                    for discount in discounts:
-                        if DiscountCode.objects.filter(
-                                discount=discount).exists():
-
-                            discount_codes = DiscountCode.objects.filter(
-                                discount=discount)
-
-                            for discount_code in discount_codes:
-                                discount_in_eb = check_discount_code_in_eb(
-                                    self.request.user,
-                                    event_in_db.event_id,
-                                    discount_code.discount_code,
-                                )
-                                if not discount_in_eb['discounts'][0]['quantity_sold'] == 0:
-                                    messages.error(
-                                        self.request,
-                                        _(
-                                            "You can not delete '{}' , because it has a discount that was already used by a member").format(
-                                            event['name']['text']))
-                                    return True
-                                else:
-                                    # Delete the discount from EB
-                                    delete_discount_code_from_eb(
-                                        self.request.user,
-                                        discount_in_eb['discounts'][0]['id'],
-                                    )
+        deleted = call_bulk_eb_api(
+            delete_discount_code_from_eb,
+            self.request.user,
+            discounts_id_eb,
+            cancel_late=False,
+        )
+        failed = sorted(
+            discount_id
+            for discount_id, result in deleted.items()
+            if result is None
+        )
+        return {
+            'deleted': len(deleted) - len(failed),
+            'failed': failed,
+        }
 
     # END METHODS THAT SUPPORT THE POST OF THIS VIEW
 
@@ -410,34 +361,32 @@ class SelectEvents(TemplateView, LoginRequiredMixin):
         events = self._get_event()
         events_id = self._get_events_selected_id()
 
-        if self._verify_if_exists_buyed_discount(events, events_id):
-            # If return True, the event has a buyed discount, so it can't be deleted
+        discounts_id_eb = self._get_unused_discounts_eb(events, events_id)
+        if discounts_id_eb is None:
+            # An event has a buyed discount, so it can't be deleted
             return HttpResponseRedirect(
                 reverse(
                     'select_events',
                 )
             )
-        self._delete_unselected_events(events_id)
-
-        tickets_id_eb = []
-        for event_in_api in events:
-
-            if event_in_api['id'] in events_id:
-                # Verify if this event already exist
-                if not Event.objects.filter(
-                        event_id=event_in_api['id']).exists():
-                    tickets_id_eb.extend(
-                        self._create_event(event_in_api['id'])
-                    )
-
-                else:
-                    """ The event is in the BD, so update the info of event
-                    and add the list of tickets id of eb in tickets_id_eb"""
-                    tickets_id_eb.extend(
-                        self._update_event(event_in_api['id'])
-                    )
-
-        self._delete_old_tickets_types(tickets_id_eb)
+        # The tickets are fetched from EB before the transaction
+        sync_organizer_events(self.request.user, {
+            event_in_api['id']: self._get_event_tickets(event_in_api['id'])
+            for event_in_api in events
+            if event_in_api['id'] in events_id
+        })
+        # The discounts are deleted from EB once the events are saved
+        deleted = self._delete_discounts_eb(discounts_id_eb)
+        if deleted['failed']:
+            logger.warning(
+                'The discounts %s of the organizer %s could not be deleted '
+                'from EB', ', '.join(map(str, deleted['failed'])),
+                self.request.user.id,
+            )
+            messages.warning(
+                self.request,
+                _("{} discounts of the unselected events could not be deleted from Eventbrite yet, verify them in Eventbrite").format(
+                    len(deleted['failed'])))
 
         return HttpResponseRedirect(reverse('index'))
 
@@ -451,84 +400,89 @@ class SelectEvents(TemplateView, LoginRequiredMixin):
         for event in Event.objects.filter(
                 organizer=self.request.user).filter(is_active=True):
             context['already_selected_id'].append(event.event_id)
-        context['events'] = self._get_event()
+        # The first events are shown while the rest are imported
+        context['events'], complete = self._get_events_import()
+        context['events_loading'] = not complete
         for event in context['events']:
-            event['start_date'] = parser.parse(
-                event['start']['local'])
-            event['end_date'] = parser.parse(
-                event['end']['local'])
+            if 'start_date' not in event:
+                parse_event_dates(event)
         return context
 
 
 @method_decorator(login_required, name='dispatch')
-class EventDiscountsView(TemplateView, LoginRequiredMixin, EventAccessMixin):
+class EventDiscountsView(ConditionalGetMixin, TemplateView, LoginRequiredMixin, EventAccessMixin):
 
     """ This is the the Event Discounts view,
     here the organizer can manage the discounts of the event"""
 
     template_name = 'organizer/event_discounts.html'
 
+    def get_event(self):
+        # The event is used by the ETag and by the context
+        if not hasattr(self, 'event'):
+            self.event = super(EventDiscountsView, self).get_event()
+        return self.event
+
+    def get_eb_entries(self):
+        """ The uses of the discounts in EB are not in the ETag,
+        they are verified again when a discount is deleted """
+        return get_cached_events_eb_entries(
+            [self.get_event().event_id],
+            free_tickets=True,
+        )
+
     def _get_tickets_type(self, event):
-        """ Get the tickets type of EB and
-        - If is not in our DB, create it
-        - If is in our DB:
-            - If its free, delete it discount
-            - If not free, get the discount
-        - If a ticket is in our DB but no in EB, delete it """
+        """ Get the tickets type of EB that are in our DB, with the discount
+        of the paid ones. The ticket types, their discounts and their codes
+        are loaded once, the GET does not write: the tickets type of EB that
+        are not in our DB, and the ones of our DB that are not in EB, are
+        kept in unsynced_tickets_type and synced by SyncEventTicketsView """
 
         tickets_eb = get_event_tickets_eb_api(
             get_auth_token(self.request.user),
             event.event_id,
         )
+        event_tickets_type = {
+            ticket_type.ticket_id_eb: ticket_type
+            for ticket_type in EventTicketType.objects.filter(event=event)
+        }
+        discounts = {
+            discount.ticket_type_id: discount
+            for discount in TicketTypeDiscount.objects.filter(
+                ticket_type__event=event,
+            )
+        }
+        # The codes of the discount of each ticket type
+        discount_codes = {ticket_type_id: [] for ticket_type_id in discounts}
+        for ticket_type_id, discount_code in DiscountCode.objects.filter(
+                discount__tickettypediscount__ticket_type__event=event,
+        ).values_list('discount__tickettypediscount__ticket_type', 'discount_code'):
+            discount_codes[ticket_type_id].append(discount_code)
         tickets_type = {}
+        self.unsynced_tickets_type = {
+            'new': [],
+            'old': len(set(event_tickets_type) - {
+                ticket_eb['id'] for ticket_eb in tickets_eb
+            }),
+        }
         for ticket_eb in tickets_eb:
-            if EventTicketType.objects.filter(
-                    ticket_id_eb=ticket_eb['id']).exists():
-
-                event_ticket_type = EventTicketType.objects.get(
-                    ticket_id_eb=ticket_eb['id'])
-                tickets_type[str(event_ticket_type.id)] = ticket_eb
-
-                if TicketTypeDiscount.objects.filter(
-                        ticket_type=event_ticket_type).exists():
-                    discount = TicketTypeDiscount.objects.get(
-                        ticket_type=event_ticket_type
-                    )
-
-                    if ticket_eb['free']:
-                        discount.delete()
-                    else:
-                        tickets_type[str(event_ticket_type.id)
-                                     ]['discount'] = discount.__dict__
-                        tickets_type[str(event_ticket_type.id)][
-                            'discount']['deleteable'] = self._verify_if_discount_was_used(
-                            tickets_type[
-                                str(event_ticket_type.id)]['discount'],
-                            event,
-                        )
-
-            else:
-
-                event_ticket_type = EventTicketType.objects.create(
-                    ticket_id_eb=ticket_eb['id'],
-                    event=event,
+            event_ticket_type = event_tickets_type.get(ticket_eb['id'])
+            if event_ticket_type is None:
+                self.unsynced_tickets_type['new'].append(ticket_eb)
+                continue
+            # The tickets of EB could be shared with the cache
+            ticket_eb = dict(ticket_eb)
+            tickets_type[str(event_ticket_type.id)] = ticket_eb
+            discount = discounts.get(event_ticket_type.id)
+            if not ticket_eb['free'] and discount is not None:
+                ticket_eb['discount'] = discount.__dict__
+                ticket_eb['discount']['deleteable'] = self._verify_if_discount_was_used(
+                    ticket_eb['discount'],
+                    event,
+                    discount_codes[event_ticket_type.id],
                 )
-                tickets_type[str(event_ticket_type.id)] = ticket_eb
-        self._delete_old_tickets_types(event, tickets_type)
-
         return tickets_type
 
-    def _delete_old_tickets_types(self, event, tickets_type):
-        """ Delete the tickets type that are not in EB """
-
-        event_tickets_type_own = EventTicketType.objects.filter(
-            event=event)
-        for event_ticket_type_own in event_tickets_type_own:
-            if str(event_ticket_type_own.id) not in tickets_type.keys():
-                TicketTypeDiscount.objects.filter(
-                    ticket_type=event_ticket_type_own).delete()
-                event_ticket_type_own.delete()
-
     def _get_discount_event(self, event):
         """ Get the event discount if exists"""
 
@@ -566,6 +520,7 @@ class EventDiscountsView(TemplateView, LoginRequiredMixin, EventAccessMixin):
             context['event']
         )
         context['tickets_type'] = self._get_tickets_type(context['event'])
+        context['unsynced_tickets_type'] = self.unsynced_tickets_type
         context['has_discount'] = self._verify_discount(
             context['event_discount'],
             context['tickets_type'],
@@ -577,6 +532,25 @@ class EventDiscountsView(TemplateView, LoginRequiredMixin, EventAccessMixin):
         return context
 
 
+@method_decorator(login_required, name='dispatch')
+class SyncEventTicketsView(View, LoginRequiredMixin, EventAccessMixin):
+
+    """ This view syncs the tickets type of an event with EB,
+    the new ones are created and the ones that are not in EB are deleted """
+
+    def post(self, request, *args, **kwargs):
+        event = self.get_event()
+        reconcile_organizer_events(request.user, [event.id])
+        return HttpResponseRedirect(
+            reverse(
+                'events_discount',
+                kwargs={
+                    'event_id': event.id
+                },
+            )
+        )
+
+
 @method_decorator(login_required, name='dispatch')
 class ManageDiscountEvent(FormView, LoginRequiredMixin, DiscountAccessMixin):
 
@@ -628,23 +602,18 @@ class ManageDiscountEvent(FormView, LoginRequiredMixin, DiscountAccessMixin):
         )
 
     def delete_discount_ticket_type(self, event):
-        """ Delete ticket discounts if exists """
+        """ Delete ticket discounts if exists.
+        The summary and the pages of the event are refreshed
+        once by the event discount that replaces them """
 
-        tickets_type = EventTicketType.objects.filter(
-            event=event,
-        )
-        for ticket_type in tickets_type:
-            if TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_type).exists():
-                TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_type).delete()
+        with pause_content_signals():
+            TicketTypeDiscount.objects.filter(
+                ticket_type__event=event).delete()
 
     def add_discount(self, form, event):
         """ Create or update the event discount according to the case """
 
-        discount_type = DiscountType.objects.filter(
-            name="Event"
-        ).get()
+        discount_type = get_lookup(DiscountType, 'Event')
         if not ('discount_id' in self.kwargs):
             EventDiscount.objects.create(
                 name=form['discount_name'].value(),
@@ -661,19 +630,14 @@ class ManageDiscountEvent(FormView, LoginRequiredMixin, DiscountAccessMixin):
                 value=form['discount_value'].value(),
                 value_type='percentage',
             )
+            refresh_listing_summary(event.id)
+            invalidate_event_pages(event.id, event.organizer_id)
 
     def _verify_discount_ticket_type(self, event):
         """ Search if exists a ticket discount """
 
-        has_discount_ticket_type = False
-        tickets_type = EventTicketType.objects.filter(
-            event=event,
-        )
-        for ticket_type in tickets_type:
-            if TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_type).exists():
-                has_discount_ticket_type = True
-        return has_discount_ticket_type
+        return TicketTypeDiscount.objects.filter(
+            ticket_type__event=event).exists()
 
     def get_context_data(self, **kwargs):
         context = super(ManageDiscountEvent, self).get_context_data(**kwargs)
@@ -756,9 +720,7 @@ class ManageDiscountTicketType(FormView, LoginRequiredMixin, DiscountAccessMixin
     def add_discount(self, form, ticket_type):
         """ Create or update the ticket discount according to the case """
 
-        discount_type = DiscountType.objects.filter(
-            name="Ticket Type"
-        ).get()
+        discount_type = get_lookup(DiscountType, 'Ticket Type')
         if not ('discount_id' in self.kwargs):
             TicketTypeDiscount.objects.create(
                 name=form['discount_name'].value(),
@@ -776,6 +738,11 @@ class ManageDiscountTicketType(FormView, LoginRequiredMixin, DiscountAccessMixin
                     value=form['discount_value'].value(),
                     value_type='percentage',
             )
+            refresh_listing_summary(ticket_type.event_id)
+            invalidate_event_pages(
+                ticket_type.event_id,
+                ticket_type.event.organizer_id,
+            )
 
     def _verify_discount_event(self, event):
         """ Search if exists a event discount """
@@ -829,15 +796,17 @@ class DeleteDiscountView(DeleteView, LoginRequiredMixin, DiscountAccessMixin):
             event = Event.objects.get(id=self.kwargs['event_id'])
             discount_codes = DiscountCode.objects.filter(
                 discount=self.kwargs['discount_id'])
+            all_discounts_in_eb = self._get_discounts_in_eb(event)
             discounts_in_eb = []
             for discount_code in discount_codes:
-                discount_in_eb = check_discount_code_in_eb(
-                    self.request.user,
-                    event.event_id,
-                    discount_code.discount_code,
+                discount_in_eb = all_discounts_in_eb.get(
+                    discount_code.discount_code
                 )
+                # The code does not exist in EB
+                if not discount_in_eb:
+                    continue
                 discounts_in_eb.append(discount_in_eb)
-                if not discount_in_eb['discounts'][0]['quantity_sold'] == 0:
+                if not discount_in_eb['quantity_sold'] == 0:
                     messages.error(
                         self.request,
                         _(
@@ -856,7 +825,7 @@ class DeleteDiscountView(DeleteView, LoginRequiredMixin, DiscountAccessMixin):
             for discount_in_eb in discounts_in_eb:
                 delete_discount_code_from_eb(
                     self.request.user,
-                    discount_in_eb['discounts'][0]['id'],
+                    discount_in_eb['id'],
                 )
             return self.delete(request, *args, **kwargs)
         else:
@@ -871,7 +840,7 @@ class DeleteDiscountView(DeleteView, LoginRequiredMixin, DiscountAccessMixin):
 """ -- Buyer Views -- """
 
 
-class LandingPageBuyerView(ListView):
+class LandingPageBuyerView(CachedPageMixin, ListView):
 
     """ This is the landing page of an organizer for the buyer
     here the buyer can visualize the events with its discounts """
@@ -880,129 +849,113 @@ class LandingPageBuyerView(ListView):
     model = Event
     context_object_name = 'own_events'
     paginate_by = 6
+    # The events of the page that could not be fetched from EB
+    events_missing = 0
+
+    def _get_organizer(self):
+        # The organizer is fetched once per request
+        if not hasattr(self, 'organizer'):
+            self.organizer = get_user_model().objects.get(
+                id=self.kwargs['organizer_id'])
+        return self.organizer
 
     def get_queryset(self):
-        organizer = get_user_model().objects.get(
-            id=self.kwargs['organizer_id'])
+        # The discounts of the events are read from their listing summary
         return Event.objects.filter(
-            organizer=organizer).filter(is_active=True).order_by('id')
+            organizer=self._get_organizer(),
+        ).filter(is_active=True).order_by('id').select_related(
+            'listing_summary',
+        )
 
     def _get_events(self, organizer, events_own):
         """ Get all the data of organizer events from EB API
-        Also, each event has their tickets type and
-         the info about their discounts"""
+        Also, each event has the info about their discounts
+        of its listing summary"""
 
         events = {}
+        # Fetch the events of the page from EB concurrently
+        events_eb = fetch_events_bulk(
+            get_auth_token(organizer),
+            [event.event_id for event in events_own],
+        )
 
-        for event in events_own:
+        for event, event_eb in zip(events_own, events_eb):
+            # The event could not be fetched before the deadline,
+            # the page is not complete so it is not cached
+            if not event_eb:
+                self.events_missing += 1
+                self.partial_page = True
+                continue
             """ Add event to dictionary with the id as key
             and event from API as value """
-            events[event.id] = get_event_eb_api(
-                get_auth_token(organizer),
-                event.event_id,
-            )
+            events[event.id] = event_eb
             # Add local_date format
             events[event.id]['start_date'] = parser.parse(
                 events[event.id]['start']['local'])
             events[event.id]['end_date'] = parser.parse(
                 events[event.id]['end']['local'])
 
-            events[event.id]['tickets_type'] = {}
-            # Get all tickets type of event from DB
-            tickets_type_own = EventTicketType.objects.filter(
-                event=event.id
-            )
-            events[event.id]['max_discount'] = 0
-            events[event.id]['min_discount'] = 0
-            events[event.id]['discounts'] = {}
-
-            if EventDiscount.objects.filter(
-                    event=event).exists():
-                self._set_event_discount(events[event.id], event)
-
-            for ticket_type_own in tickets_type_own:
-
-                if TicketTypeDiscount.objects.filter(
-                        ticket_type=ticket_type_own.id).exists():
-
-                    self._set_ticket_type_discount(
-                        events[event.id],
-                        ticket_type_own,
-                    )
-
+            """ If the event is free at the moment to load the page
+            its discounts are not shown, the command reconcile_events
+            deletes them from our database"""
             if events[event.id]['is_free']:
-                self._delete_free_event_discounts(event.id)
-
-        return events
-
-    def _set_event_discount(self, event, event_own):
-        """ Set the value of discount according the event discount """
-
-        discount = EventDiscount.objects.get(
-            event=event_own,
-        )
-        event['max_discount'] = discount.value
-        event['min_discount'] = discount.value
-        event['discounts'][discount.id] = discount.__dict__
-
-    def _set_ticket_type_discount(self, event, ticket_type_own):
-        """ Set the value of discount according the ticket discount """
-
-        discount = TicketTypeDiscount.objects.get(
-            ticket_type=ticket_type_own.id
-        )
-        event['discounts'][discount.id] = discount.__dict__
-
-        if discount.value > event['max_discount']:
-            event['max_discount'] = discount.value
-
-        if event['min_discount'] == 0:
-            event['min_discount'] = discount.value
+                events[event.id].update(
+                    has_discount=False,
+                    max_discount=0,
+                    min_discount=0,
+                )
+                continue
 
-        if discount.value < event['min_discount']:
-            event['min_discount'] = discount.value
+            self._set_discount(events[event.id], get_listing_summary(event))
 
-    def _delete_free_event_discounts(self, event_id):
-        """ If the event is free at the moment to load the page it will
-        delete the discounts and ticket types in our database"""
+        return events
 
-        EventDiscount.objects.filter(event=event_id).delete()
+    def _set_discount(self, event, summary):
+        """ Set the values of discount according the listing summary,
+        the discounts of the tickets are shown before the event discount """
 
-        events_tickets_type = EventTicketType.objects.filter(
-            event=event_id
+        if summary.tickets_discount_available:
+            event['max_discount'] = summary.max_discount
+            event['min_discount'] = summary.min_discount
+        elif summary.event_discount_available:
+            event['max_discount'] = summary.event_discount
+            event['min_discount'] = summary.event_discount
+        else:
+            event['max_discount'] = 0
+            event['min_discount'] = 0
+        event['has_discount'] = (
+            summary.tickets_discount_available or
+            summary.event_discount_available
         )
 
-        for event_ticket_type in events_tickets_type:
-            # For each ticket type,delete the related discounts
-            TicketTypeDiscount.objects.filter(
-                ticket_type=event_ticket_type
-            ).delete()
-        # Delete tickets type
-        events_tickets_type.delete()
-
     def get_context_data(self, **kwargs):
         context = super(LandingPageBuyerView, self).get_context_data(**kwargs)
-        context['organizer'] = get_user_model().objects.get(
-            id=self.kwargs['organizer_id'])
+        context['organizer'] = self._get_organizer()
         context['events'] = self._get_events(
             context['organizer'],
             context['own_events']
         )
+        context['events_missing'] = self.events_missing
         return context
 
 
-class ListingPageEventView(FormView):
+class ListingPageEventView(CachedPageMixin, FormView):
     """ This view visualize the info of an event """
     template_name = 'buyer/listing_page_event.html'
     form_class = GetDiscountForm
+    # The page has the CSRF token of the user, so it is also private
+    cache_control = {'max_age': 0, 'must_revalidate': True}
 
     def _get_events(self, organizer):
-        # Get Event by the id and organizer
+        # Get Event by the id and organizer, with its listing summary
         event_in_db = get_object_or_404(
-            Event,
+            Event.objects.select_related('listing_summary'),
             id=self.kwargs['event_id'],
             organizer=organizer,
         )
+        return event_in_db
+
+    def _get_event_eb(self, organizer, event_in_db):
         """ Get the event from API EB.
             It uses the token of landing page's organizer """
         event = get_event_eb_api(
@@ -1026,137 +979,90 @@ class ListingPageEventView(FormView):
         )
         return venue
 
-    def _get_tickets_type(self, event_id, organizer):
-        event = Event.objects.get(id=event_id)
-        tickets_type_in_db = EventTicketType.objects.filter(
-            event=event
-        )
-        tickets_type = {}
-        for ticket_type_in_db in tickets_type_in_db:
-            tickets_type.update(get_ticket_type(
-                organizer,
-                event.event_id,
-                ticket_type_in_db.id,
-            ))
-            if TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_type_in_db).exists():
-                discount = TicketTypeDiscount.objects.get(
-                    ticket_type=ticket_type_in_db
-                )
-                tickets_type[str(ticket_type_in_db.id)
+    def _get_tickets_type(self, event, organizer):
+        # Get all the tickets type of EB at once
+        tickets_type = get_event_tickets_type(organizer, event)
+        for discount in TicketTypeDiscount.objects.filter(
+                ticket_type__event=event):
+            if str(discount.ticket_type_id) in tickets_type:
+                tickets_type[str(discount.ticket_type_id)
                              ]['discount'] = discount.__dict__
 
         return tickets_type
 
-    def _get_tickets_discounts(self, tickets_type):
-        discounts = {
-            'max_discount': 0,
-            'min_discount': 0,
-            'available': False,
+    def _get_tickets_discounts(self, summary):
+        return {
+            'max_discount': summary.max_discount,
+            'min_discount': summary.min_discount,
+            'available': summary.tickets_discount_available,
         }
 
-        for ticket_id in tickets_type.keys():
-            if TicketTypeDiscount.objects.filter(
-                    ticket_type=ticket_id).exists():
-                discount = TicketTypeDiscount.objects.get(
-                    ticket_type=ticket_id)
-                discounts['available'] = True
-                if discount.value > discounts['max_discount']:
-                    discounts['max_discount'] = discount.value
-
-                if discounts['min_discount'] == 0:
-                    discounts['min_discount'] = discount.value
-
-                if discount.value < discounts['min_discount']:
-                    discounts['min_discount'] = discount.value
-        return discounts
-
-    def _get_tickets(self, tickets):
-        ticket_values = {
-            'min_value': None,
-            'min_value_display': None,
-            'max_value': None,
-            'max_value_display': None,
+    def _get_tickets(self, summary):
+        return {
+            'min_value': summary.min_price,
+            'min_value_display': summary.min_price_display,
+            'max_value': summary.max_price,
+            'max_value_display': summary.max_price_display,
         }
-        for ticket_id, ticket in tickets.items():
 
-            # Free ticket, min value 0
-            if ticket['free']:
-                ticket_values['min_value'] = 0
-                ticket_values['min_value_display'] = "$0.00"
-            else:
-                # Get the value of the ticket
-                ticket_value = float(ticket['actual_cost']['major_value'])
-
-                """ If the max value is not setted yet (first paid ticket for example),
-                set max value with the ticket value """
-                if ticket_values['max_value'] is None:
-                    ticket_values['max_value'] = ticket_value
-                    ticket_values['max_value_display'] = ticket['actual_cost']['display']
-
-                """ If the min value is not setted yet (first paid ticket for example),
-                set min value with the ticket value """
-                if ticket_values['min_value'] is None:
-                    ticket_values['min_value'] = ticket_value
-                    ticket_values['min_value_display'] = ticket['actual_cost']['display']
-
-                # If the actual ticket value is bigger than the actual max value
-                if ticket_value > ticket_values['max_value']:
-                    ticket_values['max_value'] = ticket_value
-                    ticket_values['max_value_display'] = ticket['actual_cost']['display']
-
-                # If the actual ticket value is lower than the actual min value
-                if ticket_value < ticket_values['min_value']:
-                    ticket_values['min_value'] = ticket_value
-                    ticket_values['min_value_display'] = ticket['actual_cost']['display']
-
-        return ticket_values
-
-    def _get_event_discount(self, event_id):
-        event_discount = {
-            'value': 0,
-            'available': False,
+    def _get_event_discount(self, summary):
+        return {
+            'value': summary.event_discount,
+            'available': summary.event_discount_available,
         }
-        event = Event.objects.get(
-            id=event_id
-        )
-        if EventDiscount.objects.filter(
-            event=event
-        ).exists():
-            event_discount['value'] = EventDiscount.objects.get(
-                event=event
-            ).value
-            event_discount['available'] = True
 
-        return event_discount
+    def get_listing(self):
+        """ Get the info of the listing of the event.
+        It is computed once per request and shared by the view,
+        the form and the generation of the discount code """
+        if not hasattr(self, 'listing'):
+            listing = {}
+            listing['organizer'] = get_user_model().objects.get(
+                id=self.kwargs['organizer_id'])
+            listing['event_id'] = self.kwargs['event_id']
+            listing['event_own'] = self._get_events(listing['organizer'])
+            listing['event'] = self._get_event_eb(
+                listing['organizer'],
+                listing['event_own'],
+            )
+            listing['event']['url'] = listing['event']['url'] + '#tickets'
+            listing['venue'] = self._get_venue(
+                listing['organizer'],
+                listing['event']['venue_id'],
+            )
+            # The discounts and prices are read from the listing summary
+            summary = get_listing_summary(listing['event_own'])
+            # The tickets type are only needed by the select of the form
+            if summary.tickets_discount_available:
+                listing['tickets_type'] = self._get_tickets_type(
+                    listing['event_own'],
+                    listing['organizer'],
+                )
+            else:
+                listing['tickets_type'] = {}
+            listing['tickets_discounts'] = self._get_tickets_discounts(
+                summary)
+            listing['event_discount'] = self._get_event_discount(summary)
+            listing['tickets_value'] = self._get_tickets(summary)
+            self.listing = listing
+        return self.listing
 
     def _generate_discount_code(self, form):
-        event = Event.objects.get(
-            id=self.kwargs['event_id'])
-        organizer = self.get_context_data()['organizer']
+        event = self.get_listing()['event_own']
+        organizer = self.get_listing()['organizer']
         discount_code = event.event_id + '-'
 
         if self._verify_member_numbers(form, organizer, event):
-            uknown_status = StatusMemberDiscountCode.objects.get(
-                name="Unknown"
-            )
-            if 'tickets_type' in form.cleaned_data.keys():
-                iterator = range(1, len(form.cleaned_data))
-            else:
-                iterator = range(1, len(form.cleaned_data) + 1)
-            member_numbers = []
-
-            for i in iterator:
-                member_numbers.append(
-                    str(form.cleaned_data['member_number_{}'.format(i)]))
+            member_numbers = self._get_member_numbers(form)
 
             discount_code += '_'.join(member_numbers)
 
-            eb_event = self.get_context_data()['event']
+            eb_event = self.get_listing()['event']
 
-            tickets_discounts = self.get_context_data()['tickets_discounts']
-            event_discount = self.get_context_data()['event_discount']
-            if tickets_discounts['available']:
+            tickets_discounts = self.get_listing()['tickets_discounts']
+            event_discount = self.get_listing()['event_discount']
+            if tickets_discounts['available'] and (
+                    'tickets_type' in form.cleaned_data):
                 # Find ticket type
                 ticket_type = EventTicketType.objects.get(
                     id=form.cleaned_data['tickets_type']
@@ -1184,294 +1090,191 @@ class ListingPageEventView(FormView):
                     discount.value,
                     uses=len(form.cleaned_data)
                 )
+            else:
+                # The discounts of the event changed after the page was loaded
+                form.add_error(
+                    '__all__',
+                    _('This event does not have discounts available'),
+                )
+                return False
             discount_code_object = DiscountCode.objects.create(
                 discount=discount,
                 discount_code=discount_code,
             )
 
-            for number in iterator:
-                MemberDiscountCode.objects.create(
+            MemberDiscountCode.objects.bulk_create([
+                MemberDiscountCode(
                     discount_code=discount_code_object,
-                    member_number=form.cleaned_data['member_number_{}'.format(
-                        number)],
-                    status=uknown_status
+                    member_number=member_number,
+                    status=get_lookup(StatusMemberDiscountCode, 'Unknown'),
                 )
+                for member_number in member_numbers
+            ])
+            metrics.DISCOUNT_CODES_GENERATED.inc()
 
             self._generate_url(eb_event, event.event_id, discount_code)
             return True
         else:
             return False
 
-    def _verify_member_numbers(self, form, organizer, event):
+    def _get_member_numbers(self, form):
+        """ The member numbers sent in the form, in order """
+        if 'tickets_type' in form.cleaned_data.keys():
+            count = len(form.cleaned_data) - 1
+        else:
+            count = len(form.cleaned_data)
+        return [
+            str(form.cleaned_data['member_number_{}'.format(number)])
+            for number in range(1, count + 1)
+        ]
+
+    def _get_discount_code_event(self, discount_code):
+        """ Returns the id of the event of the discount code
+        if it's of the type of discount of the listing, else None """
+        discount = discount_code.discount
+        if self.get_listing()['tickets_discounts']['available']:
+            if discount.discount_type_id == get_lookup(
+                    DiscountType, 'Ticket Type').id:
+                return discount.tickettypediscount.ticket_type.event_id
+        elif discount.discount_type_id == get_lookup(DiscountType, 'Event').id:
+            return discount.eventdiscount.event_id
+        return None
 
-        uknown_status = StatusMemberDiscountCode.objects.get(
-            name="Unknown"
-        )
-        canceled_status = StatusMemberDiscountCode.objects.get(
-            name="Canceled"
-        )
-        used_status = StatusMemberDiscountCode.objects.get(
-            name="Used"
+    def _set_status(self, codes, status):
+        """ Update the status of the member discount codes in our DB
+        and in the loaded codes """
+        MemberDiscountCode.objects.filter(
+            id__in=[code.id for code in codes],
+        ).update(status=status)
+        for code in codes:
+            code.status = status
+
+    def _verify_member_numbers(self, form, organizer, event):
+        """ Verify that the member numbers have not used the discount
+        of the event, and cancel or delete their codes not used in EB.
+        The codes of the numbers, and the codes of the other members
+        with the same discount code, are loaded in one query
+        and the rules are evaluated in memory """
+
+        statuses = {
+            name: get_lookup(StatusMemberDiscountCode, name)
+            for name in ('Unknown', 'Canceled', 'Used')
+        }
+        member_numbers = self._get_member_numbers(form)
+        codes = get_member_discount_codes(
+            member_numbers,
+            [statuses['Unknown'], statuses['Used']],
         )
-        # for each sent number
-        ticket_discount = 'tickets_type' in form.cleaned_data.keys()
-        if ticket_discount:
-            iterator = range(1, len(form.cleaned_data))
-        else:
-            iterator = range(1, len(form.cleaned_data) + 1)
-
-        for number in iterator:
-            # verify if a discount_code with uknown status exists
-            existing_discount_code = MemberDiscountCode.objects.filter(
-                member_number=form.cleaned_data[
-                    'member_number_{}'.format(number)
-                ]).filter(
-                    status=uknown_status
+
+        def add_used_error(number):
+            form.add_error(
+                'member_number_1',
+                _('Number {} has already used the discount for this event'.format(
+                    number
+                )),
             )
-            condition = False
-            # If exists
-            if existing_discount_code:
-                for i in range(len(existing_discount_code)):
-                    discount_code = DiscountCode.objects.get(
-                        id=existing_discount_code[i].discount_code.id
-                    )
-                    if self.get_context_data()['tickets_discounts']['available']:
-                        if discount_code.discount.discount_type.name == 'Ticket Type':
-                            discount = TicketTypeDiscount.objects.get(
-                                id=discount_code.discount.id
-                            )
-                            ticket_type = EventTicketType.objects.get(
-                                id=discount.ticket_type.id
-                            )
-                            condition = event.id == ticket_type.event.id
-                        else:
-                            continue
-                    else:
-                        if discount_code.discount.discount_type.name == 'Event':
-                            discount = EventDiscount.objects.get(
-                                id=discount_code.discount.id
-                            )
-                            condition = event.id == discount.event_id
-                        else:
-                            continue
-
-                    if condition:
-                        # Verify if discount already exists in EB
-                        discount_code_eb_api = check_discount_code_in_eb(
-                            organizer,
-                            event.event_id,
-                            discount_code.discount_code,
-                        )
 
-                        if len(discount_code_eb_api['discounts']) != 0:
-
-                            quantity_available = discount_code_eb_api['discounts'][0]['quantity_available']
-                            quantity_sold = discount_code_eb_api['discounts'][0]['quantity_sold']
-                            uses_left = quantity_available - quantity_sold
-
-                            # If there aren't any more uses available
-                            if uses_left == 0:
-                                # Add Error
-                                form.add_error('member_number_1',
-                                               _('Number {} has already used the discount for this event'.format(
-                                                   form.cleaned_data[
-                                                       'member_number_{}'.format(
-                                                           number)
-                                                   ])))
-
-                                # Set all discounts codes related as used
-                                MemberDiscountCode.objects.filter(
-                                    discount_code=discount_code
-                                ).update(
-                                    status=used_status
-                                )
-                                return False
-                            else:
-                                if quantity_sold != 0:
-                                    # Cancel status for this member's discount
-                                    canceled_code = MemberDiscountCode.objects.filter(
-                                        id=existing_discount_code[i].id
-                                    )
-                                    canceled_code.update(
-                                        status=canceled_status
-                                    )
-
-                                    # Update uses in EB
-                                    updated_discount_code = update_discount_code_to_eb(
-                                        organizer,
-                                        discount_code_eb_api['discounts'][0]['id'],
-                                        discount_code_eb_api['discounts'][0]['quantity_available'] - 1
-                                    )
-
-                                    discount_codes_related = MemberDiscountCode.objects.filter(
-                                        discount_code=discount_code
-                                    ).exclude(
-                                        member_number=form.cleaned_data[
-                                            'member_number_{}'.format(number)]
-                                    )
-
-                                    quantity_available = updated_discount_code['quantity_available']
-                                    quantity_sold = updated_discount_code['quantity_sold']
-                                    uses_left = quantity_available - quantity_sold
-                                    # Update all discounts to used
-                                    for i in range(len(discount_codes_related)):
-                                        discount_code = DiscountCode.objects.get(
-                                            id=discount_codes_related[i].discount_code.id
-                                        )
-
-                                        if self.get_context_data()['tickets_discounts']['available']:
-                                            if discount_code.discount.discount_type.name == 'Ticket Type':
-                                                discount = TicketTypeDiscount.objects.get(
-                                                    id=discount_code.discount.id
-                                                )
-                                                ticket_type = EventTicketType.objects.get(
-                                                    id=discount.ticket_type.id
-                                                )
-                                                condition = event.id == ticket_type.event.id
-                                            else:
-                                                continue
-                                        else:
-                                            if discount_code.discount.discount_type.name == 'Event':
-                                                discount = EventDiscount.objects.get(
-                                                    id=discount_code.discount.id
-                                                )
-                                                condition = event.id == discount.event_id
-                                            else:
-                                                continue
-                                        if condition:
-                                            # If there are no more uses
-                                            if uses_left == 0:
-                                                update_discount = MemberDiscountCode.objects.filter(
-                                                    id=discount_codes_related[i].id
-                                                )
-                                                update_discount.update(
-                                                    status=used_status
-                                                )
-                                            else:
-                                                if quantity_sold != 0:
-                                                    # Update one discount as used
-                                                    update_discount = MemberDiscountCode.objects.filter(
-                                                        id=discount_codes_related[i].id
-                                                    )
-                                                    update_discount.update(
-                                                        status=used_status
-                                                    )
-                                                break
-                                else:
-                                    discount_code_id = existing_discount_code[i].discount_code.id
-                                    if quantity_available == 1:
-                                        MemberDiscountCode.objects.filter(
-                                            id=existing_discount_code[i].id
-                                        ).delete()
-
-                                        DiscountCode.objects.filter(
-                                            id=discount_code_id
-                                        ).delete()
-
-                                        delete_discount_code_from_eb(
-                                            organizer,
-                                            discount_code_eb_api['discounts'][0]['id'])
-                                    else:
-                                        MemberDiscountCode.objects.filter(
-                                            id=existing_discount_code[i].id
-                                        ).update(
-                                            status=canceled_status
-                                        )
-                                        update_discount_code_to_eb(
-                                            organizer,
-                                            discount_code_eb_api['discounts'][0]['id'],
-                                            discount_code_eb_api['discounts'][0]['quantity_available'] - 1
-                                        )
-                        else:
-                            DiscountCode.objects.get(
-                                id=existing_discount_code[i].discount_code.id
-                            ).delete()
-                    else:
-                        used_discount_code = MemberDiscountCode.objects.filter(
-                            member_number=form.cleaned_data[
-                                'member_number_{}'.format(number)
-                            ]).filter(
-                            status=used_status
-                        )
-                        for i in range(len(used_discount_code)):
-                            discount_code = DiscountCode.objects.get(
-                                id=used_discount_code[i].discount_code.id
-                            )
-                            if self.get_context_data()['tickets_discounts']['available']:
-                                if discount_code.discount.discount_type.name == 'Ticket Type':
-                                    discount = TicketTypeDiscount.objects.get(
-                                        id=discount_code.discount.id
-                                    )
-                                    ticket_type = EventTicketType.objects.get(
-                                        id=discount.ticket_type.id
-                                    )
-                                    condition = event.id == ticket_type.event.id
-                                else:
-                                    continue
-                            else:
-                                if discount_code.discount.discount_type.name == 'Event':
-                                    discount = EventDiscount.objects.get(
-                                        id=discount_code.discount.id
-                                    )
-                                    condition = event.id == discount.event_id
-                                else:
-                                    continue
-
-                            if condition:
-                                form.add_error('member_number_1',
-                                               _('Number {} has already used the discount for this event'.format(
-                                                   form.cleaned_data[
-                                                       'member_number_{}'.format(
-                                                           number)
-                                                   ])))
-                                return False
+        def has_used_discount(number):
+            return any(
+                code.member_number == number and
+                code.status_id == statuses['Used'].id and
+                self._get_discount_code_event(code.discount_code) == event.id
+                for code in codes
+            )
 
-            else:
-                used_discount_code = MemberDiscountCode.objects.filter(
-                    member_number=form.cleaned_data[
-                        'member_number_{}'.format(number)
-                    ]).filter(
-                        status=used_status
+        def delete_discount_code(discount_code):
+            # The member discount codes are deleted in cascade
+            DiscountCode.objects.filter(id=discount_code.id).delete()
+            codes[:] = [
+                code for code in codes
+                if code.discount_code_id != discount_code.id
+            ]
+
+        for number in member_numbers:
+            unknown_codes = [
+                code for code in codes
+                if code.member_number == number and
+                code.status_id == statuses['Unknown'].id
+            ]
+            if not unknown_codes and has_used_discount(number):
+                add_used_error(number)
+                return False
+
+            for member_code in unknown_codes:
+                discount_code = member_code.discount_code
+                event_id = self._get_discount_code_event(discount_code)
+                if event_id is None:
+                    continue
+                if event_id != event.id:
+                    if has_used_discount(number):
+                        add_used_error(number)
+                        return False
+                    continue
+
+                # Verify if discount already exists in EB
+                discount_code_eb_api = check_discount_code_in_eb(
+                    organizer,
+                    event.event_id,
+                    discount_code.discount_code,
                 )
-                if used_discount_code:
-                    for i in range(len(used_discount_code)):
-                        discount_code = DiscountCode.objects.get(
-                            id=used_discount_code[i].discount_code.id
+                if len(discount_code_eb_api['discounts']) == 0:
+                    delete_discount_code(discount_code)
+                    continue
+
+                discount_eb = discount_code_eb_api['discounts'][0]
+                quantity_available = discount_eb['quantity_available']
+                quantity_sold = discount_eb['quantity_sold']
+
+                # If there aren't any more uses available
+                if quantity_available - quantity_sold == 0:
+                    add_used_error(number)
+                    # Set all discounts codes related as used
+                    MemberDiscountCode.objects.filter(
+                        discount_code=discount_code
+                    ).update(
+                        status=statuses['Used']
+                    )
+                    return False
+
+                if quantity_sold != 0:
+                    # Cancel status for this member's discount
+                    self._set_status([member_code], statuses['Canceled'])
+                    # Update uses in EB
+                    updated_discount_code = update_discount_code_to_eb(
+                        organizer,
+                        discount_eb['id'],
+                        quantity_available - 1,
+                    )
+                    discount_codes_related = [
+                        code for code in codes
+                        if code.discount_code_id == discount_code.id and
+                        code.member_number != number
+                    ]
+                    quantity_available = updated_discount_code['quantity_available']
+                    quantity_sold = updated_discount_code['quantity_sold']
+                    # If there are no more uses, all of them are used
+                    if quantity_available - quantity_sold == 0:
+                        self._set_status(
+                            discount_codes_related,
+                            statuses['Used'],
                         )
-                        if self.get_context_data()['tickets_discounts']['available']:
-                            if discount_code.discount.discount_type.name == 'Ticket Type':
-                                discount = TicketTypeDiscount.objects.get(
-                                    id=discount_code.discount.id
-                                )
-                                ticket_type = EventTicketType.objects.get(
-                                    id=discount.ticket_type.id
-                                )
-                                condition = event.id == ticket_type.event.id
-                            else:
-                                continue
-                        else:
-                            if discount_code.discount.discount_type.name == 'Event':
-                                discount = EventDiscount.objects.get(
-                                    id=discount_code.discount.id
-                                )
-                                condition = event.id == discount.event_id
-                            else:
-                                continue
-
-                        if condition:
-                            form.add_error('member_number_1',
-                                           _('Number {} has already used the discount for this event'.format(
-                                               form.cleaned_data[
-                                                   'member_number_{}'.format(
-                                                       number)
-                                               ])))
-                            return False
-            if 'tickets_type' in form.cleaned_data.keys():
-                if number == len(form.cleaned_data) - 1:
-                    return True
-            else:
-                if number == len(form.cleaned_data):
-                    return True
+                    elif quantity_sold != 0:
+                        # Update one discount as used
+                        self._set_status(
+                            discount_codes_related[:1],
+                            statuses['Used'],
+                        )
+                elif quantity_available == 1:
+                    delete_discount_code(discount_code)
+                    delete_discount_code_from_eb(organizer, discount_eb['id'])
+                else:
+                    self._set_status([member_code], statuses['Canceled'])
+                    update_discount_code_to_eb(
+                        organizer,
+                        discount_eb['id'],
+                        quantity_available - 1,
+                    )
+        return True
 
     def _generate_url(self, eb_event, event_id, discount_code):
         self.url = 'https://www.eventbrite.com/e/' + \
@@ -1490,33 +1293,13 @@ class ListingPageEventView(FormView):
         kwargs = super(ListingPageEventView, self).get_form_kwargs()
         kwargs['event_id'] = self.kwargs['event_id']
         kwargs['user'] = self.kwargs['organizer_id']
+        kwargs['tickets_type'] = self.get_listing()['tickets_type']
 
         return kwargs
 
     def get_context_data(self, **kwargs):
         context = super(ListingPageEventView, self).get_context_data(**kwargs)
-        context['organizer'] = get_user_model().objects.get(
-            id=self.kwargs['organizer_id'])
-        context['event_id'] = self.kwargs['event_id']
-        context['event'] = self._get_events(
-            context['organizer'],
-        )
-        context['event']['url'] = context['event']['url'] + '#tickets'
-        context['venue'] = self._get_venue(
-            context['organizer'],
-            context['event']['venue_id'],
-        )
-        context['tickets_type'] = self._get_tickets_type(
-            context['event_id'],
-            context['organizer'],
-        )
-        context['tickets_discounts'] = self._get_tickets_discounts(
-            context['tickets_type'])
-        context['event_discount'] = self._get_event_discount(
-            context['event_id'])
-        context['tickets_value'] = self._get_tickets(
-            context['tickets_type']
-        )
+        context.update(self.get_listing())
         return context
 
 
@@ -1533,3 +1316,22 @@ class ActivateLanguageView(View):
         translation.activate(self.language_code)
         request.session[translation.LANGUAGE_SESSION_KEY] = self.language_code
         return redirect(self.redirect_to)
+
+
+class MetricsView(View):
+
+    """ This view exposes the metrics of all the workers in the text format
+    of Prometheus. Only the staff users and the requests with the token
+    of METRICS_TOKEN in the Authorization header can see them """
+
+    def get(self, request, *args, **kwargs):
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not request.user.is_staff and not (
+                token and constant_time_compare(
+                    authorization, 'Bearer {}'.format(token))):
+            raise PermissionDenied
+        return HttpResponse(
+            metrics.render(metrics.collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -1,6 +1,19 @@
 from django.shortcuts import render
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 from social_django.middleware import SocialAuthExceptionMiddleware
 from social_core.exceptions import AuthCanceled
+from bundesliga_app import metrics
+from bundesliga_app.utils import (
+    get_auth_token,
+    start_request_stats,
+    stop_request_stats,
+)
+from json import dumps
+from time import time
+import logging
+
+logger = logging.getLogger('bundesliga_app.requests')
 
 
 class SocialAuthExceptionMiddleware(SocialAuthExceptionMiddleware):
@@ -13,3 +26,99 @@ class SocialAuthExceptionMiddleware(SocialAuthExceptionMiddleware):
             )
         else:
             pass
+
+
+class EventbriteTokenMiddleware(object):
+    """
+    Keep the EB token of the logged user in request.eb_auth_token.
+    It is loaded the first time it is used, so the views that do not
+    call EB do not query it
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.eb_auth_token = SimpleLazyObject(
+            lambda: get_eb_auth_token(request)
+        )
+        return self.get_response(request)
+
+
+def get_eb_auth_token(request):
+    if request.user.is_authenticated:
+        return get_auth_token(request.user)
+    return None
+
+
+class RequestStatsMiddleware(object):
+    """
+    Count and time the SQL queries, the calls to EB and DS and the uses
+    of the cache of each request. They are sent in the Server-Timing header
+    and in a log line, that is a warning if the request has exceeded
+    one of the REQUEST_BUDGETS
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budgets = getattr(settings, 'REQUEST_BUDGETS', {})
+
+    def __call__(self, request):
+        # The queries are counted by the cursors of signals.py
+        start_request_stats()
+        start = time()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time() - start
+            stats = stop_request_stats()
+        stats['time'] = duration
+        resolver_match = getattr(request, 'resolver_match', None)
+        metrics.VIEW_DURATION.observe(
+            duration,
+            view=resolver_match.url_name if resolver_match else 'none',
+        )
+
+        response['Server-Timing'] = ', '.join([
+            'db;dur={:.1f};desc="{} queries"'.format(
+                stats['db']['time'] * 1000, stats['db']['count']),
+            'eb;dur={:.1f};desc="{} calls"'.format(
+                stats['eb']['time'] * 1000, stats['eb']['count']),
+            'ds;dur={:.1f};desc="{} calls"'.format(
+                stats['ds']['time'] * 1000, stats['ds']['count']),
+            'cache;desc="{} hits, {} misses"'.format(
+                stats['cache']['hits'], stats['cache']['misses']),
+            'total;dur={:.1f}'.format(duration * 1000),
+        ])
+
+        over_budget = [
+            name
+            for name, budget in sorted(self.budgets.items())
+            if self._get_value(stats, name) > budget
+        ]
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'time': round(duration * 1000, 1),
+                'db': self._format(stats['db']),
+                'eb': self._format(stats['eb']),
+                'ds': self._format(stats['ds']),
+                'cache': stats['cache'],
+                'over_budget': over_budget,
+            }, sort_keys=True),
+        )
+        return response
+
+    def _get_value(self, stats, name):
+        """ The time of the request in seconds, else the count of calls """
+        if name == 'time':
+            return stats['time']
+        return stats[name]['count']
+
+    def _format(self, stats):
+        stats = dict(stats)
+        stats['time'] = round(stats['time'] * 1000, 1)
+        return stats
@@ -52,12 +52,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bundesliga_site.middleware.RequestStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bundesliga_site.middleware.EventbriteTokenMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
@@ -100,6 +102,7 @@ SOCIAL_AUTH_PIPELINE = (
     'social_core.pipeline.social_auth.associate_user',
     'social_core.pipeline.debug.debug',
     'social_core.pipeline.social_auth.load_extra_data',
+    'bundesliga_app.pipeline.reset_organization_id',
     'social_core.pipeline.user.user_details',
     'social_core.pipeline.debug.debug'
 )
@@ -216,6 +219,69 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 CACHE_TTL = 60 * 30
 CACHE_TTL_TICKETS = 60 * 10
+CACHE_TTL_ORGANIZATION = 60 * 60 * 24
+# The public pages are cached until the organizer changes its events
+CACHE_TTL_PAGE = 60 * 5
+
+# The values of EB are served stale while they are refreshed in background
+EB_CACHE_STALE_TTL = 60 * 60
+EB_CACHE_JITTER = 0.1
+EB_CACHE_LOCK_TTL = 30
+EB_CACHE_LOCK_WAIT = 2
+CACHE_TTL_DS_VALID = 60 * 60 * 24
+CACHE_TTL_DS_INVALID = 60 * 10
+# The lookup tables are loaded again in each process after this time
+LOOKUPS_TTL = 60 * 5
+
+# Keep-alive connections to EB API of each worker
+EB_POOL_SIZE = 10
+EB_POOL_IDLE_TIMEOUT = 60
+EB_POOL_MAX_LIFETIME = 60 * 10
+# Seconds of a call to EB without response before it fails
+EB_API_TIMEOUT = 10
+
+# Concurrent fetch of EB data for a page of events
+EB_FETCH_WORKERS = 8
+EB_FETCH_DEADLINE = 10
+
+# Validation of member numbers in DS API, timeouts in seconds
+DS_POOL_SIZE = 10
+DS_API_TIMEOUT = 5
+DS_API_DEADLINE = 8
+
+# The requests that exceed one of these budgets are logged as warnings,
+# the time is in seconds and the others are the number of calls
+REQUEST_BUDGETS = {
+    'time': 2,
+    'db': 50,
+    'eb': 10,
+    'ds': 20,
+}
+
+# The metrics of each worker are flushed to a file of this directory,
+# so /metrics shows the metrics of all the workers. The staff users and the
+# requests with the header "Authorization: Bearer METRICS_TOKEN" can see them
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 10
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # A line with the stats of each request
+        'bundesliga_app.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
 
 REDIS_URL = get_env_variable('REDIS_URL')
 CACHES = {
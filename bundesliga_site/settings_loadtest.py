@@ -0,0 +1,28 @@
+"""
+Settings to load test the app with the fake APIs of EB and DS, run them with:
+    python manage.py fake_apis --port 8001
+    DJANGO_SETTINGS_MODULE=bundesliga_site.settings_loadtest gunicorn bundesliga_site.wsgi
+The database and Redis are the real ones of DATABASE_URL and REDIS_URL,
+and the static files are served by whitenoise, so run collectstatic before
+"""
+import os
+
+# The keys of the APIs are not used by the fake APIs
+for var_name in [
+    'SOCIAL_AUTH_EVENTBRITE_KEY',
+    'SOCIAL_AUTH_EVENTBRITE_SECRET',
+    'API_KEY_DEUTSCHER_SPORTAUSWEIS',
+    'DS_API_URL',
+    'RECAPTCHA_PRIVATE_KEY',
+    'RECAPTCHA_PUBLIC_KEY',
+]:
+    os.environ.setdefault(var_name, 'loadtest')
+
+from .settings import *  # noqa
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+FAKE_APIS_URL = os.environ.get('FAKE_APIS_URL', 'http://127.0.0.1:8001')
+EB_API_URL = FAKE_APIS_URL + '/v3/'
+DS_API_URL = FAKE_APIS_URL + '/ds/'
@@ -12,4 +12,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bundesliga_site.settings")
 
 application = get_wsgi_application()
+
+# Load the lookup tables before the first request
+from bundesliga_app.utils import warm_lookups  # noqa
+warm_lookups()
+
 application = DjangoWhiteNoise(application)